@@ -1,21 +1,59 @@
 import os
 import sys
+import atexit
+import base64
+import io
+import zipfile
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed, wait
+from contextlib import nullcontext
+import httpx
 import numpy as np
-from flask import Flask, request, jsonify
+from flask import Flask, Response, g, has_request_context, request, jsonify, stream_with_context
 from flask_cors import CORS
-from tensorflow.keras.models import load_model
-from tensorflow.keras.preprocessing import image
-from groq import Groq
+from groq import DefaultHttpxClient, Groq
 from dotenv import load_dotenv
 
+from batching import MicroBatcher
+from cache import PredictionCache, ResponseCache, bucket_probability
+from cpu_profile import apply_profile_file
+from fallback_reports import fallback_recommendations, fallback_report
+from inference_backends import load_inference_model, model_file_for
+from jobs import JobQueue, JobStore, webhook_allowed
+from llm_client import CircuitBreaker, ResilientGroq
+from llm_stub import StubGroq
+from metrics import MetricsRegistry
+from model_loader import BackgroundModelLoader
+from model_registry import ModelRegistry, ModelSpec, ServedModel
+from models.gradcam import GradCAM, heatmap_overlay_png
+from models.preprocessing import decode_image, get_buffer, normalize_pixels, preprocess_bytes, preprocess_file
+from models.tta import TestTimeAugmentation
+from orchestration import ParallelCallError, run_parallel, run_parallel_streams
+from profiler import SamplingProfiler
+from reports import ReportStore
+from server_timing import StageTimings
+from worker_pool import InferenceWorkerPool
+
 # --- ENVIRONMENT SETUP ---
+# Spawned inference workers re-import this script as __mp_main__. They only need the model code,
+# so everything below that starts threads, opens files or loads models is skipped in them.
+IN_INFERENCE_WORKER = __name__ == "__mp_main__"
 os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
 os.environ["TF_CPP_MIN_LOG_LEVEL"] = "2"
-os.environ["TF_ENABLE_ONEDNN_OPTS"] = "0"
 
 # Load .env file
 load_dotenv()
 
+# --- CPU PROFILE ---
+# Settings chosen by autotune.py (oneDNN, thread counts, batch size) fill in whatever the environment and
+# .env leave unset. This must run before TensorFlow is imported; oneDNN stays off without a profile.
+CPU_PROFILE = os.environ.get("CPU_PROFILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "cpu_profile.json"))
+if not IN_INFERENCE_WORKER:
+    # Workers inherit the server's environment, profile settings included
+    apply_profile_file(CPU_PROFILE)
+os.environ.setdefault("TF_ENABLE_ONEDNN_OPTS", "0")
+
 # Add parent directory to Python path
 sys.path.append('..')
 
@@ -23,66 +61,483 @@ sys.path.append('..')
 app = Flask(__name__)
 CORS(app)
 
+# --- METRICS ---
+# Prometheus metrics, served at GET /metrics. Request stages (upload, decode, preprocess, inference,
+# llm, serialize) are timed on every request and recorded in request_stage_seconds.
+metrics = MetricsRegistry()
+http_requests_total = metrics.counter(
+    "http_requests_total", "HTTP requests by endpoint, method and status code.", ("endpoint", "method", "status")
+)
+http_request_duration = metrics.histogram(
+    "http_request_duration_seconds", "Time until the response is returned (streamed bodies not included).",
+    ("endpoint", "method")
+)
+http_requests_in_flight = metrics.gauge(
+    "http_requests_in_flight", "Requests being handled, including streamed bodies still being sent.", ("endpoint",)
+)
+stage_duration = metrics.histogram("request_stage_seconds", "Time spent in each request stage.", ("endpoint", "stage"))
+inference_duration = metrics.histogram(
+    "inference_seconds", "Model prediction time per request, including micro-batcher wait.", ("model",)
+)
+llm_duration = metrics.histogram("llm_request_seconds", "Groq completion time (cache hits not included).", ("operation",))
+llm_in_flight = metrics.gauge("llm_requests_in_flight", "Groq completions in progress.", ("operation",))
+llm_tokens_total = metrics.counter("llm_tokens_total", "Tokens used by Groq completions.", ("operation", "kind"))
+errors_total = metrics.counter("errors_total", "Errors by stage.", ("stage",))
+report_sections_total = metrics.counter(
+    "report_sections_total", "Report sections returned by /predict, by status.", ("section", "status")
+)
+explanations_total = metrics.counter(
+    "explanations_total", "Grad-CAM explanations returned, computed or from the prediction cache.", ("model", "cached")
+)
+llm_fallbacks_total = metrics.counter(
+    "llm_fallbacks_total", "Report sections replaced by a template after the LLM call failed.", ("operation",)
+)
+
+def log_error(stage, message):
+    """Print an error and count it in errors_total{stage}."""
+    errors_total.inc(stage=stage)
+    print(f"❌ {message}")
+
+# --- SERVER TIMING ---
+# SERVER_TIMING=1 also adds the stage durations to every response as a Server-Timing header
+# (upload, decode, preprocess, inference, llm, serialize, total); benchmark.py turns it on.
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0") == "1"
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    g.stage_timings = StageTimings()
+    http_requests_in_flight.inc(endpoint=g.metrics_endpoint)
+
+@app.after_request
+def record_response_metrics(response):
+    endpoint = g.get("metrics_endpoint")
+    timings = g.get("stage_timings")
+    if endpoint is not None and timings is not None:
+        http_requests_total.inc(endpoint=endpoint, method=request.method, status=response.status_code)
+        http_request_duration.observe(timings.total_ms() / 1000, endpoint=endpoint, method=request.method)
+        if SERVER_TIMING:
+            response.headers["Server-Timing"] = timings.header()
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    # Also runs once a streamed body is finished; popping the endpoint records each request only once
+    endpoint = g.pop("metrics_endpoint", None)
+    if endpoint is None:
+        return
+    timings = g.get("stage_timings")
+    if timings is not None:
+        for name, ms in timings.stages.items():
+            stage_duration.observe(ms / 1000, endpoint=endpoint, stage=name)
+    http_requests_in_flight.dec(endpoint=endpoint)
+
+def stage(name):
+    """Context manager timing one stage of the current request (a no-op when timing is off)."""
+    timings = g.get("stage_timings") if has_request_context() else None
+    return timings.measure(name) if timings is not None else nullcontext()
+
 # --- GROQ CLIENT INIT ---
-groq_client = Groq(api_key=os.getenv("GROQ_API"))
+# GROQ_CLIENT=stub swaps in an offline client (optionally slowed down with GROQ_STUB_LATENCY).
+# Either client is wrapped in ResilientGroq: at most GROQ_MAX_CONCURRENCY calls at once over pooled
+# connections, GROQ_RPM / GROQ_TPM token buckets, retries on 429/5xx/timeouts and a circuit breaker.
+# GROQ_BASE_URL (read by the Groq SDK) points the real client at another server, e.g. fake_groq_server.py.
+GROQ_MAX_CONCURRENCY = int(os.getenv("GROQ_MAX_CONCURRENCY", 8))
+if os.getenv("GROQ_CLIENT", "groq").lower() == "stub":
+    raw_groq_client = StubGroq(
+        latency=float(os.getenv("GROQ_STUB_LATENCY", 0)),
+        token_rate=float(os.getenv("GROQ_STUB_TOKEN_RATE", 0))
+    )
+    print("⚠️ Using offline stub Groq client")
+else:
+    raw_groq_client = Groq(
+        api_key=os.getenv("GROQ_API"),
+        max_retries=0,  # retries are handled by ResilientGroq
+        http_client=DefaultHttpxClient(limits=httpx.Limits(
+            max_connections=max(GROQ_MAX_CONCURRENCY, 1), max_keepalive_connections=max(GROQ_MAX_CONCURRENCY, 1)
+        ))
+    )
+
+groq_client = ResilientGroq(
+    raw_groq_client,
+    max_concurrency=GROQ_MAX_CONCURRENCY,
+    requests_per_minute=float(os.getenv("GROQ_RPM", 0)),
+    tokens_per_minute=float(os.getenv("GROQ_TPM", 0)),
+    max_retries=int(os.getenv("GROQ_MAX_RETRIES", 3)),
+    backoff_base=float(os.getenv("GROQ_BACKOFF_BASE", 0.5)),
+    backoff_max=float(os.getenv("GROQ_BACKOFF_MAX", 8)),
+    breaker=CircuitBreaker(
+        failure_threshold=int(os.getenv("GROQ_BREAKER_THRESHOLD", 5)),
+        reset_timeout=float(os.getenv("GROQ_BREAKER_RESET", 30))
+    ),
+    default_timeout=float(os.environ.get("LLM_TIMEOUT", 30))
+)
+
+# --- LLM ORCHESTRATION ---
+LLM_TIMEOUT = float(os.environ.get("LLM_TIMEOUT", 30))
+llm_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("LLM_MAX_WORKERS", 8)),
+    thread_name_prefix="llm"
+)
+
+# --- LLM RESPONSE CACHE ---
+# Report prompts only depend on a few categorical fields and rounded probabilities,
+# so identical prompts are common. LLM_CACHE_PROB_BUCKET (in percent) snaps the
+# probabilities to coarser bins before the prompt is built to raise the hit rate.
+LLM_CACHE_SIZE = int(os.environ.get("LLM_CACHE_SIZE", 512))
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", 3600))
+LLM_CACHE_PROB_BUCKET = float(os.environ.get("LLM_CACHE_PROB_BUCKET", 0))
+
+response_cache = ResponseCache(LLM_CACHE_SIZE, LLM_CACHE_TTL) if LLM_CACHE_SIZE > 0 else None
+
+def completion_kwargs(messages, model, temperature=None, max_tokens=None, timeout=None):
+    # Unset options are left out so the client defaults (including its timeout) still apply
+    kwargs = {"messages": messages, "model": model}
+    for name, value in (("temperature", temperature), ("max_tokens", max_tokens), ("timeout", timeout)):
+        if value is not None:
+            kwargs[name] = value
+    return kwargs
+
+def record_token_usage(operation, usage):
+    if usage is None:
+        return
+    for kind in ("prompt_tokens", "completion_tokens"):
+        count = getattr(usage, kind, None)
+        if count:
+            llm_tokens_total.inc(count, operation=operation, kind=kind[:-len("_tokens")])
+
+def create_completion(messages, model, temperature=None, max_tokens=None, timeout=None, use_cache=True,
+                      operation="completion"):
+    cache_key = None
+    if use_cache and response_cache is not None:
+        cache_key = response_cache.key(messages, model, temperature, max_tokens)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    with llm_in_flight.track_inprogress(operation=operation), llm_duration.time(operation=operation):
+        completion = groq_client.chat.completions.create(
+            **completion_kwargs(messages, model, temperature, max_tokens, timeout)
+        )
+    record_token_usage(operation, getattr(completion, "usage", None))
+    content = completion.choices[0].message.content
+
+    if cache_key is not None and content:
+        response_cache.put(cache_key, content)
+    return content
+
+def stream_completion(messages, model, temperature=None, max_tokens=None, timeout=None, use_cache=True,
+                      operation="completion"):
+    """Yield completion text deltas as they arrive; a cached response is yielded in one piece."""
+    cache_key = None
+    if use_cache and response_cache is not None:
+        cache_key = response_cache.key(messages, model, temperature, max_tokens)
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            yield cached
+            return
+
+    started = time.perf_counter()
+    llm_in_flight.inc(operation=operation)
+    parts = []
+    usage = None
+    try:
+        stream = groq_client.chat.completions.create(
+            stream=True,
+            **completion_kwargs(messages, model, temperature, max_tokens, timeout)
+        )
+        try:
+            for chunk in stream:
+                # Groq reports usage on the last chunk; without it every delta counts as one token
+                usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or usage
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+    finally:
+        llm_in_flight.dec(operation=operation)
+        llm_duration.observe(time.perf_counter() - started, operation=operation)
+        if usage is not None:
+            record_token_usage(operation, usage)
+        elif parts:
+            llm_tokens_total.inc(len(parts), operation=operation, kind="completion")
+
+    # Only reached when the stream ran to completion, so partial replies are never cached
+    if cache_key is not None and parts:
+        response_cache.put(cache_key, "".join(parts))
 
 # --- LOAD MODEL ---
-def load_model_file():
-    try:
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        model_names = ['thermal.keras']
-
-        for model_name in model_names:
-            model_path = os.path.join(current_dir, model_name)
-            if os.path.exists(model_path):
-                print(f"✅ Found model at: {model_path}")
-                loaded_model = load_model(model_path)
-                print("✅ Model loaded successfully")
-                return loaded_model
-                
-        print("❌ Error: No model file found. Looked for:", model_names)
+def model_path_for(spec):
+    model_path = model_file_for(MODEL_BACKEND, MODEL_DIR, spec.file_stem)
+    return model_path if os.path.exists(model_path) else None
+
+def find_model_file(spec):
+    model_path = model_path_for(spec)
+    if model_path is None:
+        print("❌ Error: No model file found. Looked for:", [os.path.basename(model_file_for(MODEL_BACKEND, "", spec.file_stem))])
         return None
+    print(f"✅ Found model at: {model_path}")
+    return model_path
+
+def load_model_file(spec):
+    try:
+        model_path = find_model_file(spec)
+        if model_path is None:
+            return None, None
+
+        # TensorFlow (or the TFLite runtime) is imported here, on the loader thread, so the server can bind first
+        loaded_model = load_inference_model(
+            model_path,
+            backend=MODEL_BACKEND,
+            intra_op_threads=INFERENCE_INTRA_OP_THREADS,
+            inter_op_threads=INFERENCE_INTER_OP_THREADS
+        )
+        print(f"✅ Model '{spec.name}' loaded successfully ({MODEL_BACKEND} backend)")
+        return loaded_model, model_path
     except Exception as e:
-        print(f"❌ Error loading model: {str(e)}")
-        return None
+        log_error("model_load", f"Error loading model '{spec.name}': {str(e)}")
+        return None, None
+
+def start_worker_pool(spec):
+    # Each worker process loads its own copy of the model; the Flask process never imports TensorFlow
+    model_path = find_model_file(spec)
+    if model_path is None:
+        return None, None
+    pool = InferenceWorkerPool(
+        model_path,
+        num_workers=INFERENCE_WORKERS,
+        intra_op_threads=INFERENCE_INTRA_OP_THREADS,
+        inter_op_threads=INFERENCE_INTER_OP_THREADS,
+        max_batch_size=BATCH_MAX_SIZE,
+        backend=MODEL_BACKEND
+    ).start()
+    atexit.register(pool.stop)
+    return pool, model_path
+
+def load_model(spec):
+    if INFERENCE_WORKERS > 0:
+        loaded_model, loaded_path = start_worker_pool(spec)
+    else:
+        loaded_model, loaded_path = load_model_file(spec)
+    if loaded_model is None:
+        raise RuntimeError(f"No usable model file found for '{spec.name}'")
+    return loaded_model, loaded_path
+
+def load_thermal_model():
+    return load_model(THERMAL_MODEL)
+
+def warm_up_model(loaded):
+    # Trace the inference graph for a single image and for a full batch up front
+    loaded_model, _ = loaded
+    for batch_size in sorted({1, BATCH_MAX_SIZE}):
+        loaded_model.predict_on_batch(np.zeros((batch_size, 224, 224, 3), dtype=np.float32))
+
+def build_served_model(spec, loaded):
+    """Wrap a loaded model in the shared serving runtime: its own micro-batcher and prediction cache."""
+    loaded_model, loaded_path = loaded
+
+    batcher = MicroBatcher(
+        loaded_model.predict_on_batch,
+        max_batch_size=BATCH_MAX_SIZE,
+        max_wait_ms=BATCH_MAX_WAIT_MS,
+        name=spec.name,
+        concurrency=max(INFERENCE_WORKERS, 1)
+    ).start()
+    print(f"✅ Micro-batching enabled for '{spec.name}' (max batch {BATCH_MAX_SIZE}, max wait {BATCH_MAX_WAIT_MS} ms)")
+
+    prediction_cache = None
+    if PREDICTION_CACHE_SIZE > 0 or PREDICTION_CACHE_DIR:
+        try:
+            prediction_cache = PredictionCache(
+                loaded_path,
+                model_version=MODEL_VERSION,
+                max_entries=PREDICTION_CACHE_SIZE,
+                disk_dir=PREDICTION_CACHE_DIR
+            )
+            print(f"✅ Prediction cache enabled (model fingerprint {prediction_cache.model_fingerprint[:12]})")
+        except Exception as e:
+            print(f"⚠️ Warning: Prediction cache disabled: {str(e)}")
+
+    explainer, explain_batcher = build_explainer(spec, loaded_model)
+    return ServedModel(spec, loaded_model, loaded_path, batcher, prediction_cache, explainer, explain_batcher)
+
+def build_explainer(spec, loaded_model):
+    """(GradCAM, its micro-batcher) for an in-process Keras model, or (None, None)."""
+    if not EXPLAIN_ENABLED or INFERENCE_WORKERS > 0 or MODEL_BACKEND != "keras":
+        return None, None
+    try:
+        explainer = GradCAM(loaded_model)
+    except Exception as e:
+        print(f"⚠️ Warning: Grad-CAM explanations disabled for '{spec.name}': {str(e)}")
+        return None, None
+    explain_batcher = MicroBatcher(
+        explainer.explain_packed,
+        max_batch_size=BATCH_MAX_SIZE,
+        max_wait_ms=BATCH_MAX_WAIT_MS,
+        name=f"{spec.name}-gradcam"
+    ).start()
+    print(f"✅ Grad-CAM explanations enabled for '{spec.name}' (heatmap {explainer.heatmap_shape[0]}x{explainer.heatmap_shape[1]})")
+    return explainer, explain_batcher
+
+def load_served_model(spec):
+    # Registry load_fn for models loaded on demand (the first request routed to them waits for this)
+    loaded = load_model(spec)
+    try:
+        warm_up_model(loaded)
+    except Exception:
+        stop = getattr(loaded[0], "stop", None)
+        if stop is not None:
+            stop()
+        raise
+    return build_served_model(spec, loaded)
+
+def activate_model(loaded):
+    model_registry.add(build_served_model(THERMAL_MODEL, loaded))
+
+# --- MICRO-BATCHING ---
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", 16))
+BATCH_MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", 5))
+
+# --- MODEL BACKEND ---
+# MODEL_BACKEND=tflite serves <model>.tflite produced by export_model.py instead of <model>.keras
+MODEL_BACKEND = os.environ.get("MODEL_BACKEND", "keras").lower()
+# Directory holding thermal.keras / mri.keras (or their .tflite exports); defaults to the directory of app.py
+MODEL_DIR = os.environ.get("MODEL_DIR", os.path.dirname(os.path.abspath(__file__)))
 
-model = load_model_file()
+# --- INFERENCE WORKERS ---
+# INFERENCE_WORKERS > 0 moves inference into that many worker processes, each with its own model copy
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", 0))
+INFERENCE_INTRA_OP_THREADS = int(os.environ.get("INFERENCE_INTRA_OP_THREADS", 0))
+INFERENCE_INTER_OP_THREADS = int(os.environ.get("INFERENCE_INTER_OP_THREADS", 0))
+
+# --- PREDICTION CACHE ---
+# Results are keyed on the uploaded bytes plus MODEL_VERSION and a hash of the model file
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", 1024))
+PREDICTION_CACHE_DIR = os.environ.get("PREDICTION_CACHE_DIR")
+MODEL_VERSION = os.environ.get("MODEL_VERSION", "1")
+
+# --- TEST-TIME AUGMENTATION ---
+# TTA_VIEWS (e.g. "identity,hflip,vflip,rot90", or a count) averages /predict over augmented views.
+# TTA_BUDGET_MS caps the per-image latency: fewer views run when the measured cost would exceed it.
+TTA_VIEWS = os.environ.get("TTA_VIEWS", "")
+TTA_AGGREGATE = os.environ.get("TTA_AGGREGATE", "mean")
+TTA_BUDGET_MS = float(os.environ.get("TTA_BUDGET_MS", 0))
+tta = TestTimeAugmentation(TTA_VIEWS, aggregate=TTA_AGGREGATE) if TTA_VIEWS else None
+
+# --- EXPLANATIONS ---
+# `explain=1` on /predict or /predict/batch adds a Grad-CAM overlay (base64 PNG) computed in the same batched
+# pass as the prediction. Needs the in-process Keras backend (MODEL_BACKEND=keras, INFERENCE_WORKERS=0).
+EXPLAIN_ENABLED = os.environ.get("EXPLAIN_ENABLED", "1") == "1"
+EXPLAIN_ALPHA = float(os.environ.get("EXPLAIN_ALPHA", 0.45))
+EXPLAIN_PNG_COLORS = int(os.environ.get("EXPLAIN_PNG_COLORS", 64))
+EXPLAIN_CACHE_VARIANT = ":gradcam"
+
+# --- MODEL REGISTRY ---
+# Requests are routed by the image_type form field; anything without its own model goes to the thermal model.
+# The thermal model loads at startup; others load on first use. MODEL_MAX_LOADED / MODEL_MEMORY_LIMIT_MB
+# (estimated from model file sizes) unload the least recently used on-demand models.
+THERMAL_MODEL = ModelSpec("thermal", "thermal", ["Benign", "Malignant"], output="softmax", image_types=["thermal"])
+MRI_MODEL = ModelSpec("mri", "mri", ["Healthy", "Sick"], output="sigmoid", image_types=["mri"])
+MODEL_MAX_LOADED = int(os.environ.get("MODEL_MAX_LOADED", 0))
+MODEL_MEMORY_LIMIT_MB = float(os.environ.get("MODEL_MEMORY_LIMIT_MB", 0))
+
+model_registry = ModelRegistry(
+    [THERMAL_MODEL, MRI_MODEL],
+    default=THERMAL_MODEL.name,
+    load_fn=load_served_model,
+    is_available=lambda spec: model_path_for(spec) is not None,
+    max_loaded=MODEL_MAX_LOADED,
+    memory_limit_mb=MODEL_MEMORY_LIMIT_MB
+)
+
+model_loader = BackgroundModelLoader(
+    load_thermal_model,
+    warmup_fn=warm_up_model,
+    on_ready=activate_model,
+    name="thermal model"
+)
+# Only the server process loads the model
+if not IN_INFERENCE_WORKER:
+    model_loader.start()
 
 # --- IMAGE PREPROCESSING ---
+# Shared with the training and evaluation code in models/; /predict decodes upload bytes in memory (decode_image + normalize_pixels)
 def preprocess_image(file_path, target_size=(224, 224)):
-    img = image.load_img(file_path, target_size=target_size)
-    img_array = image.img_to_array(img)
-    img_array = np.expand_dims(img_array, axis=0)
-    img_array = img_array / 255.0
-    return img_array
+    with stage("preprocess"):
+        return preprocess_file(file_path, target_size)
 
 # --- PREDICTION ---
-def get_prediction(image_array):
-    try:
-        prediction = model.predict(image_array)
-        malignant_prob = float(prediction[0][1]) * 100
-        benign_prob = float(prediction[0][0]) * 100
-        return [
-            {"name": "Benign", "value": round(benign_prob, 2)},
-            {"name": "Malignant", "value": round(malignant_prob, 2)}
-        ]
+def format_diagnosis(probabilities, class_names=("Benign", "Malignant")):
+    return [
+        {"name": name, "value": round(float(probability) * 100, 2)}
+        for name, probability in zip(class_names, probabilities)
+    ]
+
+def tta_cache_variant(tta_views):
+    # TTA results are cached apart from plain predictions and from other view sets
+    return f":tta={','.join(tta_views)}:{TTA_AGGREGATE}" if tta_views else ""
+
+def read_flag(form, name):
+    return form.get(name, "").strip().lower() in ("1", "true", "yes", "on")
+
+def build_explanation(served, pixels, heatmap, probabilities):
+    """JSON-ready Grad-CAM result: the explained class and its overlay as a base64 PNG."""
+    png = heatmap_overlay_png(pixels, heatmap, alpha=EXPLAIN_ALPHA, colors=EXPLAIN_PNG_COLORS)
+    return {
+        "method": "grad-cam",
+        "class": served.spec.class_names[int(np.argmax(probabilities))],
+        "overlay_png": base64.b64encode(png).decode("ascii"),
+        "heatmap_size": list(served.explainer.heatmap_shape),
+    }
+
+def get_prediction(served, image_array, tta_views=None):
+    try:
+        with inference_duration.time(model=served.spec.name):
+            if tta_views:
+                # All views of the image go to the batcher together, as one group
+                prediction = tta.predict(served.predict, image_array, max_batch_size=BATCH_MAX_SIZE, views=tta_views)
+            else:
+                prediction = served.predict(image_array)
+        return format_diagnosis(prediction[0], served.spec.class_names)
     except Exception as e:
-        print(f"❌ Prediction error: {e}")
+        log_error("inference", f"Prediction error: {e}")
         return None
 
 # --- REPORT GENERATION ---
-def generate_detailed_report(patient_data, diagnosis_results):
-    try:
-        age = patient_data.get('age', 'N/A')
-        image_type = patient_data.get('image_type', 'N/A')
-        has_lump = patient_data.get('lump', 'N/A')
-        family_history = patient_data.get('family', 'N/A')
-        breast_density = patient_data.get('density', 'N/A')
+# With LLM_FALLBACK=1 (default), a section whose completion fails is replaced by a clearly labelled template;
+# with LLM_FALLBACK=0 the error is raised to the caller, which reports the section as failed
+LLM_FALLBACK = os.environ.get("LLM_FALLBACK", "1") == "1"
 
-        benign_prob = next((x['value'] for x in diagnosis_results if x['name'] == 'Benign'), 0)
-        malignant_prob = next((x['value'] for x in diagnosis_results if x['name'] == 'Malignant'), 0)
+def diagnosis_probabilities(diagnosis_results):
+    """((name, %), (name, %)) for the negative and positive class, e.g. Benign/Malignant or Healthy/Sick."""
+    if len(diagnosis_results) < 2:
+        return ("Benign", 0), ("Malignant", 0)
+    return tuple((x['name'], x['value']) for x in diagnosis_results[:2])
 
-        prompt = f"""As a medical AI assistant, generate a detailed diagnostic report and recommendations based on the following breast cancer screening information:
+def fallback_section(operation, patient_data, diagnosis_results):
+    if not LLM_FALLBACK:
+        return None
+    llm_fallbacks_total.inc(operation=operation)
+    template = fallback_report if operation == "detailed_report" else fallback_recommendations
+    return template(patient_data, *diagnosis_probabilities(diagnosis_results))
+
+def build_report_request(patient_data, diagnosis_results):
+    age = patient_data.get('age', 'N/A')
+    image_type = patient_data.get('image_type', 'N/A')
+    has_lump = patient_data.get('lump', 'N/A')
+    family_history = patient_data.get('family', 'N/A')
+    breast_density = patient_data.get('density', 'N/A')
+
+    (negative_name, negative_prob), (positive_name, positive_prob) = diagnosis_probabilities(diagnosis_results)
+    if LLM_CACHE_PROB_BUCKET:
+        positive_prob = bucket_probability(positive_prob, LLM_CACHE_PROB_BUCKET)
+        negative_prob = round(100 - positive_prob, 2)
+
+    prompt = f"""As a medical AI assistant, generate a detailed diagnostic report and recommendations based on the following breast cancer screening information:
 
 Patient Profile:
 - Age: {age} years
@@ -92,8 +547,8 @@ Patient Profile:
 - Breast Density: {breast_density}
 
 AI Analysis Results:
-- Benign Probability: {benign_prob}%
-- Malignant Probability: {malignant_prob}%
+- {negative_name} Probability: {negative_prob}%
+- {positive_name} Probability: {positive_prob}%
 
 Please provide:
 1. A detailed diagnostic assessment
@@ -104,28 +559,37 @@ Please provide:
 
 Format the response in a clear, professional medical report style."""
 
-        completion = groq_client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": "You are a specialized medical AI assistant focused on breast cancer diagnosis and recommendations."},
-                {"role": "user", "content": prompt}
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.5,
-            max_tokens=1024
+    return {
+        "messages": [
+            {"role": "system", "content": "You are a specialized medical AI assistant focused on breast cancer diagnosis and recommendations."},
+            {"role": "user", "content": prompt}
+        ],
+        "model": "llama-3.3-70b-versatile",
+        "temperature": 0.5,
+        "max_tokens": 1024
+    }
+
+def generate_detailed_report(patient_data, diagnosis_results, timeout=None):
+    try:
+        return create_completion(
+            **build_report_request(patient_data, diagnosis_results), timeout=timeout, operation="detailed_report"
         )
-        return completion.choices[0].message.content
     except Exception as e:
-        print(f"❌ Error generating detailed report: {e}")
-        return None
+        log_error("llm", f"Error generating detailed report: {e}")
+        fallback = fallback_section("detailed_report", patient_data, diagnosis_results)
+        if fallback is None:
+            raise
+        return fallback
 
 # --- RECOMMENDATION GENERATION ---
-def generate_recommendations(patient_data, diagnosis_results):
-    try:
-        malignant_prob = next((x['value'] for x in diagnosis_results if x['name'] == 'Malignant'), 0)
-        age = patient_data.get('age', 'N/A')
-        family_history = patient_data.get('family', 'N/A')
+def build_recommendations_request(patient_data, diagnosis_results):
+    _, (_, malignant_prob) = diagnosis_probabilities(diagnosis_results)
+    if LLM_CACHE_PROB_BUCKET:
+        malignant_prob = bucket_probability(malignant_prob, LLM_CACHE_PROB_BUCKET)
+    age = patient_data.get('age', 'N/A')
+    family_history = patient_data.get('family', 'N/A')
 
-        prompt = f"""Based on the following patient information and AI analysis results, provide specific, prioritized recommendations:
+    prompt = f"""Based on the following patient information and AI analysis results, provide specific, prioritized recommendations:
 
 Patient Details:
 - Age: {age}
@@ -140,108 +604,931 @@ Please provide 5 specific recommendations, each with:
 
 Format as a structured list suitable for medical professionals."""
 
-        completion = groq_client.chat.completions.create(
-            messages=[
-                {"role": "system", "content": "You are a medical AI specialist in breast cancer care recommendations."},
-                {"role": "user", "content": prompt}
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.3,
-            max_tokens=1024
+    return {
+        "messages": [
+            {"role": "system", "content": "You are a medical AI specialist in breast cancer care recommendations."},
+            {"role": "user", "content": prompt}
+        ],
+        "model": "llama-3.3-70b-versatile",
+        "temperature": 0.3,
+        "max_tokens": 1024
+    }
+
+def generate_recommendations(patient_data, diagnosis_results, timeout=None):
+    try:
+        return create_completion(
+            **build_recommendations_request(patient_data, diagnosis_results), timeout=timeout,
+            operation="detailed_recommendations"
         )
-        return completion.choices[0].message.content
     except Exception as e:
-        print(f"❌ Error generating recommendations: {e}")
-        return None
+        log_error("llm", f"Error generating recommendations: {e}")
+        fallback = fallback_section("detailed_recommendations", patient_data, diagnosis_results)
+        if fallback is None:
+            raise
+        return fallback
+
+# --- REPORT SECTIONS ---
+def generate_report_sections(patient_data, diagnosis):
+    """Run both completions side by side; raises ParallelCallError if either fails."""
+    return run_parallel({
+        "detailed_report": (
+            lambda: generate_detailed_report(patient_data, diagnosis, timeout=LLM_TIMEOUT),
+            LLM_TIMEOUT
+        ),
+        "detailed_recommendations": (
+            lambda: generate_recommendations(patient_data, diagnosis, timeout=LLM_TIMEOUT),
+            LLM_TIMEOUT
+        ),
+    }, llm_executor)
+
+# --- STREAMING HELPERS ---
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def sse_response(events):
+    return Response(
+        stream_with_context(events),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+def stream_timings(started, first_token):
+    finished = time.perf_counter()
+    timings = {"total_ms": round((finished - started) * 1000, 2)}
+    if first_token is not None:
+        timings["ttfb_ms"] = round((first_token - started) * 1000, 2)
+        print(f"⏱️ Stream time to first token: {timings['ttfb_ms']} ms (total {timings['total_ms']} ms)")
+    return timings
 
 # --- CHAT ENDPOINT ---
+def build_chat_request(user_input):
+    return {
+        "model": "llama-3.3-70b-versatile",
+        "messages": [
+            {"role": "system", "content": "You are a helpful and knowledgeable AI assistant that provides answers about breast cancer diagnosis, treatment options, and patient guidance."},
+            {"role": "user", "content": user_input}
+        ]
+    }
+
 @app.route("/api/groq-chat", methods=["POST"])
 def groq_chat():
-    data = request.get_json()
+    with stage("upload"):
+        data = request.get_json()
     user_input = data.get("message", "")
 
     if not user_input.strip():
         return jsonify({"reply": "Please enter a valid message."}), 400
 
     try:
-        response = groq_client.chat.completions.create(
-            model="llama-3.3-70b-versatile",
-            messages=[
-                {"role": "system", "content": "You are a helpful and knowledgeable AI assistant that provides answers about breast cancer diagnosis, treatment options, and patient guidance."},
-                {"role": "user", "content": user_input}
-            ],
-        )
-        ai_reply = response.choices[0].message.content
-        return jsonify({"reply": ai_reply})
+        with stage("llm"):
+            ai_reply = create_completion(**build_chat_request(user_input), use_cache=False, operation="chat")
+        with stage("serialize"):
+            return jsonify({"reply": ai_reply})
     except Exception as e:
-        print(f"❌ Groq API Error: {e}")
+        log_error("llm", f"Groq API Error: {e}")
         return jsonify({"reply": "Sorry, I couldn't process your request. Please try again later."}), 500
 
+@app.route("/api/groq-chat/stream", methods=["POST"])
+def groq_chat_stream():
+    started = time.perf_counter()
+    data = request.get_json()
+    user_input = data.get("message", "")
+
+    if not user_input.strip():
+        return jsonify({"reply": "Please enter a valid message."}), 400
+
+    def events():
+        first_token = None
+        try:
+            for delta in stream_completion(**build_chat_request(user_input), timeout=LLM_TIMEOUT, use_cache=False,
+                                           operation="chat"):
+                if first_token is None:
+                    first_token = time.perf_counter()
+                yield sse_event("delta", {"delta": delta})
+        except Exception as e:
+            log_error("llm", f"Groq API Error: {e}")
+            yield sse_event("error", {"reply": "Sorry, I couldn't process your request. Please try again later."})
+            return
+        yield sse_event("done", stream_timings(started, first_token))
+
+    return sse_response(events())
+
+# --- HEALTH ENDPOINTS ---
+def model_unavailable_response():
+    """503 response while the model is loading (or failed to load), otherwise None."""
+    if model_loader.ready:
+        return None
+    status = model_loader.status()
+    if status["state"] == BackgroundModelLoader.FAILED:
+        message = "Model failed to load"
+    else:
+        message = "Model is still loading, please retry shortly"
+    response = jsonify({"error": message, "model": status})
+    response.headers["Retry-After"] = "5"
+    return response, 503
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    # Liveness: the process is up and serving, whatever the model state
+    return jsonify({"status": "ok", "model": model_loader.status()})
+
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    status = model_loader.status()
+    if not model_loader.ready:
+        return jsonify({"status": "not_ready", "model": status}), 503
+    return jsonify({"status": "ready", "model": status})
+
+# --- BATCHING METRICS ENDPOINT ---
+# Per-model endpoints report on the thermal model unless ?model=<name> picks another loaded model
+def metrics_model():
+    return model_registry.loaded(request.args.get("model", model_registry.default))
+
+@app.route("/api/metrics/batching", methods=["GET"])
+def batching_metrics():
+    error = model_unavailable_response()
+    if error:
+        return error
+    served = metrics_model()
+    if served is None:
+        return jsonify({"error": "Model is not loaded"}), 404
+    return jsonify(served.batcher.stats())
+
+@app.route("/api/metrics/workers", methods=["GET"])
+def worker_metrics():
+    served = metrics_model()
+    if served is None or not isinstance(served.model, InferenceWorkerPool):
+        return jsonify({"enabled": False})
+    return jsonify(dict(served.model.stats(), enabled=True))
+
+@app.route("/api/metrics/cache", methods=["GET"])
+def cache_metrics():
+    served = metrics_model()
+    if served is None or served.prediction_cache is None:
+        return jsonify({"enabled": False})
+    return jsonify(dict(served.prediction_cache.stats(), enabled=True))
+
+@app.route("/api/metrics/models", methods=["GET"])
+def model_metrics():
+    return jsonify(model_registry.stats())
+
+@app.route("/api/metrics/tta", methods=["GET"])
+def tta_metrics():
+    if tta is None:
+        return jsonify({"enabled": False})
+    return jsonify(dict(tta.stats(), enabled=True, budget_ms=TTA_BUDGET_MS))
+
+@app.route("/api/metrics/explain", methods=["GET"])
+def explain_metrics():
+    served = metrics_model()
+    if served is None or not served.can_explain:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, "heatmap_size": list(served.explainer.heatmap_shape),
+                    "batching": served.explain_batcher.stats()})
+
+@app.route("/api/metrics/reports", methods=["GET"])
+def report_metrics():
+    return jsonify(report_store.stats())
+
+@app.route("/api/metrics/llm-client", methods=["GET"])
+def llm_client_metrics():
+    return jsonify(dict(groq_client.stats(), fallback_enabled=LLM_FALLBACK))
+
+@app.route("/api/metrics/llm-cache", methods=["GET"])
+def llm_cache_metrics():
+    if response_cache is None:
+        return jsonify({"enabled": False})
+    return jsonify(dict(response_cache.stats(), enabled=True, probability_bucket=LLM_CACHE_PROB_BUCKET))
+
+# --- PROMETHEUS METRICS ENDPOINT ---
+# State that is already tracked elsewhere (micro-batchers, caches, report store) is read at scrape time
+def per_model(read):
+    return lambda: [({"model": served.spec.name}, read(served)) for served in model_registry.loaded_models()]
+
+def prediction_cache_counter(field):
+    return lambda: [
+        ({"model": served.spec.name}, served.prediction_cache.stats()[field])
+        for served in model_registry.loaded_models() if served.prediction_cache is not None
+    ]
+
+def llm_cache_counter(field):
+    return lambda: [({}, response_cache.stats()[field])] if response_cache is not None else []
+
+metrics.collected("model_loaded", "Models currently loaded.", "gauge", per_model(lambda served: 1))
+metrics.collected("model_requests_in_flight", "Requests holding each model.", "gauge",
+                  per_model(lambda served: served.in_flight))
+metrics.collected("batch_queue_depth", "Images waiting in each model's micro-batcher.", "gauge",
+                  per_model(lambda served: served.batcher.stats()["queue_depth"]))
+metrics.collected("batches_in_flight", "Batches running in each model.", "gauge",
+                  per_model(lambda served: served.batcher.stats()["batches_in_flight"]))
+metrics.collected("prediction_cache_hits_total", "Prediction cache hits.", "counter", prediction_cache_counter("hits"))
+metrics.collected("prediction_cache_misses_total", "Prediction cache misses.", "counter",
+                  prediction_cache_counter("misses"))
+metrics.collected("llm_cache_hits_total", "LLM response cache hits.", "counter", llm_cache_counter("hits"))
+metrics.collected("llm_cache_misses_total", "LLM response cache misses.", "counter", llm_cache_counter("misses"))
+metrics.collected("reports_pending", "Deferred reports not finished yet.", "gauge",
+                  lambda: [({}, report_store.stats()["pending"])])
+metrics.collected("jobs", "Prediction jobs by status.", "gauge",
+                  lambda: [({"status": status}, count) for status, count in job_store.counts().items()])
+metrics.collected("llm_client_retries_total", "Groq calls retried after a 429, 5xx or connection error.", "counter",
+                  lambda: [({}, groq_client.stats()["retries"])])
+metrics.collected("llm_client_rejected_total", "Groq calls rejected locally (circuit open or limits).", "counter",
+                  lambda: [({}, groq_client.stats()["rejected"])])
+metrics.collected("llm_client_throttled_seconds_total", "Time spent waiting for the RPM/TPM limits.", "counter",
+                  lambda: [({}, groq_client.stats()["throttled_seconds"])])
+metrics.collected("llm_circuit_open", "1 while the Groq circuit breaker is open or half-open.", "gauge",
+                  lambda: [({}, 0 if groq_client.breaker.state == CircuitBreaker.CLOSED else 1)])
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return Response(metrics.render(), mimetype=None, content_type=metrics.CONTENT_TYPE)
+
+# --- SAMPLING PROFILER ---
+# PROFILER_ENABLED=1 exposes /debug/profiler to start and stop a sampling profiler at runtime;
+# PROFILER_AUTOSTART=1 also starts it with the server. It samples every thread's stack every PROFILER_INTERVAL_MS.
+PROFILER_ENABLED = os.environ.get("PROFILER_ENABLED", "0") == "1"
+profiler = SamplingProfiler(interval=float(os.environ.get("PROFILER_INTERVAL_MS", 10)) / 1000)
+if PROFILER_ENABLED and os.environ.get("PROFILER_AUTOSTART", "0") == "1" and not IN_INFERENCE_WORKER:
+    profiler.start()
+
+@app.route("/debug/profiler", methods=["GET"])
+def profiler_report():
+    """Profiler state and the hottest frames; ?format=folded returns collapsed stacks for flame graphs."""
+    if not PROFILER_ENABLED:
+        return jsonify({"error": "Profiler is disabled, set PROFILER_ENABLED=1"}), 404
+    if request.args.get("format") == "folded":
+        return Response(profiler.folded(), mimetype="text/plain")
+    return jsonify(dict(profiler.stats(), top=profiler.top(int(request.args.get("limit", 25)))))
+
+@app.route("/debug/profiler/<action>", methods=["POST"])
+def profiler_control(action):
+    if not PROFILER_ENABLED:
+        return jsonify({"error": "Profiler is disabled, set PROFILER_ENABLED=1"}), 404
+    if action == "start":
+        interval_ms = request.args.get("interval_ms")
+        started = profiler.start(interval=float(interval_ms) / 1000 if interval_ms else None)
+        return jsonify(dict(profiler.stats(), changed=started))
+    if action == "stop":
+        stopped = profiler.stop()
+        return jsonify(dict(profiler.stats(), changed=stopped))
+    return jsonify({"error": "action must be start or stop"}), 404
+
 # --- PREDICT ENDPOINT ---
+def read_patient_data(form):
+    return {
+        "age": form.get("age", "N/A"),
+        "image_type": form.get("image_type", "N/A"),
+        "lump": form.get("lump", "N/A"),
+        "family": form.get("family", "N/A"),
+        "density": form.get("density", "N/A")
+    }
+
+def model_load_error_response(model_name, error):
+    log_error("model_load", f"Error loading model '{model_name}': {error}")
+    response = jsonify({"error": f"Model '{model_name}' is unavailable", "model": model_name})
+    response.headers["Retry-After"] = "5"
+    return response, 503
+
+def diagnose_upload(image_bytes, model_name=None):
+    """Return (diagnosis, None) for the uploaded bytes, or (None, error response)."""
+    model_name = model_name or model_registry.default
+    try:
+        with model_registry.use(model_name) as served:
+            return diagnose_with(served, image_bytes)
+    except Exception as e:
+        return None, model_load_error_response(model_name, e)
+
+def diagnose_and_explain(image_bytes, model_name=None):
+    """Return (diagnosis, explanation, None), or (None, None, error response).
+
+    The explanation is None when the model cannot be explained (see EXPLAIN_ENABLED).
+    """
+    model_name = model_name or model_registry.default
+    try:
+        with model_registry.use(model_name) as served:
+            if not served.can_explain:
+                diagnosis, error = diagnose_with(served, image_bytes)
+                return diagnosis, None, error
+            return explain_with(served, image_bytes)
+    except Exception as e:
+        return None, None, model_load_error_response(model_name, e)
+
+def explain_with(served, image_bytes):
+    tta_views = tta.plan(TTA_BUDGET_MS) if tta else None
+    variant = tta_cache_variant(tta_views)
+    prediction_cache = served.prediction_cache
+    diagnosis = prediction_cache.get(image_bytes, variant) if prediction_cache else None
+    explanation = prediction_cache.get(image_bytes, EXPLAIN_CACHE_VARIANT) if prediction_cache else None
+    if diagnosis is not None and explanation is not None:
+        explanations_total.inc(model=served.spec.name, cached="true")
+        return diagnosis, explanation, None
+
+    try:
+        with stage("decode"):
+            pixels = decode_image(image_bytes)
+        with stage("preprocess"):
+            processed_image = normalize_pixels(pixels, out=get_buffer())
+    except Exception as e:
+        errors_total.inc(stage="preprocess")
+        return None, None, (jsonify({"error": f"Error preprocessing image: {str(e)}"}), 500)
+
+    try:
+        # One forward pass gives the probabilities, the backward pass through the head the heatmap
+        with stage("inference"), inference_duration.time(model=served.spec.name):
+            probabilities, heatmaps = served.explain(processed_image)
+        with stage("explain"):
+            explanation = build_explanation(served, pixels, heatmaps[0], probabilities[0])
+    except Exception as e:
+        log_error("explain", f"Explanation error: {e}")
+        diagnosis, error = diagnose_with(served, image_bytes)
+        return diagnosis, None, error
+    explanations_total.inc(model=served.spec.name, cached="false")
+
+    if diagnosis is None:
+        if tta_views:
+            # TTA diagnoses average several views; the heatmap explains the unaugmented image
+            with stage("inference"):
+                diagnosis = get_prediction(served, processed_image, tta_views)
+            if diagnosis is None:
+                return None, None, (jsonify({"error": "Prediction failed"}), 500)
+        else:
+            diagnosis = format_diagnosis(probabilities[0], served.spec.class_names)
+    if prediction_cache:
+        prediction_cache.put(image_bytes, diagnosis, variant)
+        prediction_cache.put(image_bytes, explanation, EXPLAIN_CACHE_VARIANT)
+    return diagnosis, explanation, None
+
+def diagnose_with(served, image_bytes):
+    tta_views = tta.plan(TTA_BUDGET_MS) if tta else None
+    variant = tta_cache_variant(tta_views)
+    prediction_cache = served.prediction_cache
+    diagnosis = prediction_cache.get(image_bytes, variant) if prediction_cache else None
+    if diagnosis is not None:
+        return diagnosis, None
+
+    # Decode straight from the upload bytes; no temporary file is written
+    try:
+        with stage("decode"):
+            pixels = decode_image(image_bytes)
+        with stage("preprocess"):
+            processed_image = normalize_pixels(pixels, out=get_buffer())
+    except Exception as e:
+        errors_total.inc(stage="preprocess")
+        return None, (jsonify({"error": f"Error preprocessing image: {str(e)}"}), 500)
+
+    with stage("inference"):
+        diagnosis = get_prediction(served, processed_image, tta_views)
+    if diagnosis is None:
+        return None, (jsonify({"error": "Prediction failed"}), 500)
+
+    if prediction_cache:
+        prediction_cache.put(image_bytes, diagnosis, variant)
+    return diagnosis, None
+
+def validate_upload():
+    """Return (file, None) for the request's image upload, or (None, error response)."""
+    if 'image' not in request.files:
+        return None, (jsonify({"error": "No image uploaded"}), 400)
+
+    file = request.files['image']
+    if file.filename == '':
+        return None, (jsonify({"error": "No file selected"}), 400)
+
+    error = model_unavailable_response()
+    if error:
+        return None, error
+    return file, None
+
+# --- PREDICT DEADLINES ---
+# The diagnosis is returned as soon as it is ready; report sections are included only if they finish
+# before the request's deadline (form field `deadline_ms`, default PREDICT_DEADLINE_MS, counted from
+# the request's arrival; 0 waits up to LLM_TIMEOUT). Sections still running are tracked by the report
+# store and fetched later from /reports/<report_id>. `reports=deferred` returns without waiting and
+# `reports=none` skips the LLM entirely.
+PREDICT_DEADLINE_MS = float(os.environ.get("PREDICT_DEADLINE_MS", 0))
+PREDICT_REPORT_MODES = ("inline", "deferred", "none")
+
+def read_predict_options(form):
+    """(reports mode, deadline in ms) from the form; raises ValueError for invalid values."""
+    reports_mode = form.get("reports", "inline").lower()
+    if reports_mode not in PREDICT_REPORT_MODES:
+        raise ValueError(f"reports must be one of: {', '.join(PREDICT_REPORT_MODES)}")
+    deadline_ms = float(form.get("deadline_ms") or PREDICT_DEADLINE_MS)
+    if deadline_ms < 0:
+        raise ValueError("deadline_ms must not be negative")
+    return reports_mode, deadline_ms
+
+def report_sections_within(patient_data, diagnosis, model_name, reports_mode, deadline_ms):
+    """Generate both sections, waiting at most until the deadline.
+
+    Returns (sections, statuses, report_id): the text of each finished section,
+    its ReportStore.SECTION_* status and, if any section is still pending, the id
+    to fetch it from /reports/<report_id> later.
+    """
+    names = ("detailed_report", "detailed_recommendations")
+    if reports_mode == "none":
+        return dict.fromkeys(names), dict.fromkeys(names, ReportStore.SECTION_OMITTED), None
+
+    futures = {
+        "detailed_report": llm_executor.submit(generate_detailed_report, patient_data, diagnosis, LLM_TIMEOUT),
+        "detailed_recommendations": llm_executor.submit(
+            generate_recommendations, patient_data, diagnosis, LLM_TIMEOUT
+        ),
+    }
+    if reports_mode == "deferred":
+        remaining = 0
+    elif deadline_ms:
+        remaining = max(deadline_ms - g.stage_timings.total_ms(), 0) / 1000
+    else:
+        remaining = LLM_TIMEOUT
+    wait(futures.values(), timeout=remaining)
+
+    sections, statuses = {}, {}
+    for name, future in futures.items():
+        if not future.done():
+            sections[name] = None
+            statuses[name] = ReportStore.SECTION_PENDING
+        elif future.exception() is not None:
+            sections[name] = None
+            statuses[name] = ReportStore.SECTION_FAILED
+        else:
+            sections[name] = future.result()
+            statuses[name] = ReportStore.section_status(sections[name])
+        report_sections_total.inc(section=name, status=statuses[name])
+
+    report_id = None
+    if ReportStore.SECTION_PENDING in statuses.values():
+        report_id = report_store.track(futures, context={"diagnosis": diagnosis, "model": model_name})
+    return sections, statuses, report_id
+
 @app.route("/predict", methods=["POST"])
 def predict():
     try:
-        print("Received files:", request.files)
-        print("Received form data:", request.form)
+        # Reading request.files parses the multipart body, so the upload stage starts here
+        with stage("upload"):
+            file, error = validate_upload()
+            if error:
+                return error
+            image_bytes = file.read()
 
-        if 'image' not in request.files:
-            return jsonify({"error": "No image uploaded"}), 400
+        try:
+            reports_mode, deadline_ms = read_predict_options(request.form)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
 
-        file = request.files['image']
-        if file.filename == '':
-            return jsonify({"error": "No file selected"}), 400
+        patient_data = read_patient_data(request.form)
+        model_name = model_registry.route(patient_data["image_type"])
+        explain = read_flag(request.form, "explain")
+        print(f"📥 /predict: {file.filename} ({len(image_bytes)} bytes), image_type={patient_data['image_type']}, "
+              f"model={model_name}, reports={reports_mode}, deadline_ms={deadline_ms:g}, explain={explain}")
 
-        if model is None:
-            return jsonify({"error": "Model not loaded"}), 500
+        if explain:
+            diagnosis, explanation, error = diagnose_and_explain(image_bytes, model_name)
+        else:
+            diagnosis, error = diagnose_upload(image_bytes, model_name)
+        if error:
+            return error
 
-        patient_data = {
-            "age": request.form.get("age", "N/A"),
-            "image_type": request.form.get("image_type", "N/A"),
-            "lump": request.form.get("lump", "N/A"),
-            "family": request.form.get("family", "N/A"),
-            "density": request.form.get("density", "N/A")
-        }
+        # Both completions run side by side; a slow or failed one never holds back the diagnosis
+        with stage("llm"):
+            sections, statuses, report_id = report_sections_within(
+                patient_data, diagnosis, model_name, reports_mode, deadline_ms
+            )
 
-        image_name = file.filename
-        temp_path = os.path.join(os.getcwd(), f"temp_{image_name}")
-        file.save(temp_path)
+        with stage("serialize"):
+            response = {
+                "diagnosis": diagnosis,
+                "model": model_name,
+                "detailed_report": sections["detailed_report"],
+                "detailed_recommendations": sections["detailed_recommendations"],
+                "sections": statuses
+            }
+            if report_id:
+                response["report_id"] = report_id
+            if explain:
+                response["explanation"] = explanation
+            return jsonify(response)
+    except Exception as e:
+        log_error("unexpected", f"Unexpected error: {str(e)}")
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/predict/stream", methods=["POST"])
+def predict_stream():
+    """Same inputs as /predict; the diagnosis is sent first, then both report sections stream in."""
+    started = time.perf_counter()
+    try:
+        file, error = validate_upload()
+        if error:
+            return error
 
-        if not os.path.exists(temp_path):
-            return jsonify({"error": "Failed to save uploaded file"}), 500
+        patient_data = read_patient_data(request.form)
+        model_name = model_registry.route(patient_data["image_type"])
+
+        diagnosis, error = diagnose_upload(file.read(), model_name)
+        if error:
+            return error
+    except Exception as e:
+        log_error("unexpected", f"Unexpected error: {str(e)}")
+        return jsonify({"error": str(e)}), 500
 
+    def events():
+        yield sse_event("diagnosis", {"diagnosis": diagnosis, "model": model_name})
+        first_token = None
         try:
-            processed_image = preprocess_image(temp_path)
-        except Exception as e:
-            return jsonify({"error": f"Error preprocessing image: {str(e)}"}), 500
+            sections = run_parallel_streams({
+                "detailed_report": lambda: stream_completion(
+                    **build_report_request(patient_data, diagnosis), timeout=LLM_TIMEOUT,
+                    operation="detailed_report"
+                ),
+                "detailed_recommendations": lambda: stream_completion(
+                    **build_recommendations_request(patient_data, diagnosis), timeout=LLM_TIMEOUT,
+                    operation="detailed_recommendations"
+                ),
+            }, llm_executor, timeout=LLM_TIMEOUT)
+            for section, delta in sections:
+                if delta is None:
+                    yield sse_event("section_done", {"section": section})
+                    continue
+                if first_token is None:
+                    first_token = time.perf_counter()
+                yield sse_event("delta", {"section": section, "delta": delta})
+        except ParallelCallError as e:
+            log_error("report", f"LLM generation error: {e}")
+            yield sse_event("error", {"error": "Failed to generate detailed report"})
+            return
+        yield sse_event("done", stream_timings(started, first_token))
+
+    return sse_response(events())
+
+# --- BATCH PREDICT ENDPOINT ---
+BATCH_MAX_IMAGES = int(os.environ.get("BATCH_MAX_IMAGES", 1000))
+BATCH_CHUNK_SIZE = int(os.environ.get("BATCH_CHUNK_SIZE", 64))
+BATCH_INLINE_REPORT_LIMIT = int(os.environ.get("BATCH_INLINE_REPORT_LIMIT", 20))
+BATCH_MAX_MEMBER_BYTES = int(os.environ.get("BATCH_MAX_MEMBER_BYTES", 50 * 1024 * 1024))
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff")
+
+preprocess_executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get("PREPROCESS_WORKERS", os.cpu_count() or 4)),
+    thread_name_prefix="preprocess"
+)
+# Deferred reports get their own small pool so a large batch cannot starve interactive requests
+report_store = ReportStore(
+    ThreadPoolExecutor(
+        max_workers=int(os.environ.get("REPORT_WORKERS", 2)),
+        thread_name_prefix="reports"
+    ),
+    ttl=float(os.environ.get("REPORT_TTL", 86400))
+)
+
+def collect_batch_items():
+    """Return [(filename, read_bytes)] for the uploaded `images` files and `archive` zip members.
+
+    Uploads are read up front because Werkzeug closes them once the view returns,
+    before the streamed response body is produced; zip members are decompressed lazily.
+    """
+    items = []
+    for file in request.files.getlist("images"):
+        if file.filename:
+            items.append((file.filename, lambda data=file.read(): data))
 
-        diagnosis = get_prediction(processed_image)
-        if diagnosis is None:
-            return jsonify({"error": "Prediction failed"}), 500
+    archive = request.files.get("archive")
+    if archive is not None and archive.filename:
+        bundle = zipfile.ZipFile(io.BytesIO(archive.read()))
+        for member in bundle.infolist():
+            if member.is_dir() or not member.filename.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            if os.path.basename(member.filename).startswith("."):
+                continue
+            if member.file_size > BATCH_MAX_MEMBER_BYTES:
+                raise ValueError(f"Archive member {member.filename} is too large")
+            items.append((member.filename, lambda name=member.filename: bundle.read(name)))
+    return items
 
-        detailed_report = generate_detailed_report(patient_data, diagnosis)
-        detailed_recommendations = generate_recommendations(patient_data, diagnosis)
+def read_batch_metadata(form, filenames):
+    """Per-image patient data: `metadata` is a JSON list (in upload order) or an object keyed by filename."""
+    defaults = read_patient_data(form)
+    raw = form.get("metadata")
+    if not raw:
+        return [defaults for _ in filenames]
 
-        if detailed_report is None or detailed_recommendations is None:
-            return jsonify({"error": "Failed to generate detailed report"}), 500
+    metadata = json.loads(raw)
+    per_image = []
+    for index, name in enumerate(filenames):
+        if isinstance(metadata, list):
+            entry = metadata[index] if index < len(metadata) else {}
+        else:
+            entry = metadata.get(name) or metadata.get(os.path.basename(name)) or {}
+        per_image.append(dict(defaults, **{k: str(v) for k, v in entry.items() if k in defaults}))
+    return per_image
 
+def diagnose_chunk(chunk, model_names, explain=False):
+    """Diagnose [(index, filename, read_bytes)] with parallel decoding and one batched call per model.
+
+    `model_names` maps each index to the model its image is routed to. With
+    `explain`, the batched call also returns Grad-CAM heatmaps (see diagnose_group).
+    """
+    results = {}
+    groups = {}
+    for index, _, read_bytes in chunk:
+        groups.setdefault(model_names[index], []).append((index, read_bytes))
+    for model_name, items in groups.items():
         try:
-            os.remove(temp_path)
+            with model_registry.use(model_name) as served:
+                diagnose_group(served, items, results, explain)
         except Exception as e:
-            print(f"⚠️ Warning: Could not remove temporary file: {str(e)}")
+            log_error("inference", f"Error running model '{model_name}': {e}")
+        for index, _ in items:
+            results.setdefault(index, {"error": f"Model '{model_name}' is unavailable"})
+            results[index]["model"] = model_name
+    return results
 
-        return jsonify({
-            "diagnosis": diagnosis,
-            "detailed_report": detailed_report,
-            "detailed_recommendations": detailed_recommendations
-        })
-    except Exception as e:
-        print(f"❌ Unexpected error: {str(e)}")
+def diagnose_group(served, items, results, explain=False):
+    """Fill `results` for [(index, read_bytes)] that all go to the same served model.
+
+    With `explain`, each result also carries an `explanation` (None if the model
+    cannot be explained), computed in the same batched pass as the diagnosis.
+    """
+    prediction_cache = served.prediction_cache
+    explain = explain and served.can_explain
+    pending = []
+    for index, read_bytes in items:
         try:
-            if 'temp_path' in locals():
-                os.remove(temp_path)
-        except:
-            pass
-        return jsonify({"error": str(e)}), 500
+            image_bytes = read_bytes()
+        except Exception as e:
+            results[index] = {"error": f"Could not read image: {str(e)}"}
+            continue
+        cached = prediction_cache.get(image_bytes) if prediction_cache else None
+        if cached is not None and explain:
+            explanation = prediction_cache.get(image_bytes, EXPLAIN_CACHE_VARIANT)
+            if explanation is None:
+                cached = None
+            else:
+                explanations_total.inc(model=served.spec.name, cached="true")
+                results[index] = {"diagnosis": cached, "explanation": explanation, "cached": True}
+                continue
+        if cached is not None:
+            results[index] = {"diagnosis": cached, "cached": True}
+        else:
+            pending.append((index, image_bytes))
+
+    if pending:
+        # Decode straight into the rows of one preallocated batch array
+        batch = np.empty((len(pending), 224, 224, 3), dtype=np.float32)
+        futures = [
+            preprocess_executor.submit(preprocess_bytes, image_bytes, out=batch[row])
+            for row, (_, image_bytes) in enumerate(pending)
+        ]
+        decoded = []
+        for row, future in enumerate(futures):
+            index, image_bytes = pending[row]
+            try:
+                future.result()
+                decoded.append(row)
+            except Exception as e:
+                errors_total.inc(stage="preprocess")
+                results[index] = {"error": f"Error preprocessing image: {str(e)}"}
+
+        if decoded:
+            rows = decoded if len(decoded) < len(pending) else slice(None)
+            explanations = None
+            try:
+                if explain:
+                    predictions, heatmaps = served.explain(batch[rows])
+                    # PNG encoding runs on the decode pool, one overlay per image
+                    explanations = list(preprocess_executor.map(
+                        lambda position: build_explanation(
+                            served, batch[decoded[position]], heatmaps[position], predictions[position]
+                        ),
+                        range(len(decoded))
+                    ))
+                    explanations_total.inc(len(decoded), model=served.spec.name, cached="false")
+                else:
+                    predictions = served.predict(batch[rows])
+            except Exception as e:
+                log_error("inference", f"Prediction error: {e}")
+                predictions = None
+            for position, row in enumerate(decoded):
+                index, image_bytes = pending[row]
+                if predictions is None:
+                    results[index] = {"error": "Prediction failed"}
+                    continue
+                diagnosis = format_diagnosis(predictions[position], served.spec.class_names)
+                if prediction_cache:
+                    prediction_cache.put(image_bytes, diagnosis)
+                results[index] = {"diagnosis": diagnosis, "cached": False}
+                if explanations is not None:
+                    if prediction_cache:
+                        prediction_cache.put(image_bytes, explanations[position], EXPLAIN_CACHE_VARIANT)
+                    results[index]["explanation"] = explanations[position]
+
+@app.route("/predict/batch", methods=["POST"])
+def predict_batch():
+    """Diagnose many images in one request and stream one NDJSON line per image.
+
+    Images come as repeated `images` files and/or an `archive` zip. `reports`
+    selects LLM report generation: `none` (default), `inline` (small batches only)
+    or `deferred` (each line carries a `report_id` to fetch from /reports/<id>).
+    """
+    started = time.perf_counter()
+    error = model_unavailable_response()
+    if error:
+        return error
+
+    reports_mode = request.form.get("reports", "none").lower()
+    if reports_mode not in ("none", "inline", "deferred"):
+        return jsonify({"error": "reports must be one of: none, inline, deferred"}), 400
+    explain = read_flag(request.form, "explain")
+
+    try:
+        items = collect_batch_items()
+    except (zipfile.BadZipFile, ValueError) as e:
+        return jsonify({"error": f"Invalid archive: {str(e)}"}), 400
+    if not items:
+        return jsonify({"error": "No images uploaded"}), 400
+    if len(items) > BATCH_MAX_IMAGES:
+        return jsonify({"error": f"Too many images ({len(items)}), the limit is {BATCH_MAX_IMAGES}"}), 413
+    if reports_mode == "inline" and len(items) > BATCH_INLINE_REPORT_LIMIT:
+        return jsonify({
+            "error": f"Inline reports are limited to {BATCH_INLINE_REPORT_LIMIT} images, use reports=deferred"
+        }), 400
+
+    try:
+        patients = read_batch_metadata(request.form, [name for name, _ in items])
+    except (ValueError, AttributeError) as e:
+        return jsonify({"error": f"Invalid metadata: {str(e)}"}), 400
+
+    model_names = [model_registry.route(patient["image_type"]) for patient in patients]
+
+    def lines():
+        yield json.dumps({"type": "batch", "count": len(items), "reports": reports_mode, "explain": explain}) + "\n"
+        succeeded = failed = 0
+        inline_reports = []
+
+        indexed = [(index, name, read_bytes) for index, (name, read_bytes) in enumerate(items)]
+        for start in range(0, len(indexed), BATCH_CHUNK_SIZE):
+            chunk = indexed[start:start + BATCH_CHUNK_SIZE]
+            results = diagnose_chunk(chunk, model_names, explain)
+            for index, filename, _ in chunk:
+                line = dict({"type": "result", "index": index, "filename": filename}, **results[index])
+                if "diagnosis" in line:
+                    succeeded += 1
+                    if explain:
+                        line.setdefault("explanation", None)
+                    patient_data, diagnosis = patients[index], line["diagnosis"]
+                    if reports_mode == "deferred":
+                        line["report_id"] = report_store.submit(
+                            lambda p=patient_data, d=diagnosis: generate_report_sections(p, d),
+                            context={"filename": filename}
+                        )
+                    elif reports_mode == "inline":
+                        # Submit the completions themselves so no pool thread blocks waiting on another
+                        inline_reports.append((index, filename, {
+                            "detailed_report": llm_executor.submit(
+                                generate_detailed_report, patient_data, diagnosis, LLM_TIMEOUT
+                            ),
+                            "detailed_recommendations": llm_executor.submit(
+                                generate_recommendations, patient_data, diagnosis, LLM_TIMEOUT
+                            ),
+                        }))
+                else:
+                    failed += 1
+                yield json.dumps(line) + "\n"
+
+        for index, filename, sections in inline_reports:
+            line = {"type": "report", "index": index, "filename": filename}
+            try:
+                for section, future in sections.items():
+                    line[section] = future.result(timeout=LLM_TIMEOUT)
+                    if line[section] is None:
+                        raise RuntimeError(f"{section} returned no result")
+            except Exception as e:
+                log_error("report", f"LLM generation error: {e}")
+                line = {"type": "report", "index": index, "filename": filename,
+                        "error": "Failed to generate detailed report"}
+            yield json.dumps(line) + "\n"
+
+        yield json.dumps({
+            "type": "summary",
+            "succeeded": succeeded,
+            "failed": failed,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2)
+        }) + "\n"
+
+    return Response(stream_with_context(lines()), mimetype="application/x-ndjson")
+
+# --- ASYNC PREDICTION JOBS ---
+# POST /predict/jobs answers at once with a job id. Job workers classify the image, store the diagnosis
+# (pollable straight away) and then fill in each report section as its completion returns.
+# Jobs live in SQLite (JOB_DB), so queued jobs are resumed after a restart.
+JOB_DB = os.environ.get("JOB_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "jobs.sqlite3"))
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", 2))
+JOB_MAX_QUEUED = int(os.environ.get("JOB_MAX_QUEUED", 1000))
+JOB_TTL = float(os.environ.get("JOB_TTL", 86400))
+# Webhooks may only call back to these hosts, so clients cannot make the server send requests elsewhere
+JOB_WEBHOOK_ALLOWED_HOSTS = {
+    host.strip().lower() for host in os.environ.get("JOB_WEBHOOK_ALLOWED_HOSTS", "localhost,127.0.0.1,::1").split(",")
+    if host.strip()
+}
+
+def run_prediction_job(job, update):
+    """Job handler: classify (unless a resumed job already was), then generate the missing report sections."""
+    diagnosis = job["diagnosis"]
+    if diagnosis is None:
+        # Jobs resumed at startup can get here before the default model has finished loading
+        if not model_loader.wait():
+            update(status=JobStore.FAILED, error="Model failed to load", image=None, finished_at=time.time())
+            return
+        update(status=JobStore.CLASSIFYING)
+        with app.app_context():  # error responses are built with jsonify
+            diagnosis, error = diagnose_upload(job["image"], job["model"])
+            if error:
+                update(status=JobStore.FAILED, error=error[0].get_json().get("error"), image=None,
+                       finished_at=time.time())
+                return
+        update(status=JobStore.GENERATING, diagnosis=diagnosis, image=None, classified_at=time.time())
+
+    sections = {
+        name: llm_executor.submit(generate_fn, job["patient_data"], diagnosis, LLM_TIMEOUT)
+        for name, generate_fn in (("detailed_report", generate_detailed_report),
+                                  ("detailed_recommendations", generate_recommendations))
+        if job[name] is None
+    }
+    names = {future: name for name, future in sections.items()}
+    failed = []
+    try:
+        for future in as_completed(names, timeout=LLM_TIMEOUT):
+            text = None if future.exception() is not None else future.result()
+            if text is None:
+                failed.append(names[future])
+            else:
+                update(**{names[future]: text})
+    except FuturesTimeoutError:
+        failed.extend(name for future, name in names.items() if not future.done())
+
+    if failed:
+        log_error("report", f"Job {job['job_id']}: could not generate {', '.join(sorted(failed))}")
+        update(status=JobStore.FAILED, error="Failed to generate detailed report", finished_at=time.time())
+    else:
+        update(status=JobStore.COMPLETED, finished_at=time.time())
+
+# Inference workers never serve requests, so they neither open the job database nor run jobs
+job_store = job_queue = None
+if not IN_INFERENCE_WORKER:
+    job_store = JobStore(JOB_DB)
+    job_queue = JobQueue(
+        job_store,
+        run_prediction_job,
+        workers=JOB_WORKERS,
+        max_queued=JOB_MAX_QUEUED,
+        webhook_timeout=float(os.environ.get("JOB_WEBHOOK_TIMEOUT", 5)),
+        webhook_retries=int(os.environ.get("JOB_WEBHOOK_RETRIES", 3))
+    )
+    job_queue.start()
+
+@app.route("/predict/jobs", methods=["POST"])
+def submit_prediction_job():
+    """Same inputs as /predict plus an optional `webhook_url`; returns 202 with the job id."""
+    file, error = validate_upload()
+    if error:
+        return error
+
+    webhook_url = request.form.get("webhook_url") or None
+    if webhook_url and not webhook_allowed(webhook_url, JOB_WEBHOOK_ALLOWED_HOSTS):
+        return jsonify({"error": "webhook_url must be an http(s) URL on an allowed host"}), 400
+    if job_queue.full:
+        response = jsonify({"error": "Too many queued jobs, please retry shortly"})
+        response.headers["Retry-After"] = "5"
+        return response, 503
+
+    job_store.purge(JOB_TTL)
+    patient_data = read_patient_data(request.form)
+    model_name = model_registry.route(patient_data["image_type"])
+    job_id = job_store.create(file.read(), patient_data, model_name, webhook_url)
+    job_queue.submit(job_id)
+
+    response = jsonify({"job_id": job_id, "status": JobStore.QUEUED, "status_url": f"/predict/jobs/{job_id}"})
+    response.headers["Location"] = f"/predict/jobs/{job_id}"
+    return response, 202
+
+@app.route("/predict/jobs/<job_id>", methods=["GET"])
+def get_prediction_job(job_id):
+    job = job_store.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown or expired job id"}), 404
+    status_code = 200 if job["status"] in JobStore.FINISHED else 202
+    return jsonify(job_store.public(job)), status_code
+
+@app.route("/api/metrics/jobs", methods=["GET"])
+def job_metrics():
+    return jsonify(job_queue.stats())
+
+@app.route("/reports/<report_id>", methods=["GET"])
+def get_report(report_id):
+    report = report_store.get(report_id)
+    if report is None:
+        return jsonify({"error": "Unknown or expired report id"}), 404
+    status_code = 202 if report["status"] == ReportStore.PENDING else 200
+    return jsonify(report), status_code
 
 # --- MAIN ---
 if __name__ == "__main__":
@@ -0,0 +1,294 @@
+"""Find the fastest CPU settings for serving a model and save them as a profile that app.py applies.
+
+Usage (from backend/):
+    python autotune.py                                    # thermal.keras, default grid
+    python autotune.py --model mri.keras --onednn 0,1 --intra-op-threads 1,2,4 --inter-op-threads 1,2 \
+        --batch-sizes 1,4,8,16 --objective throughput --max-p95-ms 250
+    python autotune.py --synthetic --seconds 1 --csv autotune.csv
+
+Each combination of oneDNN on/off (TF_ENABLE_ONEDNN_OPTS) and intra-op/inter-op thread
+counts runs in its own subprocess, because TensorFlow reads these settings once per
+process. The subprocess loads the model, warms it up, then times `predict_on_batch` on
+random inputs at every batch size for --seconds. For each point it records p50/p95
+batch latency, images per second and the peak RSS.
+
+The operating point is picked by --objective:
+- throughput: the most images/s among points whose p95 batch latency is within --max-p95-ms
+- latency: the lowest p95 latency at batch size 1
+
+It is written to --profile (default cpu_profile.json next to app.py, which app.py
+applies at startup) together with every measured point. The latency and throughput
+curves are printed as a table, and --csv also writes them for plotting.
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from cpu_profile import host_info, save_profile
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+OBJECTIVES = ("throughput", "latency")
+RESULT_PREFIX = "AUTOTUNE_RESULT "
+
+
+def int_list(text):
+    return [int(value) for value in text.split(",") if value.strip()]
+
+
+def default_thread_counts():
+    """1, 2, 4, ... up to the CPU count, plus the CPU count itself."""
+    cpus = os.cpu_count() or 1
+    counts = {cpus}
+    count = 1
+    while count < cpus:
+        counts.add(count)
+        count *= 2
+    return sorted(counts)
+
+
+# --- MEASUREMENT (runs in a subprocess per configuration) ---
+def model_input_shape(model):
+    if hasattr(model, "input_shape"):
+        return tuple(int(size) for size in model.input_shape[1:])
+    return tuple(int(size) for size in model.interpreter.get_input_details()[0]["shape"][1:])
+
+
+def measure(model, batch_sizes, seconds, min_iterations, warmup):
+    """Latency and throughput of `model.predict_on_batch` at each batch size."""
+    rng = np.random.default_rng(0)
+    shape = model_input_shape(model)
+    points = []
+    for batch_size in batch_sizes:
+        batch = rng.random((batch_size,) + shape, dtype=np.float32)
+        for _ in range(warmup):
+            model.predict_on_batch(batch)
+        latencies = []
+        started = time.perf_counter()
+        while len(latencies) < min_iterations or time.perf_counter() - started < seconds:
+            call_started = time.perf_counter()
+            model.predict_on_batch(batch)
+            latencies.append((time.perf_counter() - call_started) * 1000)
+        elapsed = time.perf_counter() - started
+        points.append({
+            "batch_size": batch_size,
+            "iterations": len(latencies),
+            "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+            "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+            "mean_ms": round(float(np.mean(latencies)), 3),
+            "images_per_second": round(batch_size * len(latencies) / elapsed, 2),
+        })
+    return points
+
+
+def run_child(config):
+    from inference_backends import load_inference_model
+
+    started = time.perf_counter()
+    model = load_inference_model(config["model"], config["backend"], config["intra_op_threads"],
+                                 config["inter_op_threads"])
+    load_seconds = time.perf_counter() - started
+    points = measure(model, config["batch_sizes"], config["seconds"], config["min_iterations"], config["warmup"])
+    result = {
+        "load_seconds": round(load_seconds, 2),
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        "points": points,
+    }
+    print(RESULT_PREFIX + json.dumps(result), flush=True)
+    return 0
+
+
+def run_configuration(config, timeout):
+    """Measure one configuration in a fresh interpreter; returns its result or raises RuntimeError."""
+    env = dict(
+        os.environ,
+        CUDA_VISIBLE_DEVICES="-1",
+        TF_CPP_MIN_LOG_LEVEL="2",
+        TF_ENABLE_ONEDNN_OPTS=str(config["onednn"]),
+        PYTHONUNBUFFERED="1",
+    )
+    try:
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", json.dumps(config)],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, timeout=timeout
+        )
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(f"timed out after {timeout:.0f} s")
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    raise RuntimeError(f"exit code {completed.returncode}: {completed.stderr.strip()[-2000:]}")
+
+
+# --- SELECTION AND REPORTING ---
+def choose(configurations, objective, max_p95_ms):
+    """(configuration, point) of the best operating point, or (None, None) if none qualifies."""
+    candidates = [
+        (configuration, point)
+        for configuration in configurations if configuration.get("points")
+        for point in configuration["points"]
+    ]
+    if objective == "latency":
+        candidates = [(c, p) for c, p in candidates if p["batch_size"] == 1]
+        return min(candidates, key=lambda item: item[1]["p95_ms"], default=(None, None))
+    if max_p95_ms:
+        candidates = [(c, p) for c, p in candidates if p["p95_ms"] <= max_p95_ms]
+    return max(candidates, key=lambda item: item[1]["images_per_second"], default=(None, None))
+
+
+def settings_for(configuration, point, backend):
+    settings = {
+        "INFERENCE_INTRA_OP_THREADS": configuration["intra_op_threads"],
+        "INFERENCE_INTER_OP_THREADS": configuration["inter_op_threads"],
+        "BATCH_MAX_SIZE": point["batch_size"],
+    }
+    if backend == "keras":
+        settings["TF_ENABLE_ONEDNN_OPTS"] = str(configuration["onednn"])
+    return settings
+
+
+def curve_rows(configurations):
+    for configuration in configurations:
+        for point in configuration.get("points", []):
+            yield dict(
+                onednn=configuration["onednn"],
+                intra_op_threads=configuration["intra_op_threads"],
+                inter_op_threads=configuration["inter_op_threads"],
+                **point
+            )
+
+
+def print_curves(configurations, best):
+    print(f"\n{'oneDNN':>6} {'intra':>5} {'inter':>5} {'batch':>5} {'p50 ms':>10} {'p95 ms':>10} {'images/s':>10}")
+    for row in curve_rows(configurations):
+        chosen = best is not None and all(
+            row[key] == best[key] for key in ("onednn", "intra_op_threads", "inter_op_threads", "batch_size")
+        )
+        print(f"{row['onednn']:>6} {row['intra_op_threads']:>5} {row['inter_op_threads']:>5} {row['batch_size']:>5} "
+              f"{row['p50_ms']:>10.2f} {row['p95_ms']:>10.2f} {row['images_per_second']:>10.2f}"
+              + ("  <- best" if chosen else ""))
+    for configuration in configurations:
+        if configuration.get("error"):
+            print(f"❌ oneDNN={configuration['onednn']} intra={configuration['intra_op_threads']} "
+                  f"inter={configuration['inter_op_threads']}: {configuration['error']}")
+
+
+def write_csv(path, configurations):
+    rows = list(curve_rows(configurations))
+    if not rows:
+        return
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="Model to tune (default: thermal.keras next to app.py)")
+    parser.add_argument("--synthetic", action="store_true", help="Tune a tiny synthetic model instead")
+    parser.add_argument("--onednn", type=int_list, default=[0, 1], help="TF_ENABLE_ONEDNN_OPTS values to try")
+    parser.add_argument("--intra-op-threads", type=int_list, default=None,
+                        help="Intra-op thread counts to try (default: 1, 2, 4, ... up to the CPU count)")
+    parser.add_argument("--inter-op-threads", type=int_list, default=[1, 2], help="Inter-op thread counts to try")
+    parser.add_argument("--batch-sizes", type=int_list, default=[1, 4, 8, 16, 32])
+    parser.add_argument("--seconds", type=float, default=3.0, help="Measuring time per batch size")
+    parser.add_argument("--min-iterations", type=int, default=5, help="Minimum timed calls per batch size")
+    parser.add_argument("--warmup", type=int, default=2, help="Untimed calls per batch size")
+    parser.add_argument("--objective", choices=OBJECTIVES, default="throughput")
+    parser.add_argument("--max-p95-ms", type=float, default=0.0,
+                        help="With --objective throughput, only consider points whose p95 batch latency is within this")
+    parser.add_argument("--timeout", type=float, default=900, help="Time limit per configuration (seconds)")
+    parser.add_argument("--profile", default=os.path.join(BACKEND_DIR, "cpu_profile.json"),
+                        help="Where to write the chosen settings and the measured curves")
+    parser.add_argument("--csv", help="Also write the measured curves to this CSV file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return run_child(json.loads(args.child))
+
+    workdir = None
+    if args.synthetic:
+        from benchmark import build_synthetic_model
+
+        workdir = tempfile.mkdtemp(prefix="autotune-")
+        model_path = os.path.join(workdir, "thermal.keras")
+        build_synthetic_model(model_path)
+    else:
+        model_path = os.path.abspath(args.model or os.path.join(BACKEND_DIR, "thermal.keras"))
+        if not os.path.exists(model_path):
+            parser.error(f"Model file not found: {model_path} (use --model or --synthetic)")
+    backend = "tflite" if model_path.endswith(".tflite") else "keras"
+
+    # oneDNN and inter-op threads are TensorFlow settings; the TFLite interpreter only takes a thread count
+    onednn_values = args.onednn if backend == "keras" else [int(os.environ.get("TF_ENABLE_ONEDNN_OPTS", 0))]
+    inter_values = args.inter_op_threads if backend == "keras" else [0]
+    grid = list(itertools.product(onednn_values, args.intra_op_threads or default_thread_counts(), inter_values))
+    batch_sizes = sorted(set(args.batch_sizes))
+
+    print(f"🔍 Tuning {model_path} ({backend}) on {os.cpu_count()} CPUs: {len(grid)} configurations "
+          f"x {len(batch_sizes)} batch sizes, about {len(grid) * len(batch_sizes) * args.seconds:.0f} s of measurement")
+    configurations = []
+    for index, (onednn, intra, inter) in enumerate(grid, start=1):
+        config = {
+            "model": model_path, "backend": backend, "onednn": onednn,
+            "intra_op_threads": intra, "inter_op_threads": inter, "batch_sizes": batch_sizes,
+            "seconds": args.seconds, "min_iterations": args.min_iterations, "warmup": args.warmup,
+        }
+        label = f"oneDNN={onednn} intra={intra} inter={inter}"
+        print(f"⏳ [{index}/{len(grid)}] {label}")
+        configuration = {"onednn": onednn, "intra_op_threads": intra, "inter_op_threads": inter}
+        try:
+            configuration.update(run_configuration(config, args.timeout))
+        except RuntimeError as e:
+            print(f"❌ {label} failed: {e}")
+            configuration["error"] = str(e)
+        configurations.append(configuration)
+    if workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    best_configuration, best_point = choose(configurations, args.objective, args.max_p95_ms)
+    best = None
+    if best_point is not None:
+        best = dict(best_point, onednn=best_configuration["onednn"],
+                    intra_op_threads=best_configuration["intra_op_threads"],
+                    inter_op_threads=best_configuration["inter_op_threads"])
+    print_curves(configurations, best)
+    if args.csv:
+        write_csv(args.csv, configurations)
+        print(f"📄 Curves written to {args.csv}")
+    if best is None:
+        print("❌ No configuration met the objective; no profile written")
+        return 1
+
+    profile = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "host": host_info(),
+        "model": None if args.synthetic else model_path,
+        "backend": backend,
+        "objective": args.objective,
+        "max_p95_ms": args.max_p95_ms or None,
+        "settings": settings_for(best_configuration, best_point, backend),
+        "best": best,
+        "configurations": configurations,
+    }
+    save_profile(args.profile, profile)
+    summary = ", ".join(f"{name}={value}" for name, value in profile["settings"].items())
+    print(f"\n✅ Best: {summary} ({best['images_per_second']} images/s, p95 {best['p95_ms']} ms per batch)")
+    print(f"✅ Profile written to {args.profile}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
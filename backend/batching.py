@@ -0,0 +1,221 @@
+import queue
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+
+class _PendingRequest:
+    """A single caller waiting on its slice of a batched forward pass."""
+
+    __slots__ = ("inputs", "rows", "enqueued_at", "done", "result", "error")
+
+    def __init__(self, inputs):
+        self.inputs = inputs
+        self.rows = inputs.shape[0]
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Collect requests that arrive within a short window and run them as one batch.
+
+    `predict_fn` receives a single stacked array of shape (N, ...) and must return
+    an array whose first dimension is N. Every caller of `submit` gets back the
+    rows that correspond to its own inputs.
+    """
+
+    def __init__(self, predict_fn, max_batch_size=16, max_wait_ms=5.0, name="model", concurrency=1):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.predict_fn = predict_fn
+        self.max_batch_size = int(max_batch_size)
+        self.max_wait = max(float(max_wait_ms), 0.0) / 1000.0
+        self.name = name
+        # Number of batches allowed in flight at once (e.g. one per inference worker process)
+        self.concurrency = max(int(concurrency), 1)
+
+        self._queue = queue.Queue()
+        self._carry = None
+        self._threads = []
+        self._running = False
+        self._lock = threading.Lock()
+        self._collect_lock = threading.Lock()
+        self._in_flight = 0
+
+        self._batches = 0
+        self._requests = 0
+        self._rows = 0
+        self._errors = 0
+        self._batch_sizes = Counter()
+        self._max_queue_depth = 0
+        self._total_wait = 0.0
+        self._total_inference = 0.0
+        self._last_batch_size = 0
+
+    # --- LIFECYCLE ---
+    def start(self):
+        if self._running:
+            return self
+        self._running = True
+        for index in range(self.concurrency):
+            thread = threading.Thread(target=self._run, name=f"batcher-{self.name}-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self, timeout=5.0):
+        if not self._running:
+            return
+        self._running = False
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self._fail_leftovers()
+
+    # --- CLIENT API ---
+    def submit(self, inputs, timeout=None):
+        """Queue `inputs` (N, ...) for the next batch and block until its rows are ready."""
+        if not self._running:
+            raise RuntimeError(f"Batcher '{self.name}' is not running")
+
+        pending = _PendingRequest(np.asarray(inputs))
+        self._queue.put(pending)
+        with self._lock:
+            self._max_queue_depth = max(self._max_queue_depth, self._queue.qsize())
+
+        if not pending.done.wait(timeout):
+            raise TimeoutError(f"Batcher '{self.name}' did not answer within {timeout}s")
+        if pending.error is not None:
+            raise pending.error
+        return pending.result
+
+    def stats(self):
+        with self._lock:
+            batches = self._batches
+            requests = self._requests
+            return {
+                "name": self.name,
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "concurrency": self.concurrency,
+                "batches_in_flight": self._in_flight,
+                "queue_depth": self._queue.qsize() + (1 if self._carry is not None else 0),
+                "max_queue_depth": self._max_queue_depth,
+                "batches": batches,
+                "requests": requests,
+                "rows": self._rows,
+                "errors": self._errors,
+                "last_batch_size": self._last_batch_size,
+                "avg_batch_size": round(self._rows / batches, 3) if batches else 0.0,
+                "avg_queue_wait_ms": round(self._total_wait * 1000.0 / requests, 3) if requests else 0.0,
+                "avg_inference_ms": round(self._total_inference * 1000.0 / batches, 3) if batches else 0.0,
+                "batch_size_histogram": {str(size): count for size, count in sorted(self._batch_sizes.items())},
+            }
+
+    # --- DISPATCH LOOP ---
+    def _next_request(self, timeout):
+        if self._carry is not None:
+            pending, self._carry = self._carry, None
+            return pending
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _collect(self):
+        first = self._next_request(timeout=None)
+        if first is None:
+            return []
+
+        batch = [first]
+        rows = first.rows
+        deadline = time.perf_counter() + self.max_wait
+
+        while rows < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            pending = self._next_request(timeout=remaining)
+            if pending is None:
+                break
+            if rows + pending.rows > self.max_batch_size:
+                # Keep it for the next batch rather than overshooting the cap
+                self._carry = pending
+                break
+            batch.append(pending)
+            rows += pending.rows
+
+        return batch
+
+    def _run(self):
+        while self._running:
+            # Only one dispatcher gathers a batch at a time; dispatching runs in parallel
+            with self._collect_lock:
+                if not self._running:
+                    break
+                batch = self._collect()
+            if not batch:
+                continue
+            self._dispatch(batch)
+
+    def _fail_leftovers(self):
+        # Fail anything still queued so no caller hangs on shutdown
+        leftovers = [self._carry] if self._carry is not None else []
+        self._carry = None
+        while True:
+            try:
+                pending = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if pending is not None:
+                leftovers.append(pending)
+        for pending in leftovers:
+            pending.error = RuntimeError(f"Batcher '{self.name}' stopped")
+            pending.done.set()
+
+    def _dispatch(self, batch):
+        with self._lock:
+            self._in_flight += 1
+        started = time.perf_counter()
+        try:
+            if len(batch) == 1:
+                stacked = batch[0].inputs
+            else:
+                stacked = np.concatenate([p.inputs for p in batch], axis=0)
+            outputs = np.asarray(self.predict_fn(stacked))
+            if outputs.shape[0] != stacked.shape[0]:
+                raise ValueError(
+                    f"predict_fn returned {outputs.shape[0]} rows for a batch of {stacked.shape[0]}"
+                )
+            error = None
+        except Exception as e:
+            outputs = None
+            error = e
+        finished = time.perf_counter()
+
+        offset = 0
+        for pending in batch:
+            if error is None:
+                pending.result = outputs[offset:offset + pending.rows]
+            else:
+                pending.error = error
+            offset += pending.rows
+            pending.done.set()
+
+        with self._lock:
+            self._in_flight -= 1
+            self._batches += 1
+            self._requests += len(batch)
+            self._rows += offset
+            self._last_batch_size = offset
+            self._batch_sizes[offset] += 1
+            self._total_inference += finished - started
+            self._total_wait += sum(started - p.enqueued_at for p in batch)
+            if error is not None:
+                self._errors += 1
@@ -0,0 +1,467 @@
+"""Load-test /predict and /api/groq-chat against a local server with a stubbed LLM.
+
+Usage (from backend/):
+    python benchmark.py                                   # synthetic model, both endpoints
+    python benchmark.py --model thermal.keras --requests 200 --concurrency 16 \
+        --llm-latency 0.5 --env BATCH_MAX_SIZE=32 --env INFERENCE_WORKERS=2
+    python benchmark.py --compare benchmark-results/<earlier run>.json
+
+Starts app.py in a subprocess with the offline stub Groq client (GROQ_CLIENT=stub,
+with --llm-latency and --llm-token-rate) and SERVER_TIMING=1, serving --model or a
+small synthetic model built on the fly. Prediction and LLM caches are off unless
+--keep-caches is given, so every request does the full work.
+
+Each endpoint is driven by --concurrency closed-loop clients. The report has p50/p95/p99
+latency, requests per second, the server's peak RSS (including inference worker
+processes) and a per-stage breakdown read from the Server-Timing header: upload,
+decode, preprocess, inference, llm and serialize. It is written as JSON together with
+the git commit, so runs on different commits can be compared with --compare.
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from server_timing import parse_server_timing
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+ENDPOINTS = ("predict", "chat")
+PERCENTILES = (50, 95, 99)
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+CHAT_MESSAGE = "What are the early signs of breast cancer and when should I get screened?"
+
+
+# --- WORKLOAD ---
+def synthetic_images(count, size=(640, 480), seed=0):
+    """`count` distinct random PNGs, so the prediction cache could not help even if it were on."""
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(count):
+        pixels = rng.integers(0, 256, size=(size[1], size[0], 3), dtype=np.uint8)
+        buffer = io.BytesIO()
+        Image.fromarray(pixels).save(buffer, format="PNG")
+        images.append(("synthetic.png", buffer.getvalue()))
+    return images
+
+
+def directory_images(directory, limit):
+    paths = sorted(
+        os.path.join(root, name)
+        for root, _, names in os.walk(directory)
+        for name in names if name.lower().endswith(IMAGE_EXTENSIONS)
+    )[:limit]
+    if not paths:
+        raise ValueError(f"No images found under {directory}")
+    images = []
+    for path in paths:
+        with open(path, "rb") as f:
+            images.append((os.path.basename(path), f.read()))
+    return images
+
+
+def multipart_body(fields, files):
+    """(body, content type) for a multipart/form-data request."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode("utf-8")
+        )
+    for name, (filename, data) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: application/octet-stream\r\n\r\n".encode("utf-8") + data + b"\r\n"
+        )
+    parts.append(f"--{boundary}--\r\n".encode("utf-8"))
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+
+def build_requests(endpoint, base_url, count, images):
+    """[(url, body, content type)] for `count` requests to `endpoint`, cycling through `images`."""
+    if endpoint == "chat":
+        body = json.dumps({"message": CHAT_MESSAGE}).encode("utf-8")
+        return [(f"{base_url}/api/groq-chat", body, "application/json")] * count
+
+    patient = {"age": "52", "image_type": "Thermal", "lump": "No", "family": "Yes", "density": "B"}
+    return [
+        (f"{base_url}/predict", *multipart_body(patient, {"image": images[i % len(images)]}))
+        for i in range(count)
+    ]
+
+
+def send(url, body, content_type, timeout):
+    """One request; returns {status, latency_ms, stages} (status 0 for connection errors)."""
+    request = urllib.request.Request(url, data=body, headers={"Content-Type": content_type}, method="POST")
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+            status, headers = response.status, response.headers
+    except urllib.error.HTTPError as e:
+        e.read()
+        status, headers = e.code, e.headers
+    except OSError:
+        status, headers = 0, {}
+    latency_ms = (time.perf_counter() - started) * 1000
+    return {"status": status, "latency_ms": latency_ms, "stages": parse_server_timing(headers.get("Server-Timing"))}
+
+
+def run_load(requests, concurrency, timeout):
+    """Replay `requests` with `concurrency` clients; returns (per-request records, wall seconds)."""
+    records = [None] * len(requests)
+    next_index = iter(range(len(requests)))
+    lock = threading.Lock()
+
+    def client():
+        while True:
+            with lock:
+                index = next(next_index, None)
+            if index is None:
+                return
+            records[index] = send(*requests[index], timeout)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for future in [executor.submit(client) for _ in range(concurrency)]:
+            future.result()
+    return records, time.perf_counter() - started
+
+
+# --- SUMMARY ---
+def distribution(values):
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return None
+    summary = {f"p{p}": round(float(np.percentile(values, p)), 2) for p in PERCENTILES}
+    summary.update(mean=round(float(values.mean()), 2), max=round(float(values.max()), 2))
+    return summary
+
+
+def summarize(records, seconds):
+    ok = [record for record in records if record["status"] == 200]
+    stage_names = []
+    for record in ok:
+        stage_names.extend(name for name in record["stages"] if name not in stage_names)
+    return {
+        "requests": len(records),
+        "errors": len(records) - len(ok),
+        "status_codes": {
+            str(status): sum(1 for record in records if record["status"] == status)
+            for status in sorted({record["status"] for record in records})
+        },
+        "seconds": round(seconds, 3),
+        "rps": round(len(ok) / seconds, 2) if seconds else 0.0,
+        "latency_ms": distribution([record["latency_ms"] for record in ok]),
+        "stages_ms": {
+            name: distribution([record["stages"][name] for record in ok if name in record["stages"]])
+            for name in stage_names
+        },
+    }
+
+
+# --- MEMORY ---
+def process_tree(pid):
+    """`pid` and all of its descendants (Linux /proc)."""
+    pids, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        pids.append(current)
+        try:
+            for task in os.listdir(f"/proc/{current}/task"):
+                with open(f"/proc/{current}/task/{task}/children") as f:
+                    pending.extend(int(child) for child in f.read().split())
+        except OSError:
+            pass
+    return pids
+
+
+def status_kb(pid, field):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+class RSSMonitor:
+    """Samples the resident memory of a process tree in the background."""
+
+    def __init__(self, pid, interval=0.1):
+        self.pid = pid
+        self.interval = interval
+        self.available = os.path.exists(f"/proc/{pid}/status")
+        self.peak_tree_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="rss-monitor", daemon=True)
+
+    def start(self):
+        if self.available:
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            total = sum(status_kb(pid, "VmRSS") for pid in process_tree(self.pid))
+            self.peak_tree_kb = max(self.peak_tree_kb, total)
+
+    def stop(self):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+    def stats(self):
+        if not self.available:
+            return {"peak_rss_mb": None, "peak_tree_rss_mb": None}
+        return {
+            # VmHWM is the kernel's own high-water mark for the server process
+            "peak_rss_mb": round(status_kb(self.pid, "VmHWM") / 1024, 1),
+            "peak_tree_rss_mb": round(self.peak_tree_kb / 1024, 1),
+        }
+
+
+# --- SERVER ---
+def build_synthetic_model(path):
+    """A tiny thermal-shaped model (224x224x3 in, 2-class softmax out), so runs need no trained weights."""
+    import tensorflow as tf
+
+    tf.keras.utils.set_random_seed(0)
+    model = tf.keras.Sequential([
+        tf.keras.Input(shape=(224, 224, 3)),
+        tf.keras.layers.Conv2D(16, 3, strides=2, activation="relu"),
+        tf.keras.layers.Conv2D(32, 3, strides=2, activation="relu"),
+        tf.keras.layers.GlobalAveragePooling2D(),
+        tf.keras.layers.Dense(2, activation="softmax"),
+    ])
+    model.save(path)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_environment(args, model_dir, port):
+    env = dict(
+        os.environ,
+        PORT=str(port),
+        MODEL_DIR=model_dir,
+        GROQ_CLIENT="stub",
+        GROQ_STUB_LATENCY=str(args.llm_latency),
+        GROQ_STUB_TOKEN_RATE=str(args.llm_token_rate),
+        SERVER_TIMING="1",
+        PYTHONUNBUFFERED="1",
+    )
+    if not args.keep_caches:
+        env.update(PREDICTION_CACHE_SIZE="0", LLM_CACHE_SIZE="0")
+        env.pop("PREDICTION_CACHE_DIR", None)
+    for setting in args.env:
+        name, _, value = setting.partition("=")
+        env[name] = value
+    return env
+
+
+def wait_until_ready(base_url, process, log_path, timeout):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            break
+        try:
+            with urllib.request.urlopen(f"{base_url}/readyz", timeout=2) as response:
+                if response.status == 200:
+                    return
+        except (urllib.error.HTTPError, OSError):
+            pass
+        time.sleep(0.5)
+    with open(log_path, errors="replace") as f:
+        tail = f.read()[-4000:]
+    raise RuntimeError(f"Server did not become ready (exit code {process.poll()}). Log tail:\n{tail}")
+
+
+def stop_server(process):
+    if process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+
+# --- RESULTS ---
+def git_revision():
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True,
+                                  timeout=30).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return ""
+
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def compare(current, previous):
+    """Print the change in latency, RPS and memory against an earlier result file."""
+    print(f"\nComparison with {previous['meta'].get('commit') or 'unknown commit'} ({previous['meta'].get('timestamp')}):")
+    rows = []
+    for endpoint, result in current["endpoints"].items():
+        before = previous.get("endpoints", {}).get(endpoint)
+        if not before or not result["latency_ms"] or not before.get("latency_ms"):
+            continue
+        for p in PERCENTILES:
+            rows.append((f"{endpoint} p{p} ms", before["latency_ms"][f"p{p}"], result["latency_ms"][f"p{p}"]))
+        rows.append((f"{endpoint} rps", before["rps"], result["rps"]))
+    for key in ("peak_rss_mb", "peak_tree_rss_mb"):
+        if current["memory"].get(key) and previous.get("memory", {}).get(key):
+            rows.append((key, previous["memory"][key], current["memory"][key]))
+    for name, before, after in rows:
+        change = (after - before) / before * 100 if before else 0.0
+        print(f"  {name:<24} {before:>10.2f} -> {after:>10.2f}  ({change:+.1f}%)")
+
+
+def print_summary(results):
+    for endpoint, result in results["endpoints"].items():
+        latency = result["latency_ms"] or {}
+        print(f"\n{endpoint}: {result['requests']} requests, {result['errors']} errors, {result['rps']} req/s")
+        if latency:
+            print(f"  latency ms  p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  max {latency['max']}")
+        for stage, stats in result["stages_ms"].items():
+            print(f"  {stage:<11} p50 {stats['p50']:>9} ms  p95 {stats['p95']:>9} ms  mean {stats['mean']:>9} ms")
+    memory = results["memory"]
+    if memory["peak_rss_mb"] is not None:
+        print(f"\nPeak RSS: {memory['peak_rss_mb']} MB server process, {memory['peak_tree_rss_mb']} MB with workers")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--endpoints", default="predict,chat", help="Comma-separated subset of: predict, chat")
+    parser.add_argument("--requests", type=int, default=100, help="Measured requests per endpoint")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests per endpoint sent first")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--model", help="Model file to serve as the thermal model (default: a tiny synthetic model)")
+    parser.add_argument("--images", help="Directory of images to upload (default: synthetic PNGs)")
+    parser.add_argument("--image-count", type=int, default=32, help="Distinct images to cycle through")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="Stub Groq latency per completion (seconds)")
+    parser.add_argument("--llm-token-rate", type=float, default=0.0,
+                        help="Stub Groq generation speed in tokens per second (0 = instant)")
+    parser.add_argument("--keep-caches", action="store_true", help="Leave the prediction and LLM caches on")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="Extra environment for the server, e.g. --env BATCH_MAX_SIZE=32 (repeatable)")
+    parser.add_argument("--url", help="Benchmark an already running server instead of starting one")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout (seconds)")
+    parser.add_argument("--startup-timeout", type=float, default=300)
+    parser.add_argument("--output", help="Result JSON (default: benchmark-results/<commit>-<timestamp>.json)")
+    parser.add_argument("--compare", help="Earlier result JSON to compare against")
+    args = parser.parse_args(argv)
+
+    endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+    images = directory_images(args.images, args.image_count) if args.images else synthetic_images(args.image_count)
+
+    workdir = tempfile.mkdtemp(prefix="benchmark-")
+    process = monitor = None
+    try:
+        base_url = args.url.rstrip("/") if args.url else None
+        if base_url is None:
+            model_dir = os.path.join(workdir, "models")
+            os.makedirs(model_dir)
+            if args.model:
+                extension = os.path.splitext(args.model)[1]
+                os.symlink(os.path.abspath(args.model), os.path.join(model_dir, "thermal" + extension))
+                if extension == ".tflite":
+                    args.env.insert(0, "MODEL_BACKEND=tflite")
+            else:
+                build_synthetic_model(os.path.join(model_dir, "thermal.keras"))
+
+            port = free_port()
+            base_url = f"http://127.0.0.1:{port}"
+            log_path = os.path.join(workdir, "server.log")
+            with open(log_path, "wb") as log:
+                process = subprocess.Popen(
+                    [sys.executable, os.path.join(BACKEND_DIR, "app.py")],
+                    cwd=BACKEND_DIR, env=server_environment(args, model_dir, port),
+                    stdout=log, stderr=subprocess.STDOUT
+                )
+            print(f"⏳ Waiting for the server on {base_url} ...")
+            wait_until_ready(base_url, process, log_path, args.startup_timeout)
+            monitor = RSSMonitor(process.pid).start()
+
+        results = {
+            "meta": dict(
+                git_revision(),
+                timestamp=time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+                python=platform.python_version(),
+                platform=platform.platform(),
+                cpu_count=os.cpu_count(),
+            ),
+            "config": {
+                "requests": args.requests,
+                "warmup": args.warmup,
+                "concurrency": args.concurrency,
+                "model": args.model or ("external" if args.url else "synthetic"),
+                "images": args.images or f"{len(images)} synthetic",
+                "llm_latency": args.llm_latency,
+                "llm_token_rate": args.llm_token_rate,
+                "keep_caches": args.keep_caches,
+                "env": args.env,
+            },
+            "endpoints": {},
+        }
+        for endpoint in endpoints:
+            if args.warmup:
+                run_load(build_requests(endpoint, base_url, args.warmup, images), args.concurrency, args.timeout)
+            print(f"🚀 {endpoint}: {args.requests} requests, concurrency {args.concurrency}")
+            records, seconds = run_load(
+                build_requests(endpoint, base_url, args.requests, images), args.concurrency, args.timeout
+            )
+            results["endpoints"][endpoint] = summarize(records, seconds)
+
+        if monitor is not None:
+            monitor.stop()
+        results["memory"] = monitor.stats() if monitor is not None else {"peak_rss_mb": None, "peak_tree_rss_mb": None}
+    finally:
+        if monitor is not None:
+            monitor.stop()
+        if process is not None:
+            stop_server(process)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_summary(results)
+    output = args.output
+    if not output:
+        commit = (results["meta"]["commit"] or "unknown")[:12]
+        output = os.path.join("benchmark-results", f"{commit}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Results written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f))
+    return 0 if all(result["errors"] == 0 for result in results["endpoints"].values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
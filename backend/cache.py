@@ -0,0 +1,259 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_fingerprint(path, chunk_size=1 << 20):
+    """SHA-256 of a file's contents, read in chunks so large models stay out of RAM."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# --- IN-MEMORY LRU ---
+class LRUCache:
+    """Thread-safe, size-bounded LRU mapping."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = int(max_entries)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._data:
+                return None
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+# --- PREDICTION CACHE ---
+class PredictionCache:
+    """Content-addressed cache of diagnosis results.
+
+    Entries are keyed on the SHA-256 of the uploaded image bytes together with the
+    model version and a fingerprint of the model file, so a result computed by one
+    model is never returned for another. The optional disk tier stores one JSON file
+    per entry under `disk_dir/<model fingerprint>/` and survives restarts.
+    """
+
+    def __init__(self, model_path, model_version="1", max_entries=1024, disk_dir=None):
+        self.model_version = str(model_version)
+        self.model_fingerprint = file_fingerprint(model_path)
+        self.memory = LRUCache(max_entries)
+        self.disk_dir = None
+        if disk_dir:
+            self.disk_dir = os.path.join(disk_dir, self.model_fingerprint[:16])
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def key(self, image_bytes, variant=""):
+        content_hash = sha256_bytes(image_bytes)
+        return f"{self.model_version}:{self.model_fingerprint}:{content_hash}{variant}"
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, sha256_bytes(key.encode("utf-8")) + ".json")
+
+    def _read_disk(self, key):
+        path = self._disk_path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Warning: Ignoring unreadable cache entry {path}: {e}")
+            return None
+
+        if (entry.get("key") != key
+                or entry.get("model_version") != self.model_version
+                or entry.get("model_fingerprint") != self.model_fingerprint):
+            return None
+        return entry.get("result")
+
+    def _write_disk(self, key, result):
+        entry = {
+            "key": key,
+            "model_version": self.model_version,
+            "model_fingerprint": self.model_fingerprint,
+            "result": result,
+        }
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, self._disk_path(key))
+        except OSError as e:
+            print(f"⚠️ Warning: Could not write prediction cache entry: {e}")
+
+    def get(self, image_bytes, variant=""):
+        key = self.key(image_bytes, variant)
+        result = self.memory.get(key)
+        if result is not None:
+            with self._lock:
+                self.memory_hits += 1
+            return result
+
+        if self.disk_dir:
+            result = self._read_disk(key)
+            if result is not None:
+                self.memory.put(key, result)
+                with self._lock:
+                    self.disk_hits += 1
+                return result
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, image_bytes, result, variant=""):
+        key = self.key(image_bytes, variant)
+        self.memory.put(key, result)
+        if self.disk_dir:
+            self._write_disk(key, result)
+
+    def stats(self):
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "model_version": self.model_version,
+                "model_fingerprint": self.model_fingerprint,
+                "entries": len(self.memory),
+                "max_entries": self.memory.max_entries,
+                "evictions": self.memory.evictions,
+                "disk_enabled": self.disk_dir is not None,
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# --- TTL CACHE ---
+class TTLCache:
+    """Thread-safe LRU mapping whose entries also expire `ttl` seconds after insertion."""
+
+    def __init__(self, max_entries=512, ttl=3600.0, clock=time.monotonic):
+        self.max_entries = int(max_entries)
+        self.ttl = float(ttl)
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self.clock():
+                del self._data[key]
+                self.expirations += 1
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._data[key] = (self.clock() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+
+# --- LLM RESPONSE CACHE ---
+def normalize_prompt(text):
+    """Collapse whitespace so cosmetic differences do not produce distinct cache keys."""
+    return " ".join(str(text).split())
+
+
+def bucket_probability(value, bucket):
+    """Round a percentage to the nearest `bucket` percent (0 leaves it unchanged)."""
+    if not bucket:
+        return value
+    return round(round(float(value) / bucket) * bucket, 2)
+
+
+class ResponseCache:
+    """Cache of chat completion texts keyed on the normalized messages, model and sampling settings."""
+
+    def __init__(self, max_entries=512, ttl=3600.0):
+        self.entries = TTLCache(max_entries, ttl)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, messages, model, temperature, max_tokens=None):
+        payload = {
+            "model": model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "messages": [[m["role"], normalize_prompt(m["content"])] for m in messages],
+        }
+        return sha256_bytes(json.dumps(payload, sort_keys=True).encode("utf-8"))
+
+    def get(self, key):
+        value = self.entries.get(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self.entries.put(key, value)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "max_entries": self.entries.max_entries,
+                "ttl_seconds": self.entries.ttl,
+                "evictions": self.entries.evictions,
+                "expirations": self.entries.expirations,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
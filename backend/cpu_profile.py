@@ -0,0 +1,77 @@
+"""CPU inference profiles written by autotune.py and applied when the server starts.
+
+A profile is a JSON file whose "settings" map holds environment variables
+(TF_ENABLE_ONEDNN_OPTS, INFERENCE_INTRA_OP_THREADS, INFERENCE_INTER_OP_THREADS,
+BATCH_MAX_SIZE). They are applied with `setdefault`, so a variable set in the
+environment or in .env always wins over the profile. The rest of the file
+(host, model, measured curves) is kept for reference.
+"""
+
+import json
+import os
+
+PROFILE_SETTINGS = (
+    "TF_ENABLE_ONEDNN_OPTS",
+    "INFERENCE_INTRA_OP_THREADS",
+    "INFERENCE_INTER_OP_THREADS",
+    "BATCH_MAX_SIZE",
+)
+
+
+def host_info():
+    """CPU count and model name, recorded in a profile so a mismatched host can be detected."""
+    cpu_model = None
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    cpu_model = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    return {"cpu_count": os.cpu_count(), "cpu_model": cpu_model}
+
+
+def load_profile(path):
+    """The profile at `path`, or None when there is no such file."""
+    if not path or not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_profile(path, profile):
+    with open(path, "w") as f:
+        json.dump(profile, f, indent=2)
+
+
+def apply_profile(profile, environ=None):
+    """Set the profile's settings that are not already in `environ`; returns the ones applied."""
+    environ = os.environ if environ is None else environ
+    applied = {}
+    for name, value in (profile or {}).get("settings", {}).items():
+        if name not in PROFILE_SETTINGS or name in environ:
+            continue
+        environ[name] = str(value)
+        applied[name] = str(value)
+    return applied
+
+
+def apply_profile_file(path, environ=None):
+    """Load and apply the profile at `path`, printing what was applied. Never raises."""
+    try:
+        profile = load_profile(path)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Warning: could not read CPU profile {path}: {e}")
+        return {}
+    if profile is None:
+        return {}
+    applied = apply_profile(profile, environ)
+    tuned_cpus = profile.get("host", {}).get("cpu_count")
+    if tuned_cpus and tuned_cpus != os.cpu_count():
+        print(f"⚠️ Warning: CPU profile {path} was tuned on {tuned_cpus} CPUs, this host has {os.cpu_count()}")
+    overridden = sorted(set(profile.get("settings", {})) - set(applied))
+    summary = ", ".join(f"{name}={value}" for name, value in applied.items()) or "nothing"
+    print(f"✅ Applied CPU profile {path}: {summary}"
+          + (f" (kept from environment: {', '.join(overridden)})" if overridden else ""))
+    return applied
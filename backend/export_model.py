@@ -0,0 +1,159 @@
+"""Export the thermal model to a TFLite artifact and check it against the Keras model.
+
+Usage:
+    python export_model.py --quantize int8 \
+        --calibration-dir breast-cancer-dataset/Train --test-dir breast-cancer-dataset/Test
+
+Writes thermal.tflite next to app.py (serve it with MODEL_BACKEND=tflite) and, when
+--test-dir is given, an accuracy-parity report comparing it with thermal.keras.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from inference_backends import TFLiteModel
+from models.preprocessing import preprocess_bytes
+
+CLASS_NAMES = ["Benign", "Malignant"]
+IMAGE_PATTERNS = ("*.png", "*.jpg", "*.jpeg")
+
+
+def list_split(directory):
+    """Return [(path, label)] for a split laid out as <directory>/<Benign|Malignant>/*.png."""
+    samples = []
+    for label, class_name in enumerate(CLASS_NAMES):
+        class_dir = Path(directory) / class_name
+        for pattern in IMAGE_PATTERNS:
+            samples.extend((path, label) for path in sorted(class_dir.glob(pattern)))
+    return samples
+
+
+def load_images(paths):
+    batch = np.empty((len(paths), 224, 224, 3), dtype=np.float32)
+    for i, path in enumerate(paths):
+        preprocess_bytes(Path(path).read_bytes(), out=batch[i])
+    return batch
+
+
+def representative_dataset(calibration_dir, num_samples, seed=42):
+    """Calibration generator for int8 post-training quantization, using the server's preprocessing."""
+    samples = list_split(calibration_dir)
+    if not samples:
+        raise ValueError(f"No calibration images found under {calibration_dir}")
+    random.Random(seed).shuffle(samples)
+    samples = samples[:num_samples]
+    print(f"Calibrating on {len(samples)} images from {calibration_dir}")
+
+    def generator():
+        for path, _ in samples:
+            yield [load_images([path])]
+
+    return generator
+
+
+def convert(keras_model, quantize="none", calibration_dir=None, calibration_samples=200):
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(keras_model)
+    if quantize == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantize == "int8":
+        if not calibration_dir:
+            raise ValueError("int8 quantization needs --calibration-dir")
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.representative_dataset = representative_dataset(calibration_dir, calibration_samples)
+        # Inputs and outputs stay float32 so the server feeds the artifact exactly like the Keras model
+    elif quantize != "none":
+        raise ValueError(f"Unknown quantization mode '{quantize}'")
+    return converter.convert()
+
+
+def parity_report(keras_model, tflite_model, test_dir, batch_size=32):
+    """Run both models over the held-out split and compare accuracy and probabilities."""
+    samples = list_split(test_dir)
+    if not samples:
+        raise ValueError(f"No test images found under {test_dir}")
+    labels = np.array([label for _, label in samples])
+
+    keras_probs, tflite_probs = [], []
+    keras_seconds = tflite_seconds = 0.0
+    for start in range(0, len(samples), batch_size):
+        batch = load_images([path for path, _ in samples[start:start + batch_size]])
+
+        started = time.perf_counter()
+        keras_probs.append(np.asarray(keras_model.predict_on_batch(batch)))
+        keras_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        tflite_probs.append(tflite_model.predict_on_batch(batch))
+        tflite_seconds += time.perf_counter() - started
+
+    keras_probs = np.concatenate(keras_probs)
+    tflite_probs = np.concatenate(tflite_probs)
+    keras_pred = keras_probs.argmax(axis=1)
+    tflite_pred = tflite_probs.argmax(axis=1)
+    abs_diff = np.abs(keras_probs - tflite_probs)
+
+    return {
+        "test_dir": str(test_dir),
+        "samples": int(len(samples)),
+        "keras_accuracy": round(float((keras_pred == labels).mean()), 4),
+        "tflite_accuracy": round(float((tflite_pred == labels).mean()), 4),
+        "prediction_agreement": round(float((keras_pred == tflite_pred).mean()), 4),
+        "max_abs_prob_diff": round(float(abs_diff.max()), 6),
+        "mean_abs_prob_diff": round(float(abs_diff.mean()), 6),
+        "keras_ms_per_image": round(keras_seconds * 1000 / len(samples), 3),
+        "tflite_ms_per_image": round(tflite_seconds * 1000 / len(samples), 3),
+    }
+
+
+def main(argv=None):
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=os.path.join(backend_dir, "thermal.keras"),
+                        help="Keras model saved by python -m models.train thermal")
+    parser.add_argument("--output", default=os.path.join(backend_dir, "thermal.tflite"))
+    parser.add_argument("--quantize", choices=["none", "float16", "int8"], default="none")
+    parser.add_argument("--calibration-dir", help="Training split used to calibrate int8 quantization")
+    parser.add_argument("--calibration-samples", type=int, default=200)
+    parser.add_argument("--test-dir", help="Held-out split for the accuracy-parity report")
+    parser.add_argument("--report", help="Where to write the parity report (default: <output>.parity.json)")
+    args = parser.parse_args(argv)
+
+    import tensorflow as tf
+
+    keras_model = tf.keras.models.load_model(args.model)
+    tflite_bytes = convert(keras_model, args.quantize, args.calibration_dir, args.calibration_samples)
+    with open(args.output, "wb") as f:
+        f.write(tflite_bytes)
+    print(f"✅ Wrote {args.output} ({len(tflite_bytes) / 1e6:.1f} MB, quantization: {args.quantize})")
+
+    if not args.test_dir:
+        return 0
+
+    report = parity_report(keras_model, TFLiteModel(args.output), args.test_dir)
+    report.update({
+        "keras_model": args.model,
+        "tflite_model": args.output,
+        "quantization": args.quantize,
+        "keras_size_mb": round(os.path.getsize(args.model) / 1e6, 2),
+        "tflite_size_mb": round(len(tflite_bytes) / 1e6, 2),
+    })
+    report_path = args.report or args.output + ".parity.json"
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"✅ Parity report written to {report_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""Local HTTP server that imitates the Groq chat completions API, for testing the LLM client layer.
+
+Usage (from backend/):
+    python fake_groq_server.py --port 8089 --latency 0.3 --error-rate 0.2 --rate-limit-rpm 60
+    GROQ_BASE_URL=http://127.0.0.1:8089 GROQ_API=test python app.py
+
+Serves POST /openai/v1/chat/completions, both plain and streamed (server-sent
+events), with the same deterministic reply as the offline stub client. It can
+inject failures: --error-rate answers that share of requests with --error-status,
+--rate-limit-rpm answers 429 with a Retry-After header once the per-minute budget
+is spent, and --down answers every request with 503.
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from llm_stub import DEFAULT_REPLY
+
+COMPLETIONS_PATH = "/openai/v1/chat/completions"
+
+
+class FakeGroqServer:
+    """Threaded fake Groq API. `port=0` picks a free port; `url` is the base URL to give the client."""
+
+    def __init__(self, host="127.0.0.1", port=0, reply=DEFAULT_REPLY, latency=0.0, token_rate=0.0,
+                 error_rate=0.0, error_status=503, rate_limit_rpm=0, down=False, seed=0):
+        self.reply = reply
+        self.latency = latency
+        self.token_rate = token_rate
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.rate_limit_rpm = rate_limit_rpm
+        self.down = down
+        self.requests = 0
+        self.errors = 0
+        self.rate_limited = 0
+        self._rng = random.Random(seed)
+        self._window = []
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve on a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-groq", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        try:
+            self._httpd.serve_forever()
+        finally:
+            self._httpd.server_close()
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _admit(self):
+        """None to answer normally, or (status, headers) of an injected failure."""
+        with self._lock:
+            self.requests += 1
+            if self.down:
+                self.errors += 1
+                return 503, {}
+            if self.rate_limit_rpm:
+                now = time.monotonic()
+                self._window = [t for t in self._window if now - t < 60]
+                if len(self._window) >= self.rate_limit_rpm:
+                    self.rate_limited += 1
+                    retry_after = max(60 - (now - self._window[0]), 0.1)
+                    return 429, {"Retry-After": f"{retry_after:.1f}"}
+                self._window.append(now)
+            if self.error_rate and self._rng.random() < self.error_rate:
+                self.errors += 1
+                return self.error_status, {}
+        return None
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, status, payload, headers=None):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if self.path != COMPLETIONS_PATH:
+                    self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+                    return
+
+                failure = server._admit()
+                if failure is not None:
+                    status, headers = failure
+                    message = "Rate limit reached" if status == 429 else "Injected failure"
+                    self._send_json(status, {"error": {"message": message, "type": "fake_groq_error"}}, headers)
+                    return
+
+                if server.latency:
+                    time.sleep(server.latency)
+                model = request.get("model", "fake-model")
+                tokens = re.findall(r"\s*\S+\s*", server.reply)
+                prompt_tokens = sum(len(str(m.get("content", ""))) for m in request.get("messages", [])) // 4
+                usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens),
+                         "total_tokens": prompt_tokens + len(tokens)}
+                if request.get("stream"):
+                    self._stream(model, tokens, usage)
+                    return
+                if server.token_rate:
+                    time.sleep(len(tokens) / server.token_rate)
+                self._send_json(200, {
+                    "id": f"chatcmpl-{uuid.uuid4().hex}",
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": server.reply},
+                                 "finish_reason": "stop", "logprobs": None}],
+                    "usage": usage,
+                })
+
+            def _stream(self, model, tokens, usage):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+                interval = 1.0 / server.token_rate if server.token_rate else 0.0
+
+                def event(delta, finish_reason=None, extra=None):
+                    chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": model,
+                             "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]}
+                    chunk.update(extra or {})
+                    self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+
+                for index, token in enumerate(tokens):
+                    if interval and index:
+                        time.sleep(interval)
+                    event({"role": "assistant", "content": token} if index == 0 else {"content": token})
+                event({}, "stop", {"x_groq": {"id": completion_id, "usage": usage}})
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+                self.close_connection = True
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds before each reply starts")
+    parser.add_argument("--token-rate", type=float, default=0.0, help="Tokens per second (0 = instant)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--rate-limit-rpm", type=int, default=0, help="Requests per minute before answering 429")
+    parser.add_argument("--down", action="store_true", help="Answer every request with 503")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    server = FakeGroqServer(
+        args.host, args.port, latency=args.latency, token_rate=args.token_rate, error_rate=args.error_rate,
+        error_status=args.error_status, rate_limit_rpm=args.rate_limit_rpm, down=args.down, seed=args.seed
+    )
+    print(f"🚀 Fake Groq API on {server.url} (set GROQ_BASE_URL={server.url})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+"""Template report sections used when the LLM cannot be reached.
+
+They only restate the classifier output and the patient fields, with the
+standard follow-up advice for the result, and say plainly that they were not
+written by the AI assistant.
+"""
+
+NOTICE = (
+    "Note: the AI-generated report is temporarily unavailable. This summary was produced from a fixed "
+    "template and should be reviewed by a qualified clinician."
+)
+
+
+def is_fallback(text):
+    """True for a section produced by this module rather than by the LLM."""
+    return isinstance(text, str) and text.startswith(NOTICE)
+
+
+def _likely_positive(positive_prob):
+    return float(positive_prob) >= 50
+
+
+def fallback_report(patient_data, negative, positive):
+    """Detailed report section. `negative` and `positive` are (class name, probability in %) pairs."""
+    (negative_name, negative_prob), (positive_name, positive_prob) = negative, positive
+    finding = positive_name if _likely_positive(positive_prob) else negative_name
+    if _likely_positive(positive_prob):
+        assessment = (
+            f"The image classifier rates this scan as more likely {positive_name} ({positive_prob}%). "
+            "This is a screening result, not a diagnosis; it calls for prompt clinical evaluation."
+        )
+    else:
+        assessment = (
+            f"The image classifier rates this scan as more likely {negative_name} ({negative_prob}%). "
+            "A low-risk screening result does not rule out disease, particularly when symptoms are present."
+        )
+    return f"""{NOTICE}
+
+Diagnostic Report (template)
+
+Patient Profile:
+- Age: {patient_data.get('age', 'N/A')}
+- Imaging Method: {patient_data.get('image_type', 'N/A')}
+- Presence of Lump: {patient_data.get('lump', 'N/A')}
+- Family History of Breast Cancer: {patient_data.get('family', 'N/A')}
+- Breast Density: {patient_data.get('density', 'N/A')}
+
+AI Analysis Results:
+- {negative_name} Probability: {negative_prob}%
+- {positive_name} Probability: {positive_prob}%
+- Most likely class: {finding}
+
+Assessment:
+{assessment}
+
+Risk factors to review: reported lump ({patient_data.get('lump', 'N/A')}), family history \
+({patient_data.get('family', 'N/A')}) and breast density ({patient_data.get('density', 'N/A')})."""
+
+
+def fallback_recommendations(patient_data, negative, positive):
+    """Recommendations section, with the same arguments as `fallback_report`."""
+    _, (positive_name, positive_prob) = negative, positive
+    if _likely_positive(positive_prob):
+        steps = [
+            "Priority 9, within 1-2 weeks: consult a breast specialist to review this result.",
+            "Priority 8, within 2 weeks: diagnostic mammography and/or ultrasound as advised by the specialist.",
+            "Priority 7, as advised: biopsy if the diagnostic imaging confirms a suspicious finding.",
+            "Priority 5, ongoing: keep a record of any new symptoms (lumps, skin or nipple changes, pain).",
+            "Priority 4, ongoing: discuss family history and genetic counselling if relevant.",
+        ]
+    else:
+        steps = [
+            "Priority 6, at the next routine visit: share this result with your primary care provider.",
+            "Priority 5, per guidelines for your age: continue regular screening mammography.",
+            "Priority 5, ongoing: see a clinician promptly if you notice a lump or other breast changes.",
+            "Priority 4, ongoing: discuss family history and breast density, which may call for extra screening.",
+            "Priority 3, ongoing: maintain a healthy weight, stay active and limit alcohol.",
+        ]
+    lines = "\n".join(f"{number}. {step}" for number, step in enumerate(steps, start=1))
+    return f"""{NOTICE}
+
+Recommendations (template, {positive_name} probability {positive_prob}%, age {patient_data.get('age', 'N/A')}):
+{lines}"""
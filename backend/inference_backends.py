@@ -0,0 +1,96 @@
+import os
+import threading
+
+import numpy as np
+
+MODEL_EXTENSIONS = {
+    "keras": ".keras",
+    "tflite": ".tflite",
+}
+
+
+def _tflite_interpreter_class():
+    # Prefer the standalone runtimes so serving a .tflite file does not need full TensorFlow
+    try:
+        from ai_edge_litert.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    try:
+        from tflite_runtime.interpreter import Interpreter
+        return Interpreter
+    except ImportError:
+        pass
+    import tensorflow as tf
+    return tf.lite.Interpreter
+
+
+class TFLiteModel:
+    """Runs a converted .tflite artifact behind the same `predict_on_batch` API as a Keras model.
+
+    The interpreter is not thread-safe, so calls are serialized; the input tensor
+    is resized whenever the batch size changes.
+    """
+
+    def __init__(self, model_path, num_threads=0):
+        interpreter_class = _tflite_interpreter_class()
+        kwargs = {"model_path": model_path}
+        if num_threads:
+            kwargs["num_threads"] = int(num_threads)
+        self.interpreter = interpreter_class(**kwargs)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = int(self._input["shape"][0])
+        self._lock = threading.Lock()
+
+    def _quantize_input(self, batch):
+        scale, zero_point = self._input.get("quantization", (0.0, 0))
+        if self._input["dtype"] == np.float32 or not scale:
+            return batch.astype(self._input["dtype"], copy=False)
+        # Out-of-range values saturate instead of wrapping around in the integer cast
+        limits = np.iinfo(self._input["dtype"])
+        return np.clip(np.round(batch / scale + zero_point), limits.min, limits.max).astype(self._input["dtype"])
+
+    def _dequantize_output(self, outputs):
+        scale, zero_point = self._output.get("quantization", (0.0, 0))
+        if self._output["dtype"] == np.float32 or not scale:
+            return outputs.astype(np.float32, copy=False)
+        return (outputs.astype(np.float32) - zero_point) * scale
+
+    def predict_on_batch(self, batch):
+        batch = np.asarray(batch, dtype=np.float32)
+        with self._lock:
+            if batch.shape[0] != self._batch_size:
+                self.interpreter.resize_tensor_input(self._input["index"], list(batch.shape))
+                self.interpreter.allocate_tensors()
+                self._input = self.interpreter.get_input_details()[0]
+                self._output = self.interpreter.get_output_details()[0]
+                self._batch_size = batch.shape[0]
+            self.interpreter.set_tensor(self._input["index"], self._quantize_input(batch))
+            self.interpreter.invoke()
+            outputs = self.interpreter.get_tensor(self._output["index"])
+        return self._dequantize_output(outputs)
+
+
+def load_inference_model(model_path, backend="keras", intra_op_threads=0, inter_op_threads=0):
+    """Load `model_path` with the requested backend ('keras' or 'tflite').
+
+    Both return an object with `predict_on_batch(batch) -> (N, classes)`.
+    """
+    if backend == "tflite":
+        return TFLiteModel(model_path, num_threads=intra_op_threads)
+    if backend != "keras":
+        raise ValueError(f"Unknown model backend '{backend}', expected one of {sorted(MODEL_EXTENSIONS)}")
+
+    import tensorflow as tf
+    if intra_op_threads:
+        tf.config.threading.set_intra_op_parallelism_threads(int(intra_op_threads))
+    if inter_op_threads:
+        tf.config.threading.set_inter_op_parallelism_threads(int(inter_op_threads))
+    return tf.keras.models.load_model(model_path)
+
+
+def model_file_for(backend, directory, stem="thermal"):
+    """Path of the `stem` model for `backend`, e.g. thermal.keras or mri.tflite."""
+    return os.path.join(directory, stem + MODEL_EXTENSIONS.get(backend, MODEL_EXTENSIONS["keras"]))
@@ -0,0 +1,256 @@
+import json
+import queue
+import sqlite3
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+
+class JobStore:
+    """Prediction jobs persisted in SQLite.
+
+    A job holds the uploaded image until it has been classified, then its
+    diagnosis and report sections as they become available. One connection is
+    shared by all threads behind a lock; with a file path the database survives
+    restarts, and `":memory:"` keeps everything in process.
+    """
+
+    QUEUED = "queued"
+    CLASSIFYING = "classifying"
+    GENERATING = "generating"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    FINISHED = (COMPLETED, FAILED)
+
+    JSON_FIELDS = ("patient_data", "diagnosis")
+    PUBLIC_FIELDS = (
+        "job_id", "status", "model", "patient_data", "diagnosis", "detailed_report", "detailed_recommendations",
+        "error", "webhook_url", "webhook_status", "created_at", "updated_at", "classified_at", "finished_at",
+    )
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                model TEXT,
+                image BLOB,
+                patient_data TEXT,
+                diagnosis TEXT,
+                detailed_report TEXT,
+                detailed_recommendations TEXT,
+                error TEXT,
+                webhook_url TEXT,
+                webhook_status TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL,
+                classified_at REAL,
+                finished_at REAL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status)")
+
+    def create(self, image_bytes, patient_data, model, webhook_url=None):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (job_id, status, model, image, patient_data, webhook_url, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, self.QUEUED, model, sqlite3.Binary(image_bytes), json.dumps(patient_data), webhook_url,
+                 now, now),
+            )
+        return job_id
+
+    def update(self, job_id, **fields):
+        """Set columns of a job; JSON fields are serialized and updated_at is refreshed."""
+        fields["updated_at"] = time.time()
+        for name in self.JSON_FIELDS:
+            if name in fields and fields[name] is not None:
+                fields[name] = json.dumps(fields[name])
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            self._db.execute(f"UPDATE jobs SET {assignments} WHERE job_id = ?", (*fields.values(), job_id))
+
+    def get(self, job_id, include_image=False):
+        with self._lock:
+            row = self._db.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        for name in self.JSON_FIELDS:
+            if job[name] is not None:
+                job[name] = json.loads(job[name])
+        if not include_image:
+            job.pop("image")
+        return job
+
+    def public(self, job):
+        """The fields returned to clients (the image is never echoed back)."""
+        return {name: job.get(name) for name in self.PUBLIC_FIELDS}
+
+    def unfinished(self):
+        """Ids of jobs that were queued or running, oldest first (used to resume them after a restart)."""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT job_id FROM jobs WHERE status NOT IN (?, ?) ORDER BY created_at", self.FINISHED
+            ).fetchall()
+        return [row["job_id"] for row in rows]
+
+    def purge(self, older_than):
+        """Delete finished jobs last updated more than `older_than` seconds ago."""
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND updated_at < ?",
+                (*self.FINISHED, time.time() - older_than),
+            )
+        return cursor.rowcount
+
+    def counts(self):
+        with self._lock:
+            rows = self._db.execute("SELECT status, COUNT(*) AS count FROM jobs GROUP BY status").fetchall()
+        return {row["status"]: row["count"] for row in rows}
+
+
+def webhook_allowed(url, allowed_hosts):
+    """Webhooks only go to http(s) URLs on allowlisted hosts (by default the local machine)."""
+    try:
+        parts = urlsplit(url)
+    except ValueError:
+        return False
+    return parts.scheme in ("http", "https") and (parts.hostname or "").lower() in allowed_hosts
+
+
+def post_json(url, payload, timeout):
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"}, method="POST"
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        response.read()
+        return response.status
+
+
+class JobQueue:
+    """In-process queue running prediction jobs from a JobStore on worker threads.
+
+    `handler(job, update)` does the work for one job and reports progress through
+    `update(**fields)`, which persists the fields and, when the job's status
+    changes to one listed in `notify_on`, posts the job to its webhook. Webhooks are
+    delivered in order on their own thread and retried with exponential backoff, so
+    a slow receiver never holds up a worker.
+    """
+
+    def __init__(self, store, handler, workers=2, max_queued=1000, webhook_timeout=5.0, webhook_retries=3,
+                 notify_on=(JobStore.GENERATING, JobStore.COMPLETED, JobStore.FAILED)):
+        self.store = store
+        self.handler = handler
+        self.workers = workers
+        self.max_queued = max_queued
+        self.webhook_timeout = webhook_timeout
+        self.webhook_retries = webhook_retries
+        self.notify_on = set(notify_on)
+
+        self._queue = queue.Queue()
+        self._threads = []
+        self._webhooks = ThreadPoolExecutor(max_workers=1, thread_name_prefix="webhook")
+        self._lock = threading.Lock()
+        self.processed = 0
+        self.failed = 0
+        self.webhooks_sent = 0
+        self.webhooks_failed = 0
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return self
+            for job_id in self.store.unfinished():
+                self._queue.put(job_id)
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"job-worker-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def stop(self):
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._webhooks.shutdown(wait=False)
+
+    @property
+    def full(self):
+        return self.max_queued > 0 and self._queue.qsize() >= self.max_queued
+
+    def submit(self, job_id):
+        self._queue.put(job_id)
+
+    def _run(self):
+        while True:
+            job_id = self._queue.get()
+            if job_id is None:
+                return
+            job = self.store.get(job_id, include_image=True)
+            if job is None or job["status"] in JobStore.FINISHED:
+                continue
+            try:
+                self.handler(job, lambda **fields: self._update(job, fields))
+                with self._lock:
+                    self.processed += 1
+            except Exception as e:
+                print(f"❌ Job {job_id} failed: {e}")
+                self._update(job, {"status": JobStore.FAILED, "error": "Job failed", "finished_at": time.time()})
+                with self._lock:
+                    self.failed += 1
+
+    def _update(self, job, fields):
+        status_changed = "status" in fields and fields["status"] != job["status"]
+        job.update(fields)
+        self.store.update(job["job_id"], **fields)
+        if status_changed and job.get("webhook_url") and fields["status"] in self.notify_on:
+            self._webhooks.submit(self._deliver, job["job_id"], job["webhook_url"],
+                                  dict(self.store.public(job), event=f"job.{fields['status']}"))
+
+    def _deliver(self, job_id, url, payload):
+        delay = 0.5
+        for attempt in range(1, self.webhook_retries + 2):
+            try:
+                status = post_json(url, payload, self.webhook_timeout)
+                if status < 300:
+                    self.store.update(job_id, webhook_status=f"delivered {payload['event']}")
+                    with self._lock:
+                        self.webhooks_sent += 1
+                    return
+                reason = f"HTTP {status}"
+            except (urllib.error.URLError, OSError) as e:
+                reason = str(e)
+            if attempt <= self.webhook_retries:
+                time.sleep(delay)
+                delay *= 2
+        print(f"⚠️ Warning: Webhook for job {job_id} failed after {attempt} attempts: {reason}")
+        self.store.update(job_id, webhook_status=f"failed {payload['event']}: {reason}")
+        with self._lock:
+            self.webhooks_failed += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queued": self._queue.qsize(),
+                "max_queued": self.max_queued,
+                "processed": self.processed,
+                "failed": self.failed,
+                "webhooks_sent": self.webhooks_sent,
+                "webhooks_failed": self.webhooks_failed,
+                "jobs_by_status": self.store.counts(),
+            }
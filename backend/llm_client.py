@@ -0,0 +1,356 @@
+import random
+import threading
+import time
+from types import SimpleNamespace
+
+import groq
+
+
+class LLMUnavailableError(Exception):
+    """Raised without calling the API: the circuit is open or a limit cannot be met before the deadline."""
+
+
+# --- RATE LIMITING ---
+class TokenBucket:
+    """Token bucket refilled at `per_minute` tokens per minute, holding at most `capacity`.
+
+    Used both for requests per minute (one token per call) and for LLM tokens per
+    minute (the estimated size of each call). `adjust()` corrects the level once the
+    real usage is known and may push it below zero, which delays later callers.
+    """
+
+    def __init__(self, per_minute, capacity=None, clock=time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = float(capacity or per_minute)
+        self.clock = clock
+        self.level = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount, deadline=None, sleep=time.sleep):
+        """Take `amount` tokens, waiting for the refill; returns the seconds waited."""
+        amount = min(float(amount), self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self.level >= amount:
+                    self.level -= amount
+                    return waited
+                wait = (amount - self.level) / self.rate
+            if deadline is not None and self.clock() + wait > deadline:
+                raise LLMUnavailableError("rate limit would be exceeded before the deadline")
+            sleep(wait)
+            waited += wait
+
+    def adjust(self, amount):
+        with self._lock:
+            self._refill()
+            self.level = min(self.capacity, self.level - amount)
+
+
+# --- CIRCUIT BREAKER ---
+class CircuitBreaker:
+    """Stops calling a failing service for a while.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls are
+    rejected. Once `reset_timeout` seconds have passed, one trial call is let through
+    (half-open): its success closes the circuit, and its failure opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self.opens = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        """Raise LLMUnavailableError if the call must not go out; True if it is the half-open trial."""
+        with self._lock:
+            if self.state == self.OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.OPEN or (self.state == self.HALF_OPEN and self._trial_in_flight):
+                raise LLMUnavailableError("circuit breaker is open")
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def cancel_trial(self):
+        """The trial call was never sent (e.g. no rate-limit budget), so let the next call be the trial."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opens += 1
+                    print(f"⚠️ Warning: LLM circuit breaker opened after {self.failures} failures")
+                self.state = self.OPEN
+                self.opened_at = self.clock()
+            self._trial_in_flight = False
+
+
+# --- ERROR CLASSIFICATION ---
+def is_retryable(error):
+    """429s, 5xx responses, timeouts and connection errors are worth another attempt."""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    return isinstance(error, groq.APIConnectionError)
+
+
+def is_outage(error):
+    """Failures that count against the circuit breaker; other 4xx mean the service itself is up."""
+    status = getattr(error, "status_code", None)
+    return status is None or status >= 500
+
+
+def retry_after(error):
+    """Seconds from the Retry-After header of a rate-limited response, if any."""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return max(float(value), 0.0) if value is not None else None
+    except ValueError:
+        return None
+
+
+def estimate_tokens(request):
+    """Rough upper bound of a completion's tokens: ~4 characters per prompt token plus max_tokens."""
+    prompt = sum(len(str(message.get("content", ""))) for message in request.get("messages") or [])
+    return prompt // 4 + (request.get("max_tokens") or 1024)
+
+
+class ResilientGroq:
+    """Wraps a Groq (or compatible) client with concurrency and rate limits, retries and a circuit breaker.
+
+    Exposes the same `chat.completions.create(**kwargs)` as the wrapped client.
+    The `timeout` of a call is its total budget: waiting for a rate limit slot,
+    every attempt and the backoff between attempts must fit in it. Retries use
+    exponential backoff with full jitter, or the server's Retry-After when given.
+    Streamed calls are retried only until the stream starts.
+    """
+
+    def __init__(self, client, max_concurrency=8, requests_per_minute=0, tokens_per_minute=0, max_retries=3,
+                 backoff_base=0.5, backoff_max=8.0, breaker=None, default_timeout=None, sleep=time.sleep,
+                 rng=None):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.default_timeout = default_timeout
+        self.sleep = sleep
+        self.rng = rng or random.Random()
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+
+        self._slots = threading.BoundedSemaphore(max_concurrency) if max_concurrency > 0 else None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.retries = 0
+        self.rejected = 0
+        self.throttled_seconds = 0.0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + amount)
+
+    @staticmethod
+    def _remaining(deadline):
+        return None if deadline is None else max(deadline - time.monotonic(), 0.0)
+
+    def _acquire(self, estimate, deadline):
+        waited = 0.0
+        charged = []
+        try:
+            for bucket, amount in ((self.request_bucket, 1), (self.token_bucket, estimate)):
+                if bucket is not None:
+                    waited += bucket.acquire(amount, deadline, self.sleep)
+                    charged.append((bucket, amount))
+            if self._slots is not None and not self._slots.acquire(timeout=self._remaining(deadline)):
+                raise LLMUnavailableError("no free LLM connection before the deadline")
+        except LLMUnavailableError:
+            # The call is never sent, so give back what it was charged rather than throttle later callers
+            for bucket, amount in charged:
+                bucket.adjust(-amount)
+            raise
+        finally:
+            if waited:
+                self._count("throttled_seconds", waited)
+        self._count("in_flight")
+
+    def _release(self):
+        self._count("in_flight", -1)
+        if self._slots is not None:
+            self._slots.release()
+
+    def _backoff(self, error, attempt):
+        delay = retry_after(error)
+        if delay is None:
+            delay = self.rng.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        return delay
+
+    def _settle_tokens(self, estimate, used):
+        if self.token_bucket is not None and used is not None:
+            self.token_bucket.adjust(used - estimate)
+
+    def create(self, stream=False, timeout=None, **request):
+        timeout = timeout if timeout is not None else self.default_timeout
+        deadline = time.monotonic() + timeout if timeout else None
+        estimate = estimate_tokens(request)
+        self._count("calls")
+        attempt = 0
+        while True:
+            trial = False
+            try:
+                trial = self.breaker.before_call()
+                self._acquire(estimate, deadline)
+            except LLMUnavailableError:
+                if trial:
+                    self.breaker.cancel_trial()
+                self._count("rejected")
+                raise
+
+            call_kwargs = dict(request, stream=True) if stream else dict(request)
+            remaining = self._remaining(deadline)
+            if remaining is not None:
+                call_kwargs["timeout"] = remaining
+            try:
+                response = self.client.chat.completions.create(**call_kwargs)
+            except Exception as e:
+                self._release()
+                self._settle_tokens(estimate, 0)  # a failed call used no tokens
+                if is_outage(e):
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                delay = self._backoff(e, attempt) if is_retryable(e) and attempt < self.max_retries else None
+                remaining = self._remaining(deadline)
+                if delay is None or (remaining is not None and delay >= remaining):
+                    self._count("failures")
+                    raise
+                self._count("retries")
+                self.sleep(delay)
+                attempt += 1
+                continue
+
+            if stream:
+                return GuardedStream(self, response, estimate, estimate - (request.get("max_tokens") or 1024))
+            self._release()
+            self.breaker.record_success()
+            self._count("successes")
+            usage = getattr(response, "usage", None)
+            self._settle_tokens(estimate, getattr(usage, "total_tokens", None))
+            return response
+
+    def stats(self):
+        with self._lock:
+            stats = {
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self.in_flight,
+                "calls": self.calls,
+                "successes": self.successes,
+                "failures": self.failures,
+                "retries": self.retries,
+                "rejected": self.rejected,
+                "throttled_seconds": round(self.throttled_seconds, 3),
+            }
+        stats["circuit"] = {
+            "state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "opens": self.breaker.opens,
+        }
+        for name, bucket in (("requests_per_minute", self.request_bucket), ("tokens_per_minute", self.token_bucket)):
+            if bucket is not None:
+                stats[name] = {"limit": round(bucket.rate * 60), "available": round(bucket.level, 1)}
+        return stats
+
+
+class GuardedStream:
+    """A streamed completion that holds its ResilientGroq concurrency slot until exhausted or closed.
+
+    The circuit breaker hears about the outcome once: a failure mid-stream counts
+    against it, while finishing or closing early counts as a success.
+    """
+
+    def __init__(self, owner, stream, estimate, prompt_estimate):
+        self.owner = owner
+        self.stream = stream
+        self.estimate = estimate
+        self.prompt_estimate = prompt_estimate
+        self.chunks = 0
+        self.usage = None
+        self._iterator = iter(stream)
+        self._closed = False
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            chunk = next(self._iterator)
+        except StopIteration:
+            self._finish(failed=False)
+            raise
+        except Exception:
+            self._finish(failed=True)
+            raise
+        self.chunks += 1
+        self.usage = getattr(getattr(chunk, "x_groq", None), "usage", None) or self.usage
+        return chunk
+
+    def close(self):
+        self._finish(failed=False)
+
+    def _finish(self, failed):
+        with self.owner._lock:
+            if self._closed:
+                return
+            self._closed = True
+        close = getattr(self.stream, "close", None)
+        if close is not None:
+            close()
+        self.owner._release()
+        if failed:
+            self.owner.breaker.record_failure()
+            self.owner._count("failures")
+        else:
+            self.owner.breaker.record_success()
+            self.owner._count("successes")
+        # Without reported usage, every chunk is counted as one completion token
+        used = getattr(self.usage, "total_tokens", None)
+        self.owner._settle_tokens(self.estimate, used if used is not None else self.prompt_estimate + self.chunks)
+
+    def __del__(self):
+        if not getattr(self, "_closed", True):
+            self._finish(failed=False)
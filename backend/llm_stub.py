@@ -0,0 +1,79 @@
+import re
+import threading
+import time
+from collections import deque
+from types import SimpleNamespace
+
+
+DEFAULT_REPLY = (
+    "This is a stubbed response generated offline. "
+    "No request was sent to the Groq API."
+)
+
+
+class StubGroq:
+    """Offline stand-in for `groq.Groq` exposing `chat.completions.create`.
+
+    Replies are deterministic: the content is `reply` (or a callable that receives
+    the request kwargs). `latency` seconds are slept before answering and calls
+    whose system prompt contains any of `fail_on` raise a RuntimeError, which makes
+    timeouts and failure handling easy to exercise without network access.
+
+    With `stream=True` the reply is yielded as word-sized chunks shaped like Groq's
+    streaming deltas; `token_rate` (tokens per second, 0 = unlimited) paces them.
+    Without streaming, `token_rate` delays the whole reply by its generation time.
+
+    `calls` keeps the last `max_calls` requests, so a long-running server does not grow without bound.
+    """
+
+    def __init__(self, reply=DEFAULT_REPLY, latency=0.0, fail_on=(), token_rate=0.0, max_calls=1000):
+        self.reply = reply
+        self.latency = float(latency)
+        self.fail_on = tuple(fail_on)
+        self.token_rate = float(token_rate)
+        self.calls = deque(maxlen=max_calls)
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _content_for(self, kwargs):
+        if callable(self.reply):
+            return self.reply(kwargs)
+        return self.reply
+
+    def _stream(self, model, content):
+        interval = 1.0 / self.token_rate if self.token_rate > 0 else 0.0
+        for index, token in enumerate(re.findall(r"\s*\S+\s*", content)):
+            if interval and index:
+                time.sleep(interval)
+            yield SimpleNamespace(
+                model=model,
+                choices=[SimpleNamespace(index=0, finish_reason=None, delta=SimpleNamespace(role="assistant", content=token))],
+            )
+        yield SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, finish_reason="stop", delta=SimpleNamespace(role=None, content=None))],
+        )
+
+    def _create(self, model=None, messages=None, stream=False, **kwargs):
+        request = dict(kwargs, model=model, messages=messages or [])
+        with self._lock:
+            self.calls.append(request)
+
+        system_prompt = next((m["content"] for m in request["messages"] if m["role"] == "system"), "")
+        if any(marker in system_prompt for marker in self.fail_on):
+            raise RuntimeError("StubGroq: simulated API failure")
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        content = self._content_for(request)
+        if stream:
+            return self._stream(model, content)
+        if self.token_rate > 0:
+            # A non-streamed reply still takes as long to generate as the streamed one
+            time.sleep(len(content.split()) / self.token_rate)
+        return SimpleNamespace(
+            model=model,
+            choices=[SimpleNamespace(index=0, finish_reason="stop", message=SimpleNamespace(role="assistant", content=content))],
+            usage=SimpleNamespace(prompt_tokens=0, completion_tokens=len(content.split()), total_tokens=len(content.split())),
+        )
@@ -0,0 +1,90 @@
+import threading
+import time
+
+
+class BackgroundModelLoader:
+    """Load a model on a background thread so the server can bind immediately.
+
+    `load_fn()` returns the loaded resource, `warmup_fn(resource)` runs a dummy
+    inference to trigger graph tracing, and `on_ready(resource)` publishes it to
+    the rest of the app. `status()` reports the current state and how long each
+    phase took, for health and readiness probes.
+    """
+
+    PENDING = "pending"
+    LOADING = "loading"
+    WARMING_UP = "warming_up"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self, load_fn, warmup_fn=None, on_ready=None, name="model"):
+        self.load_fn = load_fn
+        self.warmup_fn = warmup_fn
+        self.on_ready = on_ready
+        self.name = name
+
+        self.state = self.PENDING
+        self.error = None
+        self.resource = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self._started_at = None
+        self._ready_event = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.state == self.READY
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return self
+            self._started_at = time.perf_counter()
+            self._thread = threading.Thread(target=self._run, name=f"loader-{self.name}", daemon=True)
+            self._thread.start()
+        return self
+
+    def wait(self, timeout=None):
+        """Block until loading finished (successfully or not); returns True when ready."""
+        self._ready_event.wait(timeout)
+        return self.ready
+
+    def _run(self):
+        try:
+            self.state = self.LOADING
+            started = time.perf_counter()
+            resource = self.load_fn()
+            self.load_seconds = time.perf_counter() - started
+
+            if self.warmup_fn is not None:
+                self.state = self.WARMING_UP
+                started = time.perf_counter()
+                self.warmup_fn(resource)
+                self.warmup_seconds = time.perf_counter() - started
+
+            if self.on_ready is not None:
+                self.on_ready(resource)
+            self.resource = resource
+            self.state = self.READY
+            print(f"✅ {self.name} ready (load {self.load_seconds:.2f}s, warm-up {self.warmup_seconds or 0:.2f}s)")
+        except Exception as e:
+            self.error = str(e)
+            self.state = self.FAILED
+            print(f"❌ Error loading {self.name}: {self.error}")
+        finally:
+            self._ready_event.set()
+
+    def status(self):
+        status = {
+            "name": self.name,
+            "state": self.state,
+            "load_seconds": round(self.load_seconds, 3) if self.load_seconds is not None else None,
+            "warmup_seconds": round(self.warmup_seconds, 3) if self.warmup_seconds is not None else None,
+        }
+        if self._started_at is not None and not self._ready_event.is_set():
+            status["elapsed_seconds"] = round(time.perf_counter() - self._started_at, 3)
+        if self.error:
+            status["error"] = self.error
+        return status
@@ -0,0 +1,234 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class ModelSpec:
+    """A servable model: file stem, output head, class names and the image types routed to it.
+
+    `output` is "softmax" (one probability per class) or "sigmoid" (a single
+    probability of class_names[1]).
+    """
+
+    def __init__(self, name, file_stem, class_names, output="softmax", image_types=()):
+        if output not in ("softmax", "sigmoid"):
+            raise ValueError(f"Unknown output head '{output}' for model '{name}'")
+        self.name = name
+        self.file_stem = file_stem
+        self.class_names = list(class_names)
+        self.output = output
+        self.image_types = {image_type.lower() for image_type in image_types}
+
+
+class ServedModel:
+    """A loaded model together with its own batching runtime and prediction cache.
+
+    With an `explainer` (a models.gradcam.GradCAM) and its own `explain_batcher`,
+    `explain()` returns the probabilities and Grad-CAM heatmaps of one batched pass.
+    """
+
+    def __init__(self, spec, model, model_path, batcher, prediction_cache=None, explainer=None,
+                 explain_batcher=None):
+        self.spec = spec
+        self.model = model
+        self.model_path = model_path
+        self.batcher = batcher
+        self.prediction_cache = prediction_cache
+        self.explainer = explainer
+        self.explain_batcher = explain_batcher
+        self.size_bytes = os.path.getsize(model_path) if model_path and os.path.exists(model_path) else 0
+        self.loaded_at = time.time()
+        self.last_used = time.monotonic()
+        self.requests = 0
+        self.in_flight = 0
+
+    def _probabilities(self, outputs):
+        outputs = np.asarray(outputs, dtype=np.float32)
+        if self.spec.output == "sigmoid":
+            positive = outputs.reshape(len(outputs), -1)[:, :1]
+            return np.concatenate([1 - positive, positive], axis=1)
+        return outputs
+
+    def predict(self, batch):
+        """(N, len(class_names)) probabilities; a sigmoid output p becomes [1 - p, p]."""
+        return self._probabilities(self.batcher.submit(batch))
+
+    @property
+    def can_explain(self):
+        return self.explain_batcher is not None
+
+    def explain(self, batch):
+        """(probabilities as from `predict`, (N, h, w) heatmaps of the predicted classes)."""
+        if not self.can_explain:
+            raise RuntimeError(f"Model '{self.spec.name}' does not support explanations")
+        outputs, heatmaps = self.explainer.unpack(self.explain_batcher.submit(batch))
+        return self._probabilities(outputs), heatmaps
+
+    def stop(self):
+        self.batcher.stop()
+        if self.explain_batcher is not None:
+            self.explain_batcher.stop()
+        stop = getattr(self.model, "stop", None)  # inference worker pools own processes
+        if stop is not None:
+            stop()
+
+    def stats(self):
+        return {
+            "model_path": self.model_path,
+            "output": self.spec.output,
+            "class_names": self.spec.class_names,
+            "explanations": self.can_explain,
+            "size_mb": round(self.size_bytes / 1e6, 2),
+            "requests": self.requests,
+            "in_flight": self.in_flight,
+            "idle_seconds": round(time.monotonic() - self.last_used, 1),
+        }
+
+
+class ModelRegistry:
+    """Routes requests to models by image type and loads them on first use.
+
+    `load_fn(spec)` returns a ready ServedModel (loaded and warmed up) and
+    `is_available(spec)` says whether its model file exists. Image types without a
+    model of their own, or whose model file is missing, go to the default model.
+
+    With `max_loaded` or `memory_limit_mb` set, loading a model unloads the least
+    recently used others until the limits hold again. Pinned models and models with
+    requests in flight are never unloaded. Model memory is estimated from the model
+    file size.
+    """
+
+    def __init__(self, specs, default, load_fn, is_available, max_loaded=0, memory_limit_mb=0.0, pinned=None):
+        self.specs = {spec.name: spec for spec in specs}
+        if default not in self.specs:
+            raise ValueError(f"Default model '{default}' is not registered")
+        self.default = default
+        self.load_fn = load_fn
+        self.is_available = is_available
+        self.max_loaded = max_loaded
+        self.memory_limit_bytes = memory_limit_mb * 1e6
+        self.pinned = set(pinned if pinned is not None else [default])
+
+        self._loaded = {}
+        self._load_locks = {name: threading.Lock() for name in self.specs}
+        self._lock = threading.Lock()
+        self.loads = 0
+        self.unloads = 0
+        self.load_failures = 0
+
+    # --- ROUTING ---
+    def route(self, image_type):
+        """Name of the model that serves `image_type`."""
+        image_type = (image_type or "").strip().lower()
+        for spec in self.specs.values():
+            if image_type in spec.image_types:
+                if spec.name == self.default or self.is_available(spec):
+                    return spec.name
+                break
+        return self.default
+
+    # --- LOADING ---
+    def add(self, served):
+        """Publish a model that was loaded elsewhere (e.g. the default model's background loader)."""
+        with self._lock:
+            self._loaded[served.spec.name] = served
+        self._enforce_limits(keep=served.spec.name)
+
+    def loaded(self, name):
+        with self._lock:
+            return self._loaded.get(name)
+
+    def loaded_models(self):
+        """Snapshot of the currently loaded served models."""
+        with self._lock:
+            return list(self._loaded.values())
+
+    def get(self, name):
+        """The served model `name`, loading it (and unloading others if needed) on first use."""
+        served = self.loaded(name)
+        if served is not None:
+            return served
+        with self._load_locks[name]:
+            served = self.loaded(name)
+            if served is not None:
+                return served
+            started = time.perf_counter()
+            try:
+                served = self.load_fn(self.specs[name])
+            except Exception:
+                with self._lock:
+                    self.load_failures += 1
+                raise
+            with self._lock:
+                self._loaded[name] = served
+                self.loads += 1
+            print(f"✅ Loaded model '{name}' on demand in {time.perf_counter() - started:.2f}s")
+        self._enforce_limits(keep=name)
+        return served
+
+    @contextmanager
+    def use(self, name):
+        """Hold model `name` for one request so it cannot be unloaded mid-inference."""
+        served = self.get(name)
+        with self._lock:
+            served.in_flight += 1
+            served.requests += 1
+            served.last_used = time.monotonic()
+        try:
+            yield served
+        finally:
+            with self._lock:
+                served.in_flight -= 1
+                served.last_used = time.monotonic()
+
+    def unload(self, name):
+        with self._lock:
+            served = self._loaded.pop(name, None)
+            if served is not None:
+                self.unloads += 1
+        if served is not None:
+            served.stop()
+            print(f"♻️ Unloaded model '{name}'")
+        return served is not None
+
+    def _over_limits(self):
+        count = len(self._loaded)
+        total = sum(served.size_bytes for served in self._loaded.values())
+        return (self.max_loaded and count > self.max_loaded) or (self.memory_limit_bytes and total > self.memory_limit_bytes)
+
+    def _enforce_limits(self, keep=None):
+        while True:
+            with self._lock:
+                if not self._over_limits():
+                    return
+                candidates = [
+                    served for name, served in self._loaded.items()
+                    if name != keep and name not in self.pinned and served.in_flight == 0
+                ]
+                if not candidates:
+                    print("⚠️ Warning: Model memory limits exceeded, but every loaded model is pinned or in use")
+                    return
+                victim = min(candidates, key=lambda served: served.last_used).spec.name
+            self.unload(victim)
+
+    def stats(self):
+        with self._lock:
+            loaded = {name: served.stats() for name, served in self._loaded.items()}
+            total = sum(served.size_bytes for served in self._loaded.values())
+            return {
+                "default": self.default,
+                "registered": {
+                    name: {"image_types": sorted(spec.image_types), "available": self.is_available(spec)}
+                    for name, spec in self.specs.items()
+                },
+                "loaded": loaded,
+                "loaded_size_mb": round(total / 1e6, 2),
+                "max_loaded": self.max_loaded,
+                "memory_limit_mb": round(self.memory_limit_bytes / 1e6, 2),
+                "loads": self.loads,
+                "unloads": self.unloads,
+                "load_failures": self.load_failures,
+            }
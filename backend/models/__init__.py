@@ -0,0 +1,12 @@
+"""Training, evaluation and inference code for the thermal and MRI classifiers.
+
+Importing the package (or `models.preprocessing` / `models.tta`, which the server
+uses) has no side effects and does not import TensorFlow. Entry points, run from
+backend/:
+
+    python -m models.train thermal|mri ...
+    python -m models.evaluate thermal|mri ...
+    python -m models.finetune thermal|mri ...
+    python -m models.stream_evaluate thermal|mri ...
+    python -m models.predict thermal|mri ...
+"""
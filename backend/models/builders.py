@@ -0,0 +1,83 @@
+"""Model builders for the thermal (DenseNet201) and MRI (InceptionV3) classifiers.
+
+Each model is a frozen ImageNet backbone, global average pooling and a small
+trainable head. The heads are also available on their own, taking pooled
+features, for training on cached features (see feature_cache.py).
+"""
+
+import tensorflow as tf
+from tensorflow.keras import layers
+from tensorflow.keras.optimizers import Adam
+
+THERMAL_CLASSES = ["Benign", "Malignant"]
+MRI_CLASSES = ["Healthy", "Sick"]
+INPUT_SHAPE = (224, 224, 3)
+
+
+def _compile_thermal(model, lr):
+    # Use gradient clipping for stability
+    model.compile(
+        loss="categorical_crossentropy",
+        optimizer=Adam(learning_rate=lr, clipnorm=1.0),
+        metrics=["accuracy"]
+    )
+    return model
+
+
+def thermal_head_layers():
+    return [
+        layers.Dropout(0.5),
+        layers.BatchNormalization(),
+        layers.Dense(2, activation="softmax")  # Multi-class classification (2 classes)
+    ]
+
+
+def build_model(lr=5e-4, weights="imagenet"):
+    """Thermal classifier: frozen DenseNet201, pooling and a softmax head over THERMAL_CLASSES."""
+    backbone = tf.keras.applications.DenseNet201(weights=weights, include_top=False, input_shape=INPUT_SHAPE)
+
+    # Freeze the backbone (no fine-tuning needed)
+    backbone.trainable = False
+
+    model = tf.keras.Sequential([backbone, layers.GlobalAveragePooling2D()] + thermal_head_layers())
+    return _compile_thermal(model, lr)
+
+
+def build_thermal_head(feature_dim, lr=5e-4):
+    """The layers on top of build_model()'s pooling, fed with pooled backbone features."""
+    head = tf.keras.Sequential([layers.Input(shape=(feature_dim,))] + thermal_head_layers())
+    return _compile_thermal(head, lr)
+
+
+def mri_classification_head(x):
+    x = layers.Dense(256, activation="relu")(x)
+    x = layers.BatchNormalization()(x)
+    x = layers.Dropout(0.4)(x)
+    x = layers.Dense(128, activation="relu")(x)
+    x = layers.BatchNormalization()(x)
+    x = layers.Dropout(0.3)(x)
+    x = layers.Dense(64, activation="relu")(x)
+    x = layers.Dropout(0.3)(x)
+    return layers.Dense(1, activation="sigmoid")(x)
+
+
+def build_mri_backbone(weights="imagenet"):
+    base_model = tf.keras.applications.InceptionV3(weights=weights, include_top=False, input_shape=INPUT_SHAPE)
+    base_model.trainable = False  # Freeze base model layers
+    return base_model
+
+
+def build_mri_model(weights="imagenet", base_model=None):
+    """MRI classifier: frozen InceptionV3, pooling and a sigmoid head (probability of MRI_CLASSES[1])."""
+    base_model = base_model or build_mri_backbone(weights)
+    x = layers.GlobalAveragePooling2D()(base_model.output)
+    model = tf.keras.Model(inputs=base_model.input, outputs=mri_classification_head(x))
+    model.compile(optimizer="adam", loss="binary_crossentropy", metrics=["accuracy"])
+    return model
+
+
+def build_mri_head(feature_dim):
+    feature_input = tf.keras.Input(shape=(feature_dim,))
+    head = tf.keras.Model(inputs=feature_input, outputs=mri_classification_head(feature_input))
+    head.compile(optimizer="adam", loss="binary_crossentropy", metrics=["accuracy"])
+    return head
@@ -0,0 +1,120 @@
+"""Parallel, cached image dataset loader.
+
+Decodes a directory of PNGs across a process pool straight into a preallocated
+uint8 array stored as a `.npy` file, and memory-maps that file on later runs
+instead of decoding again. The cache key covers the directory listing (names,
+sizes, modification times) and the resize size, so any change re-triggers decoding.
+"""
+
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import cv2
+import numpy as np
+from numpy.lib.format import open_memmap
+from tqdm import tqdm
+
+CHUNK_SIZE = 64
+
+
+def _list_images(directory, pattern):
+    return sorted(Path(directory).glob(pattern))
+
+
+def cache_key(paths, resize):
+    """Hash of the file listing (name, size, mtime) together with the resize size."""
+    digest = hashlib.sha256(json.dumps({"resize": resize}).encode("utf-8"))
+    for path in paths:
+        stat = path.stat()
+        digest.update(f"{path.name}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _decode(image_path, resize):
+    img = cv2.imread(str(image_path), cv2.IMREAD_COLOR)
+    img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)  # Convert BGR to RGB
+    return cv2.resize(img, (resize, resize))
+
+
+def _decode_chunk(array_path, start, image_paths, resize):
+    """Worker: decode a run of images into rows [start, start + len) of the shared .npy file."""
+    cv2.setNumThreads(1)
+    images = np.load(array_path, mmap_mode="r+") if array_path else None
+    rows, failed = [], []
+    for offset, image_path in enumerate(image_paths):
+        try:
+            img = _decode(image_path, resize)
+            if images is not None:
+                images[start + offset] = img
+            else:
+                rows.append((start + offset, img))
+        except Exception as e:
+            failed.append((start + offset, f"Error loading image {image_path}: {e}"))
+    if images is not None:
+        images.flush()
+    return rows, failed
+
+
+def dataset_loader(directory, resize, cache_dir=".dataset_cache", workers=None, pattern="*.png"):
+    """Load images from a directory, resize them, and return as a NumPy array.
+
+    With `cache_dir` set (the default), the decoded array is persisted as `.npy`
+    and returned memory-mapped read-only; pass `cache_dir=None` to decode into
+    memory without caching. Images that fail to decode are skipped, as before.
+    """
+    paths = _list_images(directory, pattern)
+    shape = (len(paths), resize, resize, 3)
+    if not paths:
+        return np.empty((0, resize, resize, 3), dtype=np.uint8)
+
+    final_path = partial_path = None
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        name = Path(directory).resolve().name or "dataset"
+        final_path = os.path.join(cache_dir, f"{name}-{resize}-{cache_key(paths, resize)[:16]}.npy")
+        if os.path.exists(final_path):
+            print(f"Loaded {directory} from cache {final_path}")
+            return np.load(final_path, mmap_mode="r")
+
+        # Preallocate the whole dataset on disk; workers fill their rows in place
+        partial_path = final_path + ".partial.npy"
+        open_memmap(partial_path, mode="w+", dtype=np.uint8, shape=shape).flush()
+        images = None
+    else:
+        images = np.empty(shape, dtype=np.uint8)
+
+    failed = []
+    chunks = [(start, paths[start:start + CHUNK_SIZE]) for start in range(0, len(paths), CHUNK_SIZE)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_decode_chunk, partial_path, start, chunk, resize) for start, chunk in chunks]
+        for future in tqdm(futures, desc=str(directory), unit="chunk"):
+            rows, chunk_failed = future.result()
+            for index, img in rows:
+                images[index] = img
+            failed.extend(chunk_failed)
+
+    for _, message in failed:
+        print(message)
+    bad_rows = sorted(index for index, _ in failed)
+
+    if not cache_dir:
+        return np.delete(images, bad_rows, axis=0) if bad_rows else images
+
+    if bad_rows:
+        decoded = np.load(partial_path, mmap_mode="r")
+        keep = np.setdiff1d(np.arange(len(paths)), bad_rows)
+        compacted = open_memmap(final_path + ".compact.npy", mode="w+", dtype=np.uint8,
+                                shape=(len(keep),) + shape[1:])
+        for start in range(0, len(keep), CHUNK_SIZE):
+            compacted[start:start + CHUNK_SIZE] = decoded[keep[start:start + CHUNK_SIZE]]
+        compacted.flush()
+        del decoded, compacted
+        os.replace(final_path + ".compact.npy", final_path)
+        os.remove(partial_path)
+    else:
+        os.replace(partial_path, final_path)
+
+    return np.load(final_path, mmap_mode="r")
@@ -0,0 +1,86 @@
+"""Evaluate a trained thermal or MRI classifier on a held-out split.
+
+Usage (from backend/):
+    python -m models.evaluate thermal --model breast_cancer_model.keras --data-dir breast-cancer-dataset
+    python -m models.evaluate mri --model breast_cancer_mri_model.keras \
+        --data-dir "Breast Cancer Patients MRI's/validation"
+
+Prints accuracy, the confusion matrix, a classification report and ROC AUC, and
+writes them as JSON with --report.
+"""
+
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from .builders import MRI_CLASSES, THERMAL_CLASSES
+
+
+def classification_metrics(labels, positive_probabilities, class_names, threshold=0.5):
+    """Metrics for a binary classifier from labels and the probability of class_names[1]."""
+    from sklearn.metrics import accuracy_score, classification_report, confusion_matrix, roc_auc_score
+
+    labels = np.asarray(labels).astype(int)
+    positive_probabilities = np.asarray(positive_probabilities, dtype=np.float64)
+    predictions = (positive_probabilities > threshold).astype(int)
+    metrics = {
+        "samples": int(len(labels)),
+        "accuracy": round(float(accuracy_score(labels, predictions)), 4),
+        "confusion_matrix": confusion_matrix(labels, predictions, labels=[0, 1]).tolist(),
+        "classification_report": classification_report(
+            labels, predictions, labels=[0, 1], target_names=class_names, output_dict=True, zero_division=0
+        ),
+    }
+    if len(set(labels.tolist())) == 2:
+        metrics["roc_auc"] = round(float(roc_auc_score(labels, positive_probabilities)), 4)
+    return metrics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("model_type", choices=["thermal", "mri"])
+    parser.add_argument("--model", required=True, help="Saved .keras model")
+    parser.add_argument("--data-dir", required=True,
+                        help="thermal: directory containing Test/; mri: a class-per-subdirectory split")
+    parser.add_argument("--tta-views", default="identity,hflip,vflip,rot90,rot180,rot270",
+                        help="thermal only: comma-separated TTA views ('' disables TTA)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--report", help="Write the metrics as JSON to this path")
+    parser.add_argument("--plot", action="store_true", help="Plot the confusion matrix and ROC curve")
+    args = parser.parse_args(argv)
+
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(args.model)
+    if args.model_type == "thermal":
+        from . import thermal
+        from .tta import parse_views
+
+        views = parse_views(args.tta_views) if args.tta_views else None
+        labels, probabilities = thermal.evaluate(model, args.data_dir, views, args.batch_size)
+        class_names = THERMAL_CLASSES
+    else:
+        from . import mri
+
+        labels, probabilities = mri.evaluate(model, args.data_dir, args.batch_size)
+        class_names = MRI_CLASSES
+
+    metrics = dict(classification_metrics(labels, probabilities, class_names), model=args.model,
+                   model_type=args.model_type, data_dir=args.data_dir)
+    print(json.dumps(metrics, indent=2))
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(metrics, f, indent=2)
+        print(f"✅ Metrics written to {args.report}")
+
+    if args.plot:
+        from .plots import plot_confusion_matrix, plot_roc
+        plot_confusion_matrix(metrics["confusion_matrix"], class_names, title="Confusion Matrix for Breast Cancer")
+        plot_roc(labels, probabilities)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
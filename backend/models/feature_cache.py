@@ -0,0 +1,213 @@
+"""Precomputed backbone features for training a classifier head on a frozen backbone.
+
+With the backbone frozen, its pooled output for an image never changes, so it is
+computed once and stored. Every later epoch, and every later run, trains only the
+small dense head on those stored vectors.
+
+Features are stored under `<root>/<backbone id>/` as append-only shards: a `.npy`
+matrix that is memory-mapped on read, next to a `.keys.json` file with one key per
+row. A key is the SHA-256 of the image's uint8 pixels. Pre-augmented views add the
+view number and the augmentation settings to the key. Changing the backbone, the
+image or the augmentation therefore never reuses stale features.
+
+Usage (see thermal.py):
+    store = FeatureStore(".feature_cache", backbone_id(backbone))
+    train_features = extract_views(backbone, x_train, store, views=4, augment=THERMAL_AUGMENTATION)
+    val_features = extract_views(backbone, x_val, store)
+    history = fit_head(head, train_features, y_train, val_features, y_val, epochs=10)
+    model = attach_head(backbone, head)
+"""
+
+import glob
+import hashlib
+import json
+import os
+import uuid
+
+import numpy as np
+import tensorflow as tf
+from numpy.lib.format import open_memmap
+from tqdm import tqdm
+
+from .data_pipeline import make_augmenter
+
+
+def backbone_id(backbone):
+    """Stable id for a backbone: its name plus a hash of its architecture and input shape."""
+    config = json.dumps(backbone.get_config(), sort_keys=True, default=str)
+    digest = hashlib.sha256(config.encode("utf-8"))
+    digest.update(str(backbone.count_params()).encode("utf-8"))
+    return f"{backbone.name}-{digest.hexdigest()[:12]}"
+
+
+def image_keys(images, view=0, augment=None, seed=42):
+    """One key per image. View 0 is the unaugmented image; views >= 1 are seeded augmentations."""
+    suffix = ""
+    if view:
+        settings = json.dumps({"augment": augment, "seed": seed, "view": view}, sort_keys=True)
+        suffix = ":" + hashlib.sha256(settings.encode("utf-8")).hexdigest()[:16]
+    return [hashlib.sha256(np.ascontiguousarray(image).tobytes()).hexdigest() + suffix for image in images]
+
+
+class FeatureStore:
+    """Memory-mapped feature vectors for one backbone, looked up by key."""
+
+    def __init__(self, root, backbone_key, dtype=np.float16):
+        self.directory = os.path.join(root, backbone_key)
+        self.dtype = np.dtype(dtype)
+        os.makedirs(self.directory, exist_ok=True)
+        self.shards = []
+        self.index = {}
+        for keys_path in sorted(glob.glob(os.path.join(self.directory, "*.keys.json"))):
+            self._open_shard(keys_path)
+
+    def _open_shard(self, keys_path):
+        with open(keys_path) as f:
+            keys = json.load(f)
+        shard = len(self.shards)
+        self.shards.append(np.load(keys_path[:-len(".keys.json")] + ".npy", mmap_mode="r"))
+        for row, key in enumerate(keys):
+            self.index[key] = (shard, row)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def add(self, keys, features):
+        """Persist a new shard. The keys file is written last, so a crashed write is never indexed."""
+        if not len(keys):
+            return
+        name = os.path.join(self.directory, uuid.uuid4().hex)
+        array = open_memmap(name + ".partial.npy", mode="w+", dtype=self.dtype, shape=features.shape)
+        array[:] = features
+        array.flush()
+        del array
+        os.replace(name + ".partial.npy", name + ".npy")
+        with open(name + ".partial.json", "w") as f:
+            json.dump(list(keys), f)
+        os.replace(name + ".partial.json", name + ".keys.json")
+        self._open_shard(name + ".keys.json")
+
+    def get(self, keys):
+        """Return float32 features for `keys`, in order. Every key must be present."""
+        locations = np.array([self.index[key] for key in keys], dtype=np.int64).reshape(-1, 2)
+        width = self.shards[locations[0, 0]].shape[1] if len(locations) else 0
+        features = np.empty((len(keys), width), dtype=np.float32)
+        # Sort by (shard, row) once, then gather each shard's rows in file order with one fancy index
+        order = np.lexsort((locations[:, 1], locations[:, 0]))
+        for positions in np.split(order, np.flatnonzero(np.diff(locations[order, 0])) + 1):
+            if len(positions):
+                features[positions] = self.shards[locations[positions[0], 0]][locations[positions, 1]]
+        return features
+
+
+def directory_arrays(directory, target_size=(224, 224), label_mode="binary"):
+    """Load a class-per-subdirectory split into (uint8 images, labels), ordered like flow_from_directory."""
+    dataset = tf.keras.utils.image_dataset_from_directory(
+        directory, label_mode=label_mode, image_size=target_size, batch_size=64, shuffle=False,
+        interpolation="nearest",
+    )
+    images, labels = [], []
+    for batch_images, batch_labels in dataset:
+        images.append(batch_images.numpy().astype(np.uint8))
+        labels.append(batch_labels.numpy())
+    return np.concatenate(images), np.concatenate(labels)
+
+
+def feature_extractor(backbone):
+    """Backbone followed by global average pooling: the input of both models' heads."""
+    pooled = tf.keras.layers.GlobalAveragePooling2D()(backbone.output)
+    return tf.keras.Model(backbone.input, pooled, name=f"{backbone.name}_features")
+
+
+def extract_features(backbone, images, store, view=0, augment=None, seed=42, batch_size=32, rescale=1 / 255.0,
+                     extractor=None):
+    """Return (N, D) pooled features for `images`, running the backbone only on images missing from `store`.
+
+    The missing features are written to the store as a single shard.
+    """
+    keys = image_keys(images, view, augment, seed)
+    missing = [i for i, key in enumerate(keys) if key not in store]
+    if missing:
+        extractor = extractor or feature_extractor(backbone)
+        augmenter = make_augmenter(**augment) if view and augment else None
+        description = f"features (view {view})"
+        computed = None
+        for start in tqdm(range(0, len(missing), batch_size), desc=description, unit="batch"):
+            rows = missing[start:start + batch_size]
+            batch = np.asarray(images[np.asarray(rows)], dtype=np.float32)
+            if augmenter is not None:
+                # Seed every image from its own key: the image hash plus the hash of (augment, seed, view).
+                # A view then depends on `seed` but not on how batches were formed.
+                batch = np.concatenate([
+                    augmenter(tf.constant(image[None]),
+                              tf.constant([int(keys[row][:15], 16), int(keys[row][-15:], 16)], tf.int64)).numpy()
+                    for row, image in zip(rows, batch)
+                ])
+            features = np.asarray(extractor.predict_on_batch(batch * rescale))
+            if computed is None:
+                computed = np.empty((len(missing), features.shape[1]), dtype=store.dtype)
+            computed[start:start + len(rows)] = features
+        store.add([keys[row] for row in missing], computed)
+    return store.get(keys)
+
+
+def extract_views(backbone, images, store, views=0, augment=None, seed=42, batch_size=32, rescale=1 / 255.0):
+    """Features of the clean image plus `views` pre-augmented views, shaped (views + 1, N, D)."""
+    extractor = feature_extractor(backbone)
+    return np.stack([
+        extract_features(backbone, images, store, view, augment, seed, batch_size, rescale, extractor)
+        for view in range(views + 1)
+    ])
+
+
+def feature_dataset(features, labels, batch_size=32, shuffle=True, seed=42):
+    """tf.data over cached features. For (views, N, D) input, each epoch draws one random view per image."""
+    features = np.asarray(features, dtype=np.float32)
+    labels = np.asarray(labels, dtype=np.float32)
+    if features.ndim == 2:
+        features = features[None]
+    views, count = features.shape[:2]
+    rng = np.random.default_rng(seed)
+
+    def gather(indices):
+        indices = np.asarray(indices)
+        chosen = rng.integers(0, views, size=len(indices)) if views > 1 else np.zeros(len(indices), dtype=int)
+        return features[chosen, indices], labels[indices]
+
+    def load(indices):
+        batch, batch_labels = tf.numpy_function(gather, [indices], (tf.float32, tf.float32))
+        batch.set_shape((None, features.shape[2]))
+        batch_labels.set_shape((None,) + labels.shape[1:])
+        return batch, batch_labels
+
+    dataset = tf.data.Dataset.from_tensor_slices(np.arange(count, dtype=np.int64))
+    if shuffle:
+        dataset = dataset.shuffle(count, seed=seed, reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).map(load).prefetch(tf.data.AUTOTUNE)
+
+
+def fit_head(head, train_features, y_train, val_features=None, y_val=None, epochs=10, batch_size=32, seed=42,
+             **fit_kwargs):
+    """Train a compiled head model on cached features (validation uses the clean view)."""
+    validation = None
+    if val_features is not None:
+        clean = val_features[0] if np.ndim(val_features) == 3 else val_features
+        validation = feature_dataset(clean, y_val, batch_size, shuffle=False)
+    return head.fit(
+        feature_dataset(train_features, y_train, batch_size, seed=seed),
+        epochs=epochs,
+        validation_data=validation,
+        **fit_kwargs,
+    )
+
+
+def attach_head(backbone, head, pooling=True):
+    """Full image model: backbone (+ pooling) followed by the trained head, sharing its weights."""
+    inputs = tf.keras.Input(shape=backbone.input_shape[1:])
+    x = backbone(inputs, training=False)
+    if pooling:
+        x = tf.keras.layers.GlobalAveragePooling2D()(x)
+    return tf.keras.Model(inputs, head(x))
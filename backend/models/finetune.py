@@ -0,0 +1,461 @@
+"""Staged fine-tuning of the DenseNet201 and InceptionV3 backbones within a CPU memory budget.
+
+Training only the head (models.train's default) leaves the backbone at its ImageNet
+weights. Fine-tuning unfreezes the top blocks of the backbone in stages: blocks=[8, 16, 32]
+trains the top 8 blocks, then the top 16, then the top 32, each stage at half the previous
+learning rate. Blocks are DenseNet201's `convN_blockM` units (98 of them) and InceptionV3's
+`mixedN` modules (11). BatchNormalization layers stay frozen.
+
+Memory is kept down by:
+- gradient accumulation: the model sees micro-batches of `micro_batch_size` images, and the
+  optimizer steps once per `batch_size` images
+- checkpointing: the unfrozen blocks run in segments of about sqrt(N) blocks. Only segment
+  outputs are kept for the backward pass, and activations inside a segment are recomputed
+- precision="bfloat16": the backbone computes in bfloat16, while weights stay float32
+The frozen lower part of the backbone always runs outside the gradient tape.
+
+Usage (from backend/):
+    python -m models.train thermal --data-dir breast-cancer-dataset --fine-tune-blocks 8,16,32 \
+        --micro-batch-size 8 --checkpointing --precision bfloat16
+    python -m models.finetune thermal --blocks 8,32 --micro-batch-sizes 4,8 --checkpointing off,on \
+        --precision float32,bfloat16 --report finetune-memory.json
+
+The second command measures peak memory and step time of each configuration on synthetic
+images, one subprocess per configuration so peaks do not carry over.
+"""
+
+import argparse
+import itertools
+import json
+import math
+import os
+import re
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+import tensorflow as tf
+
+from .builders import INPUT_SHAPE, build_model, build_mri_backbone, build_mri_model
+
+BLOCK_END = re.compile(r"^(conv\d+_block\d+_concat|mixed\d+)$")
+PRECISIONS = ("float32", "bfloat16")
+RESULT_PREFIX = "FINETUNE_RESULT "
+
+
+class FineTuneConfig:
+    """Settings of a staged fine-tuning run; `blocks` is the number of unfrozen blocks per stage."""
+
+    def __init__(self, blocks, epochs=2, learning_rate=1e-4, lr_decay=0.5, batch_size=32, micro_batch_size=None,
+                 checkpointing=False, precision="float32"):
+        micro_batch_size = micro_batch_size or batch_size
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision '{precision}', expected one of {', '.join(PRECISIONS)}")
+        if batch_size % micro_batch_size:
+            raise ValueError(f"batch_size {batch_size} is not a multiple of micro_batch_size {micro_batch_size}")
+        self.blocks = sorted(blocks)
+        self.epochs = epochs
+        self.learning_rate = learning_rate
+        self.lr_decay = lr_decay
+        self.batch_size = batch_size
+        self.micro_batch_size = micro_batch_size
+        self.checkpointing = checkpointing
+        self.precision = precision
+
+    @property
+    def accumulation_steps(self):
+        return self.batch_size // self.micro_batch_size
+
+
+class FineTuneHistory:
+    """Per-epoch metrics in `history`, like a Keras History, and one report per stage in `stages`."""
+
+    def __init__(self):
+        self.history = {"loss": [], "accuracy": [], "val_loss": [], "val_accuracy": []}
+        self.stages = []
+
+
+# --- MEMORY ---
+def _status_mb(field):
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_memory():
+    """Restart the peak RSS count from the current RSS (Linux only); False if it cannot be reset."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_memory_mb():
+    peak = _status_mb("VmHWM")
+    return round(peak if peak is not None else resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def current_memory_mb():
+    current = _status_mb("VmRSS")
+    return None if current is None else round(current, 1)
+
+
+# --- NETWORK ---
+def backbone_blocks(backbone):
+    """[(name, first layer index, end layer index)] of the backbone's blocks, bottom to top.
+
+    Each block ends at a `convN_blockM_concat` or `mixedN` layer. Layers after the last
+    block (DenseNet201's final bn/relu) belong to the last block.
+    """
+    blocks, start = [], 0
+    for index, layer in enumerate(backbone.layers):
+        if BLOCK_END.match(layer.name):
+            blocks.append((layer.name, start, index + 1))
+            start = index + 1
+    if not blocks:
+        raise ValueError(f"No DenseNet or Inception blocks found in backbone '{backbone.name}'")
+    if start < len(backbone.layers):
+        name, first, _ = blocks[-1]
+        blocks[-1] = (name, first, len(backbone.layers))
+    return blocks
+
+
+def unfreeze_top_blocks(backbone, blocks, count):
+    """Make the layers of the top `count` blocks trainable, except BatchNormalization."""
+    backbone.trainable = True
+    first = blocks[-count][1] if count else len(backbone.layers)
+    for index, layer in enumerate(backbone.layers):
+        layer.trainable = index >= first and not isinstance(layer, tf.keras.layers.BatchNormalization)
+
+
+def set_backbone_precision(backbone, precision):
+    policy = "mixed_bfloat16" if precision == "bfloat16" else "float32"
+    for layer in backbone.layers:
+        layer.dtype_policy = policy
+
+
+class StagedNetwork:
+    """`model` split into the frozen part of its backbone, segments of unfrozen blocks and the head."""
+
+    def __init__(self, model, backbone, blocks, count, checkpointing=False):
+        ends = [backbone.get_layer(name).output for name, _, _ in blocks[:-1]]
+        bounds = [backbone.input] + ends + [backbone.output]
+        split = len(blocks) - count
+        self.frozen = tf.keras.Model(bounds[0], bounds[split]) if split else None
+        # Checkpointed segments of about sqrt(count) blocks keep only about 2 * sqrt(count) block
+        # outputs alive, at the cost of one extra forward pass through the unfrozen blocks
+        size = math.ceil(math.sqrt(count)) if checkpointing and count else 1
+        starts = list(range(split, len(blocks), size))
+        self.segments = [tf.keras.Model(bounds[start], bounds[min(start + size, len(blocks))]) for start in starts]
+        self.calls = [self._segment_call(segment, checkpointing) for segment in self.segments]
+
+        if backbone in model.layers:
+            # Sequential thermal model, or a backbone wrapped by feature_cache.attach_head
+            head_layers = model.layers[model.layers.index(backbone) + 1:]
+            self.head = lambda x, training: _apply(head_layers, x, training)
+            head_variables = [weight for layer in head_layers for weight in layer.trainable_weights]
+        else:
+            head = tf.keras.Model(backbone.output, model.output)
+            self.head = lambda x, training: head(x, training=training)
+            head_variables = head.trainable_weights
+        self.trainable_variables = [weight for segment in self.segments for weight in segment.trainable_weights]
+        self.trainable_variables += head_variables
+
+    @staticmethod
+    def _segment_call(segment, checkpointing):
+        call = lambda x: segment(x, training=False)
+        return tf.recompute_grad(call) if checkpointing else call
+
+    def features(self, images):
+        """Output of the frozen part; it runs without a gradient tape."""
+        return images if self.frozen is None else self.frozen(images, training=False)
+
+    def trainable_forward(self, features):
+        x = features
+        for call in self.calls:
+            x = call(x)
+        return self.head(x, training=True)
+
+
+def _apply(layers, x, training):
+    for layer in layers:
+        x = layer(x, training=training)
+    return x
+
+
+def _loss_and_accuracy(model):
+    if int(model.output_shape[-1]) == 1:
+        loss = tf.keras.losses.BinaryCrossentropy()
+
+        def correct(labels, outputs):
+            return tf.reduce_sum(tf.cast(tf.equal(tf.cast(outputs >= 0.5, tf.float32), labels), tf.float32))
+    else:
+        loss = tf.keras.losses.CategoricalCrossentropy()
+
+        def correct(labels, outputs):
+            return tf.reduce_sum(tf.cast(tf.equal(tf.argmax(outputs, -1), tf.argmax(labels, -1)), tf.float32))
+    return loss, correct
+
+
+class _StageTrainer:
+    """Micro-batch steps that accumulate gradients, and the optimizer step that applies them."""
+
+    def __init__(self, network, loss, correct, learning_rate):
+        self.network = network
+        self.variables = network.trainable_variables
+        self.optimizer = tf.keras.optimizers.Adam(learning_rate=learning_rate, clipnorm=1.0)
+        self.optimizer.build(self.variables)
+        self.accumulators = [tf.Variable(tf.zeros(v.shape, tf.float32), trainable=False) for v in self.variables]
+        self.loss = loss
+        self.correct = correct
+        self.micro_step = tf.function(self._micro_step, reduce_retracing=True)
+        self.apply = tf.function(self._apply)
+
+    def _micro_step(self, images, labels):
+        features = self.network.features(images)
+        with tf.GradientTape() as tape:
+            outputs = tf.cast(self.network.trainable_forward(features), tf.float32)
+            loss = self.loss(labels, outputs)
+        gradients = tape.gradient(loss, self.variables)
+        for accumulator, gradient in zip(self.accumulators, gradients):
+            if gradient is not None:
+                accumulator.assign_add(tf.cast(gradient, tf.float32))
+        return loss, self.correct(labels, outputs)
+
+    def _apply(self, micro_steps):
+        scale = 1.0 / tf.cast(micro_steps, tf.float32)
+        self.optimizer.apply_gradients([(a * scale, v) for a, v in zip(self.accumulators, self.variables)])
+        for accumulator in self.accumulators:
+            accumulator.assign(tf.zeros_like(accumulator))
+
+
+def _evaluate(predict, loss, correct, data):
+    total_loss = total_correct = count = 0.0
+    for images, labels in data:
+        labels = tf.cast(labels, tf.float32)
+        outputs = tf.cast(predict(images), tf.float32)
+        total_loss += float(loss(labels, outputs)) * len(labels)
+        total_correct += float(correct(labels, outputs))
+        count += len(labels)
+    return total_loss / max(count, 1), total_correct / max(count, 1)
+
+
+def fine_tune(model, backbone, train_data, val_data, config, verbose=True):
+    """Fine-tune `model` in place, stage by stage. Returns a FineTuneHistory.
+
+    `backbone` is the DenseNet201/InceptionV3 model whose layers `model` uses, and
+    `train_data` / `val_data` yield (images, labels) micro-batches of
+    `config.micro_batch_size` images (`val_data` may be None). The backbone is frozen
+    and back in float32 afterwards, as the builders leave it.
+    """
+    blocks = backbone_blocks(backbone)
+    loss, correct = _loss_and_accuracy(model)
+    predict = tf.function(lambda images: model(images, training=False), reduce_retracing=True)
+    history = FineTuneHistory()
+    set_backbone_precision(backbone, config.precision)
+    try:
+        for stage, count in enumerate(config.blocks):
+            count = min(count, len(blocks))
+            unfreeze_top_blocks(backbone, blocks, count)
+            network = StagedNetwork(model, backbone, blocks, count, config.checkpointing)
+            learning_rate = config.learning_rate * config.lr_decay ** stage
+            trainer = _StageTrainer(network, loss, correct, learning_rate)
+            parameters = int(sum(np.prod(v.shape) for v in network.trainable_variables))
+            if verbose:
+                print(f"🔍 Stage {stage + 1}/{len(config.blocks)}: top {count} of {len(blocks)} blocks, "
+                      f"{parameters:,} trainable parameters, learning rate {learning_rate:g}")
+
+            start_memory = current_memory_mb()
+            reset_peak_memory()
+            step_seconds = []
+            for epoch in range(config.epochs):
+                total_loss = total_correct = seen = micro_steps = 0
+                step_started = time.perf_counter()
+                for images, labels in train_data:
+                    labels = tf.cast(labels, tf.float32)
+                    batch_loss, batch_correct = trainer.micro_step(images, labels)
+                    total_loss += float(batch_loss) * len(labels)
+                    total_correct += float(batch_correct)
+                    seen += len(labels)
+                    micro_steps += 1
+                    if micro_steps == config.accumulation_steps:
+                        trainer.apply(micro_steps)
+                        micro_steps = 0
+                        step_seconds.append(time.perf_counter() - step_started)
+                        step_started = time.perf_counter()
+                if micro_steps:
+                    trainer.apply(micro_steps)
+                history.history["loss"].append(total_loss / max(seen, 1))
+                history.history["accuracy"].append(total_correct / max(seen, 1))
+                if val_data is not None:
+                    val_loss, val_accuracy = _evaluate(predict, loss, correct, val_data)
+                    history.history["val_loss"].append(val_loss)
+                    history.history["val_accuracy"].append(val_accuracy)
+                if verbose:
+                    validation = (f", val_loss {history.history['val_loss'][-1]:.4f}, "
+                                  f"val_accuracy {history.history['val_accuracy'][-1]:.4f}") if val_data is not None else ""
+                    print(f"  epoch {epoch + 1}/{config.epochs}: loss {history.history['loss'][-1]:.4f}, "
+                          f"accuracy {history.history['accuracy'][-1]:.4f}{validation}")
+
+            # The first step of a stage includes tracing the graph
+            timed = step_seconds[1:] or step_seconds
+            step_time = float(np.median(timed)) if timed else None
+            report = {
+                "stage": stage + 1,
+                "blocks": count,
+                "trainable_parameters": parameters,
+                "batch_size": config.batch_size,
+                "micro_batch_size": config.micro_batch_size,
+                "accumulation_steps": config.accumulation_steps,
+                "checkpointing": config.checkpointing,
+                "precision": config.precision,
+                "optimizer_steps": len(step_seconds),
+                "step_seconds": None if step_time is None else round(step_time, 3),
+                "images_per_second": round(config.batch_size / step_time, 2) if step_time else None,
+                "start_memory_mb": start_memory,
+                "peak_memory_mb": peak_memory_mb(),
+            }
+            if start_memory is not None:
+                report["training_memory_mb"] = round(report["peak_memory_mb"] - start_memory, 1)
+            history.stages.append(report)
+            if verbose:
+                print(f"✅ Stage {stage + 1}: {report['step_seconds']} s per step of {config.batch_size} images, "
+                      f"peak memory {report['peak_memory_mb']} MB")
+    finally:
+        backbone.trainable = False
+        set_backbone_precision(backbone, "float32")
+    if verbose:
+        print_reports(history.stages)
+    return history
+
+
+def print_reports(reports):
+    print(f"\n{'blocks':>6} {'micro':>5} {'accum':>5} {'ckpt':>4} {'precision':>9} {'step s':>8} {'images/s':>9} "
+          f"{'peak MB':>9} {'+training':>9}")
+    for report in reports:
+        if report.get("error"):
+            print(f"{report['blocks']:>6} {report['micro_batch_size']:>5} {'':>5} {'on' if report['checkpointing'] else 'off':>4} "
+                  f"{report['precision']:>9}  ❌ {report['error']}")
+            continue
+        print(f"{report['blocks']:>6} {report['micro_batch_size']:>5} {report['accumulation_steps']:>5} "
+              f"{'on' if report['checkpointing'] else 'off':>4} {report['precision']:>9} {report['step_seconds']:>8} "
+              f"{report['images_per_second']:>9} {report['peak_memory_mb']:>9} {report.get('training_memory_mb', ''):>9}")
+
+
+# --- BENCHMARK ---
+def build_network(model_type, weights=None):
+    """(model, backbone) as built for training, for `model_type` 'thermal' or 'mri'."""
+    if model_type == "thermal":
+        model = build_model(weights=weights)
+        return model, model.layers[0]
+    backbone = build_mri_backbone(weights)
+    return build_mri_model(base_model=backbone), backbone
+
+
+def synthetic_data(model, count, batch_size, seed=0):
+    rng = np.random.default_rng(seed)
+    images = rng.random((count,) + INPUT_SHAPE, dtype=np.float32)
+    units = int(model.output_shape[-1])
+    classes = rng.integers(0, max(units, 2), size=count)
+    labels = classes[:, None].astype(np.float32) if units == 1 else np.eye(units, dtype=np.float32)[classes]
+    return tf.data.Dataset.from_tensor_slices((images, labels)).batch(batch_size)
+
+
+def run_child(options):
+    tf.keras.utils.set_random_seed(0)
+    model, backbone = build_network(options["model_type"], options["weights"])
+    config = FineTuneConfig([options["blocks"]], epochs=1, batch_size=options["batch_size"],
+                            micro_batch_size=options["micro_batch_size"], checkpointing=options["checkpointing"],
+                            precision=options["precision"])
+    # One extra optimizer step, since the first one includes tracing
+    count = (options["steps"] + 1) * config.batch_size
+    history = fine_tune(model, backbone, synthetic_data(model, count, config.micro_batch_size), None, config,
+                        verbose=False)
+    print(RESULT_PREFIX + json.dumps(history.stages[0]), flush=True)
+    return 0
+
+
+def run_configuration(options, timeout):
+    try:
+        completed = subprocess.run(
+            [sys.executable, "-m", "models.finetune", options["model_type"], "--child", json.dumps(options)],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))), capture_output=True, text=True,
+            timeout=timeout, env=dict(os.environ, CUDA_VISIBLE_DEVICES="-1", TF_CPP_MIN_LOG_LEVEL="2")
+        )
+    except subprocess.TimeoutExpired:
+        raise RuntimeError(f"timed out after {timeout:.0f} s")
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+    # Out-of-memory kills leave no traceback, only the signal
+    raise RuntimeError(f"exit code {completed.returncode}: {completed.stderr.strip()[-1000:]}")
+
+
+def _int_list(text):
+    return [int(value) for value in text.split(",") if value.strip()]
+
+
+def _switch_list(text):
+    values = {"off": False, "on": True}
+    return [values[value.strip()] for value in text.split(",") if value.strip()]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("model_type", choices=["thermal", "mri"])
+    parser.add_argument("--blocks", type=_int_list, default=[8], help="Unfrozen top blocks to try, e.g. 8,32")
+    parser.add_argument("--batch-size", type=int, default=32, help="Images per optimizer step")
+    parser.add_argument("--micro-batch-sizes", type=_int_list, default=[8], help="Micro-batch sizes to try")
+    parser.add_argument("--checkpointing", type=_switch_list, default=[False, True], help="off, on or off,on")
+    parser.add_argument("--precision", default="float32,bfloat16", help="Comma-separated subset of float32, bfloat16")
+    parser.add_argument("--steps", type=int, default=3, help="Timed optimizer steps per configuration")
+    parser.add_argument("--weights", default=None, help="Backbone weights, e.g. imagenet (default: random)")
+    parser.add_argument("--timeout", type=float, default=1800, help="Time limit per configuration (seconds)")
+    parser.add_argument("--report", help="Write the measurements to this JSON file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        return run_child(json.loads(args.child))
+
+    precisions = [value.strip() for value in args.precision.split(",") if value.strip()]
+    unknown = set(precisions) - set(PRECISIONS)
+    if unknown:
+        parser.error(f"Unknown precision: {', '.join(sorted(unknown))}")
+    reports = []
+    grid = list(itertools.product(args.blocks, args.micro_batch_sizes, args.checkpointing, precisions))
+    for index, (blocks, micro_batch_size, checkpointing, precision) in enumerate(grid, start=1):
+        options = {
+            "model_type": args.model_type, "weights": args.weights, "blocks": blocks, "batch_size": args.batch_size,
+            "micro_batch_size": micro_batch_size, "checkpointing": checkpointing, "precision": precision,
+            "steps": args.steps,
+        }
+        print(f"⏳ [{index}/{len(grid)}] top {blocks} blocks, micro-batch {micro_batch_size}, "
+              f"checkpointing {'on' if checkpointing else 'off'}, {precision}")
+        try:
+            reports.append(run_configuration(options, args.timeout))
+        except RuntimeError as e:
+            print(f"❌ Failed: {e}")
+            reports.append({"blocks": blocks, "micro_batch_size": micro_batch_size, "checkpointing": checkpointing,
+                            "precision": precision, "error": str(e)})
+
+    print_reports(reports)
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump({"model_type": args.model_type, "batch_size": args.batch_size, "configurations": reports}, f,
+                      indent=2)
+        print(f"📄 Report written to {args.report}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
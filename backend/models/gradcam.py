@@ -0,0 +1,118 @@
+"""Grad-CAM heatmaps computed in the same batched pass as the prediction.
+
+The model is split at its global pooling layer: the convolutional backbone runs
+forward once, then the classifier head runs under a GradientTape that only
+watches the backbone's feature maps. The backward pass therefore covers the
+small head, not the backbone. Each image's heatmap is for the class the model
+predicted for it:
+
+    explainer = GradCAM(model)
+    probabilities, heatmaps = explainer.explain(batch)   # (N, outputs), (N, h, w) in [0, 1]
+    png = heatmap_overlay_png(pixels, heatmaps[0])
+
+Works for the builders in models.builders, i.e. a backbone followed by global
+pooling and a plain chain of head layers (Sequential or functional). TensorFlow
+is imported when a GradCAM is created; `heatmap_overlay_png` needs only NumPy
+and Pillow.
+"""
+
+import io
+
+import numpy as np
+from PIL import Image
+
+POOLING_LAYERS = ("GlobalAveragePooling2D", "GlobalMaxPooling2D")
+
+
+class GradCAM:
+    """Batched Grad-CAM for a Keras classifier with a softmax or single-unit sigmoid output."""
+
+    def __init__(self, model):
+        import tensorflow as tf
+
+        self.model = model
+        layers = model.layers
+        pooling = [index for index, layer in enumerate(layers) if type(layer).__name__ in POOLING_LAYERS]
+        if not pooling:
+            raise ValueError("Grad-CAM needs a model with a global pooling layer after its convolutional backbone")
+        split = pooling[-1]
+        self.head_layers = layers[split:]
+
+        if isinstance(model, tf.keras.Sequential):
+            backbone_layers = layers[:split]
+            self.features = lambda batch: _apply(backbone_layers, batch)
+        else:
+            feature_model = tf.keras.Model(model.inputs, layers[split].input)
+            self.features = lambda batch: feature_model(batch, training=False)
+        self.heatmap_shape = tuple(int(size) for size in layers[split].input.shape[1:3])
+        self.output_units = int(model.output_shape[-1])
+        # One trace serves every batch size
+        input_spec = tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32)
+        self._run = tf.function(self._explain_graph, input_signature=[input_spec])
+
+    def _explain_graph(self, batch):
+        import tensorflow as tf
+
+        features = self.features(batch)
+        with tf.GradientTape() as tape:
+            tape.watch(features)
+            outputs = _apply(self.head_layers, features)
+            if self.output_units == 1:
+                probability = outputs[:, 0]
+                scores = tf.where(probability >= 0.5, probability, 1 - probability)
+            else:
+                scores = tf.reduce_max(outputs, axis=-1)
+        # Images are independent at inference time, so the gradient of the summed scores is per image
+        gradients = tape.gradient(scores, features)
+        weights = tf.reduce_mean(gradients, axis=(1, 2))
+        cams = tf.nn.relu(tf.einsum("nhwk,nk->nhw", features, weights))
+        cams = cams / (tf.reduce_max(cams, axis=(1, 2), keepdims=True) + 1e-8)
+        return outputs, cams
+
+    def explain(self, batch):
+        """(N, outputs) model outputs and (N, h, w) heatmaps for the predicted classes."""
+        outputs, cams = self._run(np.asarray(batch, dtype=np.float32))
+        return outputs.numpy(), cams.numpy()
+
+    def explain_packed(self, batch):
+        """`explain` as one (N, outputs + h * w) array, so a MicroBatcher can split it by rows."""
+        outputs, cams = self.explain(batch)
+        return np.concatenate([outputs.reshape(len(outputs), -1), cams.reshape(len(cams), -1)], axis=1)
+
+    def unpack(self, packed):
+        packed = np.asarray(packed)
+        return packed[:, :self.output_units], packed[:, self.output_units:].reshape((-1,) + self.heatmap_shape)
+
+
+def _apply(layers, x):
+    for layer in layers:
+        x = layer(x, training=False)
+    return x
+
+
+def _jet(values):
+    """Blue-cyan-yellow-red colormap for values in [0, 1], as (..., 3) floats."""
+    return np.stack([np.clip(1.5 - np.abs(4 * values - offset), 0, 1) for offset in (3, 2, 1)], axis=-1)
+
+
+def heatmap_overlay_png(pixels, heatmap, alpha=0.45, colors=64):
+    """PNG bytes of `heatmap` (h, w) upsampled, colorized and blended over `pixels`.
+
+    `pixels` is the (H, W, 3) image the model saw, as uint8 or as floats in [0, 1].
+    The overlay is palette-quantized to `colors` colors to keep it small.
+    """
+    pixels = np.asarray(pixels)
+    if pixels.dtype != np.uint8:
+        pixels = np.clip(pixels * 255.0, 0, 255).astype(np.uint8)
+    height, width = pixels.shape[:2]
+    heat = Image.fromarray(np.asarray(heatmap, dtype=np.float32), mode="F").resize((width, height), Image.BILINEAR)
+    heat = np.clip(np.asarray(heat), 0, 1)
+    # Weak activations leave the image visible; strong ones are drawn at full `alpha`
+    weight = (alpha * heat)[..., None]
+    blended = pixels.astype(np.float32) * (1 - weight) + _jet(heat) * 255.0 * weight
+    overlay = Image.fromarray(np.clip(blended, 0, 255).astype(np.uint8), mode="RGB").quantize(
+        colors=colors, method=Image.Quantize.FASTOCTREE
+    )
+    buffer = io.BytesIO()
+    overlay.save(buffer, format="PNG", optimize=True)
+    return buffer.getvalue()
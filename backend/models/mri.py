@@ -0,0 +1,74 @@
+"""MRI classifier (Healthy / Sick): training and evaluation.
+
+Splits are laid out one class per subdirectory, `<split_dir>/{Healthy,Sick}/*`,
+like the "Breast Cancer Patients MRI's" dataset.
+"""
+
+import numpy as np
+
+from .builders import build_mri_backbone, build_mri_head, build_mri_model
+
+IMAGE_SIZE = (224, 224)
+
+
+def train(train_dir, val_dir, output="breast_cancer_mri_model.keras", epochs=20, batch_size=32,
+          use_feature_cache=True, feature_views=4, feature_cache_dir=".feature_cache", seed=42, fine_tune=None):
+    """Train the InceptionV3 classifier and save it to `output`. Returns (model, history).
+
+    With `use_feature_cache`, the frozen base model runs once over the clean images and
+    `feature_views` pre-augmented views, and only the head trains (see feature_cache.py).
+    A finetune.FineTuneConfig in `fine_tune` then fine-tunes the base model, and the
+    returned history is the fine-tuning one.
+    """
+    from .data_pipeline import MRI_AUGMENTATION, build_directory_dataset
+
+    base_model = build_mri_backbone()
+    if use_feature_cache:
+        from .feature_cache import FeatureStore, attach_head, backbone_id, directory_arrays, extract_views, fit_head
+
+        train_images, train_labels = directory_arrays(train_dir, target_size=IMAGE_SIZE)
+        val_images, val_labels = directory_arrays(val_dir, target_size=IMAGE_SIZE)
+        store = FeatureStore(feature_cache_dir, backbone_id(base_model))
+        train_features = extract_views(base_model, train_images, store, views=feature_views, augment=MRI_AUGMENTATION,
+                                       seed=seed)
+        val_features = extract_views(base_model, val_images, store)
+
+        head = build_mri_head(train_features.shape[-1])
+        history = fit_head(head, train_features, train_labels, val_features, val_labels, epochs=epochs,
+                           batch_size=batch_size, seed=seed, verbose=1)
+
+        # Create final model (base model + trained head)
+        model = attach_head(base_model, head)
+        model.compile(optimizer="adam", loss="binary_crossentropy", metrics=["accuracy"])
+    else:
+        train_data = build_directory_dataset(train_dir, target_size=IMAGE_SIZE, batch_size=batch_size,
+                                             augment=MRI_AUGMENTATION, seed=seed)
+        val_data = build_directory_dataset(val_dir, target_size=IMAGE_SIZE, batch_size=batch_size, shuffle=False,
+                                           cache=True)
+        model = build_mri_model(base_model=base_model)
+        history = model.fit(train_data, validation_data=val_data, epochs=epochs, verbose=1)
+
+    if fine_tune is not None:
+        from .finetune import fine_tune as fine_tune_backbone
+
+        train_data = build_directory_dataset(train_dir, target_size=IMAGE_SIZE, batch_size=fine_tune.micro_batch_size,
+                                             augment=MRI_AUGMENTATION, seed=seed)
+        val_data = build_directory_dataset(val_dir, target_size=IMAGE_SIZE, batch_size=fine_tune.micro_batch_size,
+                                           shuffle=False)
+        history = fine_tune_backbone(model, base_model, train_data, val_data, fine_tune)
+
+    model.save(output)
+    print(f"✅ Saved MRI model to {output}")
+    return model, history
+
+
+def evaluate(model, data_dir, batch_size=32):
+    """Predict a split directory. Returns (labels, probability of MRI_CLASSES[1])."""
+    from .data_pipeline import build_directory_dataset
+
+    dataset = build_directory_dataset(data_dir, target_size=IMAGE_SIZE, batch_size=batch_size, shuffle=False)
+    labels, probabilities = [], []
+    for images, batch_labels in dataset:
+        probabilities.append(np.asarray(model.predict_on_batch(images)).reshape(-1))
+        labels.append(batch_labels.numpy().reshape(-1).astype(int))
+    return np.concatenate(labels), np.concatenate(probabilities)
@@ -0,0 +1,80 @@
+"""Training and evaluation plots. matplotlib and seaborn are imported on first use only."""
+
+import itertools
+
+import numpy as np
+
+
+def plot_history(history):
+    import matplotlib.pyplot as plt
+    import pandas as pd
+    import seaborn as sns
+
+    # Convert training history to DataFrame
+    history_df = pd.DataFrame(history.history)
+    sns.set_style("whitegrid")
+
+    for metric, title, colors in [("loss", "Loss", ("blue", "red")), ("accuracy", "Accuracy", ("green", "orange"))]:
+        plt.figure(figsize=(8, 5))
+        plt.plot(history_df[metric], label=f"Training {title}", color=colors[0], linestyle="--", marker="o")
+        if f"val_{metric}" in history_df:
+            plt.plot(history_df[f"val_{metric}"], label=f"Validation {title}", color=colors[1], linestyle="-", marker="s")
+        plt.xlabel("Epochs")
+        plt.ylabel(title)
+        plt.title(f"Training & Validation {title}")
+        plt.legend()
+        plt.show()
+
+
+def plot_confusion_matrix(cm, classes, normalize=False, title="Confusion Matrix"):
+    """
+    This function plots the confusion matrix.
+    Normalization can be applied by setting `normalize=True`.
+    """
+    import matplotlib.pyplot as plt
+
+    cm = np.asarray(cm)
+    if normalize:
+        cm = cm.astype("float") / cm.sum(axis=1)[:, np.newaxis]  # Normalize by row (true labels)
+
+    plt.figure(figsize=(6, 5))
+    plt.imshow(cm, interpolation="nearest", cmap=plt.cm.Blues)
+    plt.title(title, fontsize=14)
+    plt.colorbar()
+
+    tick_marks = np.arange(len(classes))
+    plt.xticks(tick_marks, classes, rotation=45, fontsize=12)
+    plt.yticks(tick_marks, classes, fontsize=12)
+
+    fmt = ".2f" if normalize else "d"
+    thresh = cm.max() / 2.0
+
+    # Add text annotations
+    for i, j in itertools.product(range(cm.shape[0]), range(cm.shape[1])):
+        plt.text(j, i, format(cm[i, j], fmt),
+                 horizontalalignment="center",
+                 fontsize=12,
+                 color="white" if cm[i, j] > thresh else "black")
+
+    plt.ylabel("True Label", fontsize=12)
+    plt.xlabel("Predicted Label", fontsize=12)
+    plt.tight_layout()
+    plt.show()
+
+
+def plot_roc(labels, positive_probabilities):
+    import matplotlib.pyplot as plt
+    from sklearn.metrics import auc, roc_curve
+
+    false_positive_rate, true_positive_rate, _ = roc_curve(labels, positive_probabilities)
+    area_under_curve = auc(false_positive_rate, true_positive_rate)
+
+    plt.figure(figsize=(8, 6))
+    plt.plot([0, 1], [0, 1], "r--", label="Random Classifier")  # Baseline
+    plt.plot(false_positive_rate, true_positive_rate, label="AUC = {:.3f}".format(area_under_curve), linewidth=2)
+    plt.xlabel("False Positive Rate")
+    plt.ylabel("True Positive Rate")
+    plt.title("ROC Curve")
+    plt.legend(loc="best")
+    plt.grid()
+    plt.show()
@@ -0,0 +1,50 @@
+"""Classify image files with a trained thermal or MRI model.
+
+Usage (from backend/):
+    python -m models.predict thermal --model breast_cancer_model.keras scan.png
+    python -m models.predict mri --model breast_cancer_mri_model.keras H_1.jpg
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from .builders import MRI_CLASSES, THERMAL_CLASSES
+from .preprocessing import preprocess_file
+
+
+def classify(prediction, model_type="thermal"):
+    """(label, confidence) for one model output row: softmax for thermal, sigmoid for MRI."""
+    prediction = np.asarray(prediction).reshape(-1)
+    if model_type == "mri":
+        sick = float(prediction[0])
+        return (MRI_CLASSES[1], sick) if sick > 0.5 else (MRI_CLASSES[0], 1 - sick)
+    predicted_class = int(np.argmax(prediction))  # Get the index of the highest probability
+    return THERMAL_CLASSES[predicted_class], float(prediction[predicted_class])
+
+
+def predict_file(model, img_path, model_type="thermal"):
+    """Preprocess `img_path` exactly like the server and classify it."""
+    img_array = preprocess_file(img_path)
+    return classify(model.predict_on_batch(img_array)[0], model_type)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("model_type", choices=["thermal", "mri"])
+    parser.add_argument("images", nargs="+")
+    parser.add_argument("--model", required=True, help="Saved .keras model")
+    args = parser.parse_args(argv)
+
+    import tensorflow as tf
+
+    model = tf.keras.models.load_model(args.model)
+    for img_path in args.images:
+        label, confidence = predict_file(model, img_path, args.model_type)
+        print(f"{img_path}: {label} (Confidence: {confidence:.2f})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,64 @@
+import io
+import threading
+
+import numpy as np
+from PIL import Image
+
+TARGET_SIZE = (224, 224)
+
+_buffers = threading.local()
+
+
+def get_buffer(target_size=TARGET_SIZE):
+    """Per-thread preallocated (1, H, W, 3) float32 input buffer.
+
+    The same array is handed back on every call from a given thread, so it is only
+    valid until that thread preprocesses its next image.
+    """
+    shape = (1, target_size[0], target_size[1], 3)
+    buffer = getattr(_buffers, "array", None)
+    if buffer is None or buffer.shape != shape:
+        buffer = np.empty(shape, dtype=np.float32)
+        _buffers.array = buffer
+    return buffer
+
+
+def decode_image(data, target_size=TARGET_SIZE):
+    """Decode encoded image bytes to an RGB uint8 array of shape (H, W, 3).
+
+    Mirrors `keras.preprocessing.image.load_img(path, target_size=...)`: convert
+    to RGB if needed, then resize with nearest-neighbour only when the size differs.
+    """
+    img = Image.open(io.BytesIO(data))
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    width_height = (target_size[1], target_size[0])
+    if img.size != width_height:
+        img = img.resize(width_height, Image.NEAREST)
+    return np.asarray(img, dtype=np.uint8)
+
+
+def preprocess_bytes(data, target_size=TARGET_SIZE, out=None):
+    """Decode and normalize image bytes straight into a float32 model input.
+
+    `out` may be a (1, H, W, 3) or (H, W, 3) float32 array (for example a row of a
+    larger batch); a fresh (1, H, W, 3) array is allocated when it is omitted.
+    Values are `pixel / 255.0`, bit-identical to Keras `load_img` + `img_to_array` / 255.
+    """
+    return normalize_pixels(decode_image(data, target_size), out)
+
+
+def normalize_pixels(pixels, out=None):
+    """Scale (H, W, 3) uint8 pixels to float32 `pixel / 255.0`, into `out` when given (see `preprocess_bytes`)."""
+    if out is None:
+        out = np.empty((1,) + pixels.shape, dtype=np.float32)
+    target = out[0] if out.ndim == 4 else out
+    np.divide(pixels, np.float32(255.0), out=target)
+    return out
+
+
+def preprocess_file(path, target_size=TARGET_SIZE, out=None):
+    """`preprocess_bytes` for an image file on disk."""
+    with open(path, "rb") as f:
+        return preprocess_bytes(f.read(), target_size, out)
+
@@ -0,0 +1,459 @@
+"""Streaming, sharded evaluation of a trained thermal or MRI classifier.
+
+Usage (from backend/):
+    python -m models.stream_evaluate thermal --model breast_cancer_model.keras --data-dir breast-cancer-dataset
+    python -m models.stream_evaluate mri --model breast_cancer_mri_model.keras \
+        --data-dir "Breast Cancer Patients MRI's/validation" --workers 4 --report mri-metrics.json
+
+Unlike models.evaluate, the test set is never loaded as a whole. The sorted file
+list is cut into shards, and each shard is decoded batch by batch while the
+previous batch runs through the model. Every image (or every TTA view) is
+predicted exactly once. The predictions only update fixed-size counters:
+- a confusion matrix;
+- per-class score histograms, which give the ROC curve and AUC;
+- calibration bins, the Brier score and the log loss.
+Memory use therefore does not grow with the dataset. With --workers, shards are
+spread over processes that each load the model once; their counters are merged
+at the end.
+
+The JSON report has the same accuracy / confusion_matrix / classification_report /
+roc_auc fields as models.evaluate. It adds the ROC curve, calibration,
+throughput and the peak RSS of every process.
+"""
+
+import argparse
+import json
+import multiprocessing as mp
+import os
+import resource
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from .builders import MRI_CLASSES, THERMAL_CLASSES
+
+IMAGE_SIZE = 224
+THERMAL_EXTENSIONS = (".png",)
+MRI_EXTENSIONS = (".jpeg", ".jpg", ".png", ".bmp", ".gif")
+
+
+# --- STREAMING METRICS ---
+class StreamingMetrics:
+    """Binary classification metrics accumulated batch by batch in constant memory.
+
+    `update(labels, positive_probabilities)` takes integer labels and the
+    probability of class_names[1]. Scores are kept as per-class histograms with
+    `roc_bins` bins. The AUC is therefore exact unless a positive and a negative
+    sample share a bin; those pairs count as ties. Two instances merge with `merge`,
+    and `state()` / `from_state()` carry them between processes.
+    """
+
+    def __init__(self, class_names, threshold=0.5, roc_bins=10000, calibration_bins=10):
+        self.class_names = list(class_names)
+        self.threshold = threshold
+        self.roc_bins = roc_bins
+        self.calibration_bins = calibration_bins
+        self.confusion = np.zeros((2, 2), dtype=np.int64)
+        self.score_counts = np.zeros((2, roc_bins), dtype=np.int64)
+        self.calibration_counts = np.zeros(calibration_bins, dtype=np.int64)
+        self.calibration_confidence = np.zeros(calibration_bins, dtype=np.float64)
+        self.calibration_positives = np.zeros(calibration_bins, dtype=np.int64)
+        self.brier_sum = 0.0
+        self.log_loss_sum = 0.0
+
+    @property
+    def samples(self):
+        return int(self.confusion.sum())
+
+    def update(self, labels, positive_probabilities):
+        labels = np.asarray(labels).astype(np.int64).reshape(-1)
+        probabilities = np.clip(np.asarray(positive_probabilities, dtype=np.float64).reshape(-1), 0.0, 1.0)
+        predictions = (probabilities > self.threshold).astype(np.int64)
+        np.add.at(self.confusion, (labels, predictions), 1)
+
+        score_bins = np.minimum((probabilities * self.roc_bins).astype(np.int64), self.roc_bins - 1)
+        np.add.at(self.score_counts, (labels, score_bins), 1)
+
+        calibration_bins = np.minimum((probabilities * self.calibration_bins).astype(np.int64),
+                                      self.calibration_bins - 1)
+        self.calibration_counts += np.bincount(calibration_bins, minlength=self.calibration_bins)
+        self.calibration_confidence += np.bincount(calibration_bins, weights=probabilities,
+                                                   minlength=self.calibration_bins)
+        self.calibration_positives += np.bincount(calibration_bins, weights=labels,
+                                                  minlength=self.calibration_bins).astype(np.int64)
+
+        self.brier_sum += float(np.sum((probabilities - labels) ** 2))
+        clipped = np.clip(probabilities, 1e-15, 1 - 1e-15)
+        self.log_loss_sum += float(-np.sum(labels * np.log(clipped) + (1 - labels) * np.log(1 - clipped)))
+
+    def merge(self, other):
+        self.confusion += other.confusion
+        self.score_counts += other.score_counts
+        self.calibration_counts += other.calibration_counts
+        self.calibration_confidence += other.calibration_confidence
+        self.calibration_positives += other.calibration_positives
+        self.brier_sum += other.brier_sum
+        self.log_loss_sum += other.log_loss_sum
+        return self
+
+    def state(self):
+        return {
+            "class_names": self.class_names,
+            "threshold": self.threshold,
+            "roc_bins": self.roc_bins,
+            "calibration_bins": self.calibration_bins,
+            "confusion": self.confusion.tolist(),
+            "score_counts": self.score_counts.tolist(),
+            "calibration_counts": self.calibration_counts.tolist(),
+            "calibration_confidence": self.calibration_confidence.tolist(),
+            "calibration_positives": self.calibration_positives.tolist(),
+            "brier_sum": self.brier_sum,
+            "log_loss_sum": self.log_loss_sum,
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        metrics = cls(state["class_names"], state["threshold"], state["roc_bins"], state["calibration_bins"])
+        metrics.confusion = np.asarray(state["confusion"], dtype=np.int64)
+        metrics.score_counts = np.asarray(state["score_counts"], dtype=np.int64)
+        metrics.calibration_counts = np.asarray(state["calibration_counts"], dtype=np.int64)
+        metrics.calibration_confidence = np.asarray(state["calibration_confidence"], dtype=np.float64)
+        metrics.calibration_positives = np.asarray(state["calibration_positives"], dtype=np.int64)
+        metrics.brier_sum = state["brier_sum"]
+        metrics.log_loss_sum = state["log_loss_sum"]
+        return metrics
+
+    # --- DERIVED METRICS ---
+    def classification_report(self):
+        """Per-class precision / recall / F1 / support, in sklearn's `output_dict` layout."""
+        report = {}
+        support = self.confusion.sum(axis=1)
+        predicted = self.confusion.sum(axis=0)
+        for index, name in enumerate(self.class_names):
+            true_positives = self.confusion[index, index]
+            precision = true_positives / predicted[index] if predicted[index] else 0.0
+            recall = true_positives / support[index] if support[index] else 0.0
+            f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+            report[name] = {"precision": float(precision), "recall": float(recall), "f1-score": float(f1),
+                            "support": float(support[index])}
+        total = support.sum()
+        report["accuracy"] = float(np.trace(self.confusion) / total) if total else 0.0
+        for average, weights in (("macro avg", np.ones(2)), ("weighted avg", support.astype(np.float64))):
+            weight_sum = weights.sum()
+            report[average] = {
+                field: float(sum(report[name][field] * weight for name, weight in zip(self.class_names, weights))
+                             / weight_sum) if weight_sum else 0.0
+                for field in ("precision", "recall", "f1-score")
+            }
+            report[average]["support"] = float(total)
+        return report
+
+    def roc_curve(self, max_points=201):
+        """(false positive rates, true positive rates, thresholds), thresholds falling from 1 to 0."""
+        negatives, positives = self.score_counts
+        # Sweep the threshold down from the top bin: everything at or above it is called positive
+        true_positives = np.concatenate([[0], np.cumsum(positives[::-1])])
+        false_positives = np.concatenate([[0], np.cumsum(negatives[::-1])])
+        thresholds = np.concatenate([[1.0], np.arange(self.roc_bins - 1, -1, -1) / self.roc_bins])
+        tpr = true_positives / max(positives.sum(), 1)
+        fpr = false_positives / max(negatives.sum(), 1)
+        if len(fpr) > max_points:
+            keep = np.unique(np.linspace(0, len(fpr) - 1, max_points).round().astype(int))
+            fpr, tpr, thresholds = fpr[keep], tpr[keep], thresholds[keep]
+        return fpr, tpr, thresholds
+
+    def roc_auc(self):
+        negatives, positives = self.score_counts
+        if not negatives.sum() or not positives.sum():
+            return None
+        # Mann-Whitney: pairs where the positive scores higher, plus half of the same-bin ties
+        negatives_below = np.concatenate([[0], np.cumsum(negatives)[:-1]])
+        wins = np.sum(positives * negatives_below) + 0.5 * np.sum(positives * negatives)
+        return float(wins / (positives.sum() * negatives.sum()))
+
+    def calibration(self):
+        bins = []
+        for index in range(self.calibration_bins):
+            count = int(self.calibration_counts[index])
+            bins.append({
+                "range": [index / self.calibration_bins, (index + 1) / self.calibration_bins],
+                "count": count,
+                "mean_confidence": round(self.calibration_confidence[index] / count, 4) if count else None,
+                "fraction_positive": round(self.calibration_positives[index] / count, 4) if count else None,
+            })
+        gaps = np.abs(self.calibration_confidence - self.calibration_positives) / np.maximum(self.calibration_counts, 1)
+        samples = max(self.samples, 1)
+        return {
+            "bins": bins,
+            "expected_calibration_error": round(float(np.sum(self.calibration_counts * gaps) / samples), 4),
+            "max_calibration_error": round(float(gaps[self.calibration_counts > 0].max(initial=0.0)), 4),
+            "brier_score": round(self.brier_sum / samples, 4),
+            "log_loss": round(self.log_loss_sum / samples, 4),
+        }
+
+    def to_dict(self):
+        report = self.classification_report()
+        metrics = {
+            "samples": self.samples,
+            "accuracy": round(report["accuracy"], 4),
+            "confusion_matrix": self.confusion.tolist(),
+            "classification_report": report,
+        }
+        auc = self.roc_auc()
+        if auc is not None:
+            fpr, tpr, thresholds = self.roc_curve()
+            metrics["roc_auc"] = round(auc, 4)
+            metrics["roc_curve"] = {"fpr": np.round(fpr, 4).tolist(), "tpr": np.round(tpr, 4).tolist(),
+                                    "thresholds": np.round(thresholds, 4).tolist()}
+        metrics["calibration"] = self.calibration()
+        return metrics
+
+
+# --- SHARDED INPUT ---
+def list_samples(split_dir, class_names, extensions):
+    """Sorted [(path, label)] for a `<split_dir>/<class name>/*` layout; labels follow `class_names`."""
+    samples = []
+    for label, name in enumerate(class_names):
+        class_dir = Path(split_dir) / name
+        if not class_dir.is_dir():
+            raise FileNotFoundError(f"Missing class directory {class_dir}")
+        samples.extend((str(path), label) for path in sorted(class_dir.iterdir())
+                       if path.suffix.lower() in extensions and not path.name.startswith("."))
+    return samples
+
+
+def make_shards(samples, shard_size):
+    return [samples[start:start + shard_size] for start in range(0, len(samples), shard_size)]
+
+
+def decode_thermal(path, out):
+    """Like thermal.load_split: OpenCV decode, RGB, bilinear resize; then / 255."""
+    import cv2
+
+    img = cv2.cvtColor(cv2.imread(path, cv2.IMREAD_COLOR), cv2.COLOR_BGR2RGB)
+    np.divide(cv2.resize(img, (IMAGE_SIZE, IMAGE_SIZE)), np.float32(255.0), out=out)
+
+
+def decode_mri(path, out):
+    """Like data_pipeline.build_directory_dataset: TensorFlow decode, nearest resize; then / 255."""
+    import tensorflow as tf
+
+    img = tf.io.decode_image(tf.io.read_file(path), channels=3, expand_animations=False)
+    img = tf.image.resize(img, (IMAGE_SIZE, IMAGE_SIZE), method="nearest")
+    np.divide(img.numpy(), np.float32(255.0), out=out)
+
+
+DECODERS = {"thermal": decode_thermal, "mri": decode_mri}
+
+
+class ShardEvaluator:
+    """Runs shards through one loaded model, reusing two preallocated input buffers.
+
+    Decoding of the next batch (on `decode_threads` threads) overlaps with the
+    model call on the current one.
+    """
+
+    def __init__(self, model, model_type, batch_size=32, tta_views=None, decode_threads=4, metrics_kwargs=None):
+        if decode_threads < 1:
+            raise ValueError(f"decode_threads must be at least 1, got {decode_threads}")
+        self.model = model
+        self.model_type = model_type
+        self.batch_size = batch_size
+        self.decode = DECODERS[model_type]
+        self.class_names = THERMAL_CLASSES if model_type == "thermal" else MRI_CLASSES
+        self.tta = None
+        if tta_views:
+            from .tta import TestTimeAugmentation
+            self.tta = TestTimeAugmentation(tta_views, aggregate="mean")
+        self.metrics_kwargs = metrics_kwargs or {}
+        self.buffers = [np.empty((batch_size, IMAGE_SIZE, IMAGE_SIZE, 3), dtype=np.float32) for _ in range(2)]
+        self.pool = ThreadPoolExecutor(max_workers=decode_threads, thread_name_prefix="decode")
+        # The prefetch task waits on per-image decodes in self.pool, so it needs a thread of its own
+        self.prefetch = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prefetch")
+        self.failed = []
+
+    def _decode_batch(self, batch, buffer):
+        """Decode `batch` into `buffer`; returns (rows decoded, their labels)."""
+        def decode_one(row):
+            path, _ = batch[row]
+            try:
+                self.decode(path, buffer[row])
+                return True
+            except Exception as e:
+                self.failed.append(f"{path}: {e}")
+                return False
+
+        ok = list(self.pool.map(decode_one, range(len(batch))))
+        rows = [row for row, decoded in enumerate(ok) if decoded]
+        return rows, np.array([batch[row][1] for row in rows], dtype=np.int64)
+
+    def positive_probabilities(self, images):
+        if self.tta is not None:
+            outputs = self.tta.predict(self.model.predict_on_batch, images,
+                                       max_batch_size=self.batch_size * len(self.tta.views))
+        else:
+            outputs = np.asarray(self.model.predict_on_batch(images))
+        outputs = np.asarray(outputs, dtype=np.float64)
+        return outputs.reshape(-1) if outputs.shape[-1] == 1 else outputs[:, 1]
+
+    def evaluate_shard(self, shard):
+        metrics = StreamingMetrics(self.class_names, **self.metrics_kwargs)
+        batches = [shard[start:start + self.batch_size] for start in range(0, len(shard), self.batch_size)]
+        if not batches:
+            return metrics
+        pending = self.prefetch.submit(self._decode_batch, batches[0], self.buffers[0])
+        for index in range(len(batches)):
+            buffer = self.buffers[index % 2]
+            rows, labels = pending.result()
+            if index + 1 < len(batches):
+                pending = self.prefetch.submit(self._decode_batch, batches[index + 1], self.buffers[(index + 1) % 2])
+            if rows:
+                images = buffer[:len(batches[index])] if len(rows) == len(batches[index]) else buffer[rows]
+                metrics.update(labels, self.positive_probabilities(images))
+        return metrics
+
+
+def peak_rss_mb():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+# --- WORKER PROCESSES ---
+_evaluator = None
+
+
+def _init_worker(model_path, model_type, batch_size, tta_views, decode_threads, intra_op_threads, metrics_kwargs):
+    global _evaluator
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+    import tensorflow as tf
+
+    if intra_op_threads:
+        tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    model = tf.keras.models.load_model(model_path)
+    _evaluator = ShardEvaluator(model, model_type, batch_size, tta_views, decode_threads, metrics_kwargs)
+
+
+def _run_shard(task):
+    index, shard = task
+    started = time.perf_counter()
+    metrics = _evaluator.evaluate_shard(shard)
+    failed, _evaluator.failed = _evaluator.failed, []
+    return {
+        "index": index,
+        "pid": os.getpid(),
+        "images": len(shard),
+        "seconds": time.perf_counter() - started,
+        "state": metrics.state(),
+        "failed": failed,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def evaluate_sharded(model_path, model_type, data_dir, shard_size=512, batch_size=32, tta_views=None,
+                     workers=1, decode_threads=4, intra_op_threads=0, metrics_kwargs=None):
+    """Evaluate every shard of the split and return (merged StreamingMetrics, run details)."""
+    class_names = THERMAL_CLASSES if model_type == "thermal" else MRI_CLASSES
+    split_dir = os.path.join(data_dir, "Test") if model_type == "thermal" else data_dir
+    extensions = THERMAL_EXTENSIONS if model_type == "thermal" else MRI_EXTENSIONS
+    shards = make_shards(list_samples(split_dir, class_names, extensions), shard_size)
+    total_images = sum(len(shard) for shard in shards)
+    print(f"🔍 {total_images} images in {len(shards)} shards of up to {shard_size}, {max(workers, 1)} process(es)")
+
+    init_args = (model_path, model_type, batch_size, tta_views, decode_threads, intra_op_threads, metrics_kwargs)
+    tasks = list(enumerate(shards))
+    merged = StreamingMetrics(class_names, **(metrics_kwargs or {}))
+    processes, failed = {}, []
+    started = time.perf_counter()
+
+    def collect(results):
+        done = 0
+        for result in results:
+            done += 1
+            merged.merge(StreamingMetrics.from_state(result["state"]))
+            failed.extend(result["failed"])
+            process = processes.setdefault(result["pid"], {"shards": 0, "images": 0, "peak_rss_mb": 0.0})
+            process["shards"] += 1
+            process["images"] += result["images"]
+            process["peak_rss_mb"] = max(process["peak_rss_mb"], result["peak_rss_mb"])
+            print(f"✅ Shard {result['index'] + 1}/{len(shards)}: {result['images']} images in "
+                  f"{result['seconds']:.1f}s ({done}/{len(shards)} done)")
+
+    if workers > 1:
+        with mp.get_context("spawn").Pool(workers, initializer=_init_worker, initargs=init_args) as pool:
+            collect(pool.imap_unordered(_run_shard, tasks))
+    else:
+        _init_worker(*init_args)
+        collect(map(_run_shard, tasks))
+    elapsed = time.perf_counter() - started
+
+    for message in failed:
+        print(f"⚠️ Warning: Skipped {message}")
+    details = {
+        "images": total_images,
+        "evaluated": merged.samples,
+        "failed": len(failed),
+        "shards": len(shards),
+        "shard_size": shard_size,
+        "batch_size": batch_size,
+        "workers": max(workers, 1),
+        "tta_views": list(tta_views or []),
+        "seconds": round(elapsed, 2),
+        "images_per_second": round(merged.samples / elapsed, 2) if elapsed else 0.0,
+        "processes": [dict(process, pid=pid) for pid, process in processes.items()],
+        "parent_peak_rss_mb": peak_rss_mb(),
+    }
+    return merged, details
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("model_type", choices=["thermal", "mri"])
+    parser.add_argument("--model", required=True, help="Saved .keras model")
+    parser.add_argument("--data-dir", required=True,
+                        help="thermal: directory containing Test/; mri: a class-per-subdirectory split")
+    parser.add_argument("--tta-views", default="identity,hflip,vflip,rot90,rot180,rot270",
+                        help="thermal only: comma-separated TTA views ('' disables TTA)")
+    parser.add_argument("--batch-size", type=int, default=32, help="Images per model call (before TTA views)")
+    parser.add_argument("--shard-size", type=int, default=512, help="Images per shard (the unit of work per process)")
+    parser.add_argument("--workers", type=int, default=1, help="Processes, each with its own copy of the model")
+    parser.add_argument("--decode-threads", type=int, default=4, help="Image decoding threads per process")
+    parser.add_argument("--intra-op-threads", type=int, default=0,
+                        help="TensorFlow intra-op threads per process (0 = TensorFlow default)")
+    parser.add_argument("--threshold", type=float, default=0.5)
+    parser.add_argument("--roc-bins", type=int, default=10000, help="Score histogram resolution for ROC/AUC")
+    parser.add_argument("--calibration-bins", type=int, default=10)
+    parser.add_argument("--report", help="JSON metrics artifact (default: <model_type>-stream-metrics.json)")
+    args = parser.parse_args(argv)
+    if args.decode_threads < 1:
+        parser.error("--decode-threads must be at least 1")
+
+    tta_views = None
+    if args.model_type == "thermal" and args.tta_views:
+        from .tta import parse_views
+        tta_views = parse_views(args.tta_views)
+
+    metrics, details = evaluate_sharded(
+        args.model, args.model_type, args.data_dir, shard_size=args.shard_size, batch_size=args.batch_size,
+        tta_views=tta_views, workers=args.workers, decode_threads=args.decode_threads,
+        intra_op_threads=args.intra_op_threads,
+        metrics_kwargs={"threshold": args.threshold, "roc_bins": args.roc_bins,
+                        "calibration_bins": args.calibration_bins},
+    )
+    report = dict(metrics.to_dict(), model=args.model, model_type=args.model_type, data_dir=args.data_dir,
+                  run=details)
+    summary = {key: report[key] for key in ("samples", "accuracy", "confusion_matrix", "roc_auc") if key in report}
+    summary.update({key: report["calibration"][key] for key in ("expected_calibration_error", "brier_score")})
+    summary.update(images_per_second=details["images_per_second"])
+    print(json.dumps(summary, indent=2))
+
+    report_path = args.report or f"{args.model_type}-stream-metrics.json"
+    with open(report_path, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Metrics written to {report_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
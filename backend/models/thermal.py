@@ -0,0 +1,116 @@
+"""Thermal image classifier (Benign / Malignant): data loading, training and evaluation.
+
+The dataset is laid out as `<data_dir>/{Train,Test}/{Benign,Malignant}/*.png`.
+"""
+
+import os
+import zipfile
+
+import numpy as np
+
+from .builders import THERMAL_CLASSES, build_model, build_thermal_head
+from .dataset_cache import dataset_loader
+
+IMAGE_SIZE = 224
+DEFAULT_TTA_VIEWS = ["identity", "hflip", "vflip", "rot90", "rot180", "rot270"]
+
+
+def extract_archive(zip_path, extract_path="."):
+    with zipfile.ZipFile(zip_path, "r") as zip_ref:
+        zip_ref.extractall(extract_path)
+
+
+def load_split(split_dir, seed=42):
+    """Load one split as (uint8 images, integer labels), shuffled with a fixed seed."""
+    benign = dataset_loader(os.path.join(split_dir, "Benign"), IMAGE_SIZE)
+    malignant = dataset_loader(os.path.join(split_dir, "Malignant"), IMAGE_SIZE)
+
+    images = np.vstack([benign, malignant])
+    labels = np.hstack([np.zeros(len(benign), dtype=int), np.ones(len(malignant), dtype=int)])
+
+    shuffled_indices = np.random.RandomState(seed).permutation(len(images))
+    return images[shuffled_indices], labels[shuffled_indices]
+
+
+def train(data_dir, output="breast_cancer_model.keras", epochs=10, batch_size=32, use_feature_cache=True,
+          feature_views=4, feature_cache_dir=".feature_cache", seed=42, fine_tune=None):
+    """Train build_model() on `<data_dir>/Train` and save it to `output`. Returns (model, history).
+
+    With `use_feature_cache`, the frozen backbone runs once over the clean images and
+    `feature_views` pre-augmented views, and only the head trains (see feature_cache.py).
+    A finetune.FineTuneConfig in `fine_tune` then fine-tunes the backbone, and the
+    returned history is the fine-tuning one.
+    """
+    from sklearn.model_selection import train_test_split
+    from tensorflow.keras.callbacks import EarlyStopping, ReduceLROnPlateau
+    from tensorflow.keras.utils import to_categorical
+
+    from .data_pipeline import THERMAL_AUGMENTATION, build_dataset
+
+    x_train, y_train = load_split(os.path.join(data_dir, "Train"), seed)
+    y_train = to_categorical(y_train, num_classes=2)
+
+    # Split dataset into training and validation sets
+    x_train, x_val, y_train, y_val = train_test_split(
+        x_train, y_train,
+        test_size=0.2,
+        random_state=11,
+        stratify=y_train  # Ensures balanced class distribution
+    )
+
+    model = build_model()
+
+    # Callbacks: Reduce LR on Plateau & Early Stopping
+    learn_control = ReduceLROnPlateau(monitor="val_accuracy", patience=3, factor=0.5, min_lr=1e-6)
+    early_stop = EarlyStopping(monitor="val_loss", patience=8, restore_best_weights=True)
+    callbacks = [learn_control, early_stop]
+
+    if use_feature_cache:
+        from .feature_cache import FeatureStore, backbone_id, extract_views, fit_head
+
+        backbone = model.layers[0]
+        store = FeatureStore(feature_cache_dir, backbone_id(backbone))
+        train_features = extract_views(backbone, x_train, store, views=feature_views, augment=THERMAL_AUGMENTATION,
+                                       seed=seed)
+        val_features = extract_views(backbone, x_val, store)
+
+        head = build_thermal_head(train_features.shape[-1])
+        history = fit_head(head, train_features, y_train, val_features, y_val, epochs=epochs,
+                           batch_size=batch_size, seed=seed, callbacks=callbacks)
+        # Copy the trained head into the full model so it is saved and served exactly as before
+        for layer, trained in zip(model.layers[2:], head.layers):
+            layer.set_weights(trained.get_weights())
+    else:
+        train_data = build_dataset(x_train, y_train, batch_size=batch_size, augment=THERMAL_AUGMENTATION, seed=seed)
+        val_data = build_dataset(x_val, y_val, batch_size=batch_size, shuffle=False, cache=True)
+        history = model.fit(train_data, epochs=epochs, validation_data=val_data, callbacks=callbacks)
+
+    if fine_tune is not None:
+        from .finetune import fine_tune as fine_tune_backbone
+
+        train_data = build_dataset(x_train, y_train, batch_size=fine_tune.micro_batch_size,
+                                   augment=THERMAL_AUGMENTATION, seed=seed)
+        val_data = build_dataset(x_val, y_val, batch_size=fine_tune.micro_batch_size, shuffle=False)
+        history = fine_tune_backbone(model, model.layers[0], train_data, val_data, fine_tune)
+
+    model.save(output)
+    print(f"✅ Saved thermal model to {output}")
+    return model, history
+
+
+def predict_probabilities(model, images, tta_views=DEFAULT_TTA_VIEWS, batch_size=16):
+    """(N, 2) softmax probabilities for uint8 images, averaged over TTA views when given."""
+    from .tta import TestTimeAugmentation
+
+    def rescale(chunk):
+        return np.asarray(chunk, dtype=np.float32) / 255.0
+
+    tta = TestTimeAugmentation(tta_views or ["identity"], aggregate="mean")
+    return tta.predict(model.predict_on_batch, images, max_batch_size=batch_size * len(tta.views), preprocess=rescale)
+
+
+def evaluate(model, data_dir, tta_views=DEFAULT_TTA_VIEWS, batch_size=16):
+    """Predict the `<data_dir>/Test` split. Returns (labels, probability of THERMAL_CLASSES[1])."""
+    x_test, y_test = load_split(os.path.join(data_dir, "Test"))
+    probabilities = predict_probabilities(model, x_test, tta_views, batch_size)
+    return y_test, probabilities[:, THERMAL_CLASSES.index("Malignant")]
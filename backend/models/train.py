@@ -0,0 +1,100 @@
+"""Train the thermal or MRI classifier.
+
+Usage (from backend/):
+    python -m models.train thermal --data-dir breast-cancer-dataset [--archive "cancer diagnosis.zip"]
+    python -m models.train mri --train-dir "Breast Cancer Patients MRI's/train" \
+        --val-dir "Breast Cancer Patients MRI's/validation"
+
+By default the frozen backbone's features are computed once and cached, and only
+the head is trained on them; pass --no-feature-cache to train end to end on
+augmented images instead.
+
+--fine-tune-blocks then fine-tunes the top backbone blocks in stages, e.g.
+--fine-tune-blocks 8,16,32 --micro-batch-size 8 --checkpointing --precision bfloat16
+(see finetune.py).
+"""
+
+import argparse
+import sys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="model_type", required=True)
+
+    thermal_parser = subparsers.add_parser("thermal", help="DenseNet201 Benign/Malignant classifier")
+    thermal_parser.add_argument("--data-dir", required=True, help="Directory containing Train/ and Test/ splits")
+    thermal_parser.add_argument("--archive", help="Zip to extract into the current directory before training")
+    thermal_parser.add_argument("--output", default="breast_cancer_model.keras")
+    thermal_parser.add_argument("--epochs", type=int, default=10)  # Best result achieved at 10 epochs
+
+    mri_parser = subparsers.add_parser("mri", help="InceptionV3 Healthy/Sick classifier")
+    mri_parser.add_argument("--train-dir", required=True)
+    mri_parser.add_argument("--val-dir", required=True)
+    mri_parser.add_argument("--output", default="breast_cancer_mri_model.keras")
+    mri_parser.add_argument("--epochs", type=int, default=20)
+
+    for subparser in (thermal_parser, mri_parser):
+        subparser.add_argument("--batch-size", type=int, default=32)
+        subparser.add_argument("--no-feature-cache", action="store_true", help="Train end to end on augmented images")
+        subparser.add_argument("--feature-views", type=int, default=4, help="Pre-augmented views per image")
+        subparser.add_argument("--feature-cache-dir", default=".feature_cache")
+        subparser.add_argument("--seed", type=int, default=42)
+        subparser.add_argument("--plot", action="store_true", help="Plot loss and accuracy curves")
+        subparser.add_argument("--fine-tune-blocks", help="Unfrozen top blocks per fine-tuning stage, e.g. 8,16,32")
+        subparser.add_argument("--fine-tune-epochs", type=int, default=2, help="Epochs per fine-tuning stage")
+        subparser.add_argument("--fine-tune-lr", type=float, default=1e-4, help="Learning rate of the first stage")
+        subparser.add_argument("--micro-batch-size", type=int,
+                               help="Images per forward pass while fine-tuning; gradients accumulate up to --batch-size")
+        subparser.add_argument("--checkpointing", action="store_true",
+                               help="Recompute activations inside the unfrozen blocks instead of keeping them")
+        subparser.add_argument("--precision", choices=["float32", "bfloat16"], default="float32",
+                               help="Compute precision of the backbone while fine-tuning")
+    args = parser.parse_args(argv)
+
+    fine_tune = None
+    if args.fine_tune_blocks:
+        from .finetune import FineTuneConfig
+
+        try:
+            fine_tune = FineTuneConfig(
+                [int(value) for value in args.fine_tune_blocks.split(",") if value.strip()],
+                epochs=args.fine_tune_epochs,
+                learning_rate=args.fine_tune_lr,
+                batch_size=args.batch_size,
+                micro_batch_size=args.micro_batch_size,
+                checkpointing=args.checkpointing,
+                precision=args.precision,
+            )
+        except ValueError as e:
+            parser.error(str(e))
+
+    options = dict(
+        output=args.output,
+        epochs=args.epochs,
+        batch_size=args.batch_size,
+        use_feature_cache=not args.no_feature_cache,
+        feature_views=args.feature_views,
+        feature_cache_dir=args.feature_cache_dir,
+        seed=args.seed,
+        fine_tune=fine_tune,
+    )
+    if args.model_type == "thermal":
+        from . import thermal
+
+        if args.archive:
+            thermal.extract_archive(args.archive)
+        _, history = thermal.train(args.data_dir, **options)
+    else:
+        from . import mri
+
+        _, history = mri.train(args.train_dir, args.val_dir, **options)
+
+    if args.plot:
+        from .plots import plot_history
+        plot_history(history)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,173 @@
+"""Test-time augmentation (TTA) with batched views.
+
+Each image is expanded into a fixed set of deterministic views: flips, 90° rotations
+and corner/centre crops resized back to full size. The views of a group of images
+are stacked into one batch, so the model runs one forward pass per group. The
+per-view probabilities are then combined with a mean or a geometric mean.
+
+NumPy only, so the server can use it without importing TensorFlow:
+    tta = TestTimeAugmentation(["identity", "hflip", "vflip", "rot90"], aggregate="geometric")
+    probabilities = tta.predict(model.predict_on_batch, images, max_batch_size=32)
+"""
+
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_VIEWS = ["identity", "hflip", "vflip", "rot90", "rot180", "rot270"]
+AGGREGATES = ("mean", "geometric")
+
+
+def _resize_bilinear(batch, height, width):
+    """Resize (N, h, w, C) to (N, height, width, C) with half-pixel-centre bilinear sampling."""
+    def axis(size_in, size_out):
+        coords = np.clip((np.arange(size_out) + 0.5) * size_in / size_out - 0.5, 0, size_in - 1)
+        low = np.floor(coords).astype(np.int64)
+        high = np.minimum(low + 1, size_in - 1)
+        return low, high, (coords - low).astype(batch.dtype)
+
+    y0, y1, wy = axis(batch.shape[1], height)
+    x0, x1, wx = axis(batch.shape[2], width)
+    rows = batch[:, y0] * (1 - wy)[None, :, None, None] + batch[:, y1] * wy[None, :, None, None]
+    return rows[:, :, x0] * (1 - wx)[None, None, :, None] + rows[:, :, x1] * wx[None, None, :, None]
+
+
+def _crop(batch, fraction, anchor):
+    height, width = batch.shape[1:3]
+    crop_h, crop_w = max(1, round(height * fraction)), max(1, round(width * fraction))
+    top = {"t": 0, "c": (height - crop_h) // 2, "b": height - crop_h}[anchor[0]]
+    left = {"l": 0, "c": (width - crop_w) // 2, "r": width - crop_w}[anchor[1]]
+    return _resize_bilinear(batch[:, top:top + crop_h, left:left + crop_w], height, width)
+
+
+VIEW_FUNCTIONS = {
+    "identity": lambda batch, fraction: batch,
+    "hflip": lambda batch, fraction: batch[:, :, ::-1],
+    "vflip": lambda batch, fraction: batch[:, ::-1],
+    "rot90": lambda batch, fraction: np.rot90(batch, 1, axes=(1, 2)),
+    "rot180": lambda batch, fraction: np.rot90(batch, 2, axes=(1, 2)),
+    "rot270": lambda batch, fraction: np.rot90(batch, 3, axes=(1, 2)),
+    "crop_center": lambda batch, fraction: _crop(batch, fraction, "cc"),
+    "crop_tl": lambda batch, fraction: _crop(batch, fraction, "tl"),
+    "crop_tr": lambda batch, fraction: _crop(batch, fraction, "tr"),
+    "crop_bl": lambda batch, fraction: _crop(batch, fraction, "bl"),
+    "crop_br": lambda batch, fraction: _crop(batch, fraction, "br"),
+}
+
+
+def parse_views(spec):
+    """Views from a comma-separated string ("identity,hflip,rot90") or a count of DEFAULT_VIEWS."""
+    if isinstance(spec, (list, tuple)):
+        views = list(spec)
+    elif str(spec).strip().isdigit():
+        views = DEFAULT_VIEWS[:int(spec)]
+    else:
+        views = [view.strip() for view in str(spec).split(",") if view.strip()]
+    unknown = [view for view in views if view not in VIEW_FUNCTIONS]
+    if unknown:
+        raise ValueError(f"Unknown TTA views {unknown}, expected some of {sorted(VIEW_FUNCTIONS)}")
+    return views
+
+
+def aggregate_probabilities(probabilities, method="mean", eps=1e-7):
+    """Combine (N, V, C) per-view probabilities into (N, C).
+
+    Single-column (sigmoid) outputs are combined as the two-class distribution
+    [1 - p, p] and returned as one column again.
+    """
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    sigmoid = probabilities.shape[-1] == 1
+    if sigmoid:
+        probabilities = np.concatenate([1 - probabilities, probabilities], axis=-1)
+    if method == "mean":
+        combined = probabilities.mean(axis=1)
+    elif method == "geometric":
+        combined = np.exp(np.log(np.clip(probabilities, eps, 1.0)).mean(axis=1))
+        combined /= combined.sum(axis=-1, keepdims=True)
+    else:
+        raise ValueError(f"Unknown TTA aggregate '{method}', expected one of {AGGREGATES}")
+    combined = combined.astype(np.float32)
+    return combined[:, 1:] if sigmoid else combined
+
+
+class TestTimeAugmentation:
+    """Expands images into views, predicts all views in batched passes and aggregates them.
+
+    When `predict` is given a latency budget, it runs only as many views (in the
+    configured order) as fit. The estimate comes from a moving average of the
+    measured milliseconds per view, and at least one view always runs.
+    """
+
+    def __init__(self, views=None, aggregate="mean", crop_fraction=0.875):
+        self.views = parse_views(views if views is not None else DEFAULT_VIEWS)
+        if not self.views:
+            raise ValueError("TTA needs at least one view")
+        if aggregate not in AGGREGATES:
+            raise ValueError(f"Unknown TTA aggregate '{aggregate}', expected one of {AGGREGATES}")
+        self.aggregate = aggregate
+        self.crop_fraction = crop_fraction
+        self._lock = threading.Lock()
+        self.ms_per_view = None
+        self.calls = 0
+        self.views_run = 0
+        self.budget_limited = 0
+
+    def plan(self, budget_ms=None):
+        """The views to run for one image within `budget_ms` (all of them when no budget is given)."""
+        if not budget_ms:
+            return list(self.views)
+        with self._lock:
+            ms_per_view = self.ms_per_view
+        if ms_per_view is None:
+            # No measurement yet: one view is the cheapest way to get one
+            return self.views[:1]
+        count = int(budget_ms // max(ms_per_view, 1e-3))
+        return self.views[:max(1, min(len(self.views), count))]
+
+    def expand(self, batch, views=None):
+        """(N, H, W, C) -> (N * V, H, W, C), with the V views of each image next to each other."""
+        views = views or self.views
+        batch = np.asarray(batch)
+        stacked = np.stack([VIEW_FUNCTIONS[view](batch, self.crop_fraction) for view in views], axis=1)
+        return np.ascontiguousarray(stacked.reshape((-1,) + batch.shape[1:]), dtype=np.float32)
+
+    def predict(self, predict_fn, images, max_batch_size=None, views=None, budget_ms=None, preprocess=None):
+        """Aggregated (N, C) probabilities for `images`.
+
+        `predict_fn(batch) -> (B, C)` runs on groups of whole images whose views fit
+        in `max_batch_size`. `preprocess` is applied to each group of images before
+        the views are made (e.g. rescaling a uint8 array).
+        """
+        views = views or self.plan(budget_ms)
+        count = len(images)
+        group = max(1, (max_batch_size or count * len(views)) // len(views))
+        results = []
+        started = time.perf_counter()
+        for start in range(0, count, group):
+            chunk = images[start:start + group]
+            if preprocess is not None:
+                chunk = preprocess(chunk)
+            outputs = np.asarray(predict_fn(self.expand(chunk, views)))
+            results.append(outputs.reshape(len(chunk), len(views), -1))
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self._record(elapsed_ms / max(count * len(views), 1), len(views), len(views) < len(self.views))
+        return aggregate_probabilities(np.concatenate(results), self.aggregate)
+
+    def _record(self, ms_per_view, views_run, limited):
+        with self._lock:
+            self.ms_per_view = ms_per_view if self.ms_per_view is None else 0.8 * self.ms_per_view + 0.2 * ms_per_view
+            self.calls += 1
+            self.views_run += views_run
+            self.budget_limited += int(limited)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "views": list(self.views),
+                "aggregate": self.aggregate,
+                "calls": self.calls,
+                "avg_views_per_call": round(self.views_run / self.calls, 2) if self.calls else 0.0,
+                "budget_limited_calls": self.budget_limited,
+                "ms_per_view": round(self.ms_per_view, 3) if self.ms_per_view is not None else None,
+            }
@@ -0,0 +1,108 @@
+import queue
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+
+
+class ParallelCallError(Exception):
+    """Raised when one of the calls run by `run_parallel` fails or times out."""
+
+    def __init__(self, name, reason):
+        super().__init__(f"{name} {reason}")
+        self.name = name
+        self.reason = reason
+
+
+def run_parallel(calls, executor):
+    """Run independent blocking calls concurrently on `executor`.
+
+    `calls` maps a name to a `(fn, timeout_seconds)` pair. Returns a dict of
+    name -> result once every call has finished. If any call raises, returns
+    None or runs past its own timeout, the calls that have not started yet are
+    cancelled and ParallelCallError is raised straight away; results of calls
+    still in flight are discarded.
+    """
+    started = time.monotonic()
+    futures = {}
+    deadlines = {}
+    for name, (fn, timeout) in calls.items():
+        future = executor.submit(fn)
+        futures[future] = name
+        deadlines[future] = started + timeout if timeout else None
+
+    results = {}
+    pending = set(futures)
+    try:
+        while pending:
+            now = time.monotonic()
+            expired = [f for f in pending if deadlines[f] is not None and deadlines[f] <= now]
+            if expired:
+                name = futures[expired[0]]
+                raise ParallelCallError(name, f"timed out after {now - started:.1f}s")
+
+            upcoming = [deadlines[f] for f in pending if deadlines[f] is not None]
+            wait_for = max(min(upcoming) - now, 0) if upcoming else None
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            for future in done:
+                name = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    raise ParallelCallError(name, f"failed: {e}") from e
+                if result is None:
+                    raise ParallelCallError(name, "returned no result")
+                results[name] = result
+    except ParallelCallError:
+        for future in pending:
+            future.cancel()
+        raise
+
+    return results
+
+
+def run_parallel_streams(streams, executor, timeout=None):
+    """Consume several chunk generators concurrently and yield `(name, chunk)` as chunks arrive.
+
+    `streams` maps a name to a zero-argument callable returning an iterable of
+    chunks. `(name, None)` is yielded once a stream is exhausted. If a stream raises
+    or nothing arrives for `timeout` seconds, ParallelCallError is raised. The other
+    streams are told to stop when that happens, and also when the consumer closes
+    this generator early (for example because the HTTP client disconnected).
+    """
+    events = queue.Queue()
+    stop = threading.Event()
+
+    def pump(name, make_stream):
+        stream = None
+        try:
+            stream = make_stream()
+            for chunk in stream:
+                if stop.is_set():
+                    return
+                events.put((name, chunk, None))
+            events.put((name, None, None))
+        except Exception as e:
+            events.put((name, None, e))
+        finally:
+            close = getattr(stream, "close", None)
+            if close is not None:
+                close()
+
+    futures = [executor.submit(pump, name, make_stream) for name, make_stream in streams.items()]
+    remaining = set(streams)
+    try:
+        while remaining:
+            try:
+                name, chunk, error = events.get(timeout=timeout)
+            except queue.Empty:
+                raise ParallelCallError(sorted(remaining)[0], f"produced no output for {timeout}s")
+            if error is not None:
+                raise ParallelCallError(name, f"failed: {error}") from error
+            if chunk is None:
+                remaining.discard(name)
+            yield name, chunk
+    finally:
+        stop.set()
+        for future in futures:
+            future.cancel()
@@ -0,0 +1,114 @@
+import collections
+import os
+import sys
+import threading
+import time
+
+
+class SamplingProfiler:
+    """Statistical profiler that samples the stacks of all Python threads at a fixed interval.
+
+    It can be started and stopped at any time from another thread. Each sample
+    adds one count to the thread's current call stack; `folded()` returns the
+    counts in the collapsed-stack format read by flamegraph.pl and speedscope, and
+    `top()` the functions that were on CPU (innermost frame) most often. Samples
+    of idle threads (blocked in a lock, queue or socket wait) are included, so the
+    profile shows where requests spend wall-clock time, not just CPU time.
+    """
+
+    def __init__(self, interval=0.01, max_stacks=20000):
+        self.interval = float(interval)
+        self.max_stacks = int(max_stacks)
+        self._stacks = collections.Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.samples = 0
+        self.dropped = 0
+        self.started_at = None
+        self.stopped_at = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval=None, reset=True):
+        with self._lock:
+            if self.running:
+                return False
+            if interval is not None:
+                self.interval = float(interval)
+            if reset:
+                self._stacks.clear()
+                self.samples = self.dropped = 0
+            self.started_at, self.stopped_at = time.time(), None
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+            return True
+
+    def stop(self):
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return False
+        self._stop.set()
+        thread.join()
+        self.stopped_at = time.time()
+        return True
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            stacks = []
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stacks.append(self._stack(names.get(thread_id, str(thread_id)), frame))
+            with self._lock:
+                for stack in stacks:
+                    if stack in self._stacks or len(self._stacks) < self.max_stacks:
+                        self._stacks[stack] += 1
+                    else:
+                        self.dropped += 1
+                self.samples += 1
+
+    @staticmethod
+    def _stack(thread_name, frame):
+        frames = []
+        while frame is not None:
+            code = frame.f_code
+            frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        frames.append(thread_name)
+        return tuple(reversed(frames))
+
+    def folded(self):
+        """One `thread;outer;...;inner count` line per distinct stack."""
+        with self._lock:
+            stacks = self._stacks.most_common()
+        return "\n".join(";".join(stack) + f" {count}" for stack, count in stacks) + "\n"
+
+    def top(self, limit=25):
+        with self._lock:
+            stacks = list(self._stacks.items())
+        leaves = collections.Counter()
+        for stack, count in stacks:
+            leaves[stack[-1]] += count
+        total = sum(leaves.values())
+        return [
+            {"frame": frame, "samples": count, "share": round(count / total, 4)}
+            for frame, count in leaves.most_common(limit)
+        ]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "running": self.running,
+                "interval_ms": self.interval * 1000,
+                "samples": self.samples,
+                "distinct_stacks": len(self._stacks),
+                "dropped_stacks": self.dropped,
+                "started_at": self.started_at,
+                "stopped_at": self.stopped_at,
+            }
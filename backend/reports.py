@@ -0,0 +1,125 @@
+import threading
+import time
+import uuid
+
+from cache import TTLCache
+from fallback_reports import is_fallback
+
+
+class ReportStore:
+    """Background generation of LLM report sections that clients fetch later by id.
+
+    `submit(generate_fn)` schedules `generate_fn()` on `executor` and returns a
+    report id straight away. `generate_fn` returns a dict of section name -> text.
+    Entries are kept in a size- and TTL-bounded cache, so abandoned reports do not
+    accumulate.
+
+    `track(futures)` instead follows sections that are already being generated,
+    one future per section. Each section is stored as soon as it is done, and the
+    entry's `sections` maps its name to a SECTION_* status.
+    """
+
+    PENDING = "pending"
+    READY = "ready"
+    FAILED = "failed"
+
+    SECTION_READY = "ready"
+    SECTION_DEGRADED = "degraded"  # the LLM call failed and a template was used instead
+    SECTION_FAILED = "failed"  # the LLM call failed and no template was used (LLM_FALLBACK=0)
+    SECTION_PENDING = "pending"
+    SECTION_OMITTED = "omitted"
+
+    def __init__(self, executor, max_entries=10000, ttl=86400.0):
+        self.executor = executor
+        self.entries = TTLCache(max_entries, ttl)
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, generate_fn, report_id=None, context=None):
+        report_id = report_id or uuid.uuid4().hex
+        entry = {"report_id": report_id, "status": self.PENDING, "created_at": time.time()}
+        if context:
+            entry.update(context)
+        self.entries.put(report_id, entry)
+        with self._lock:
+            self.submitted += 1
+        self.executor.submit(self._run, report_id, entry, generate_fn)
+        return report_id
+
+    def _run(self, report_id, entry, generate_fn):
+        started = time.perf_counter()
+        try:
+            sections = generate_fn()
+            updated = dict(entry, status=self.READY, **sections)
+            with self._lock:
+                self.completed += 1
+        except Exception as e:
+            print(f"❌ Error generating report {report_id}: {e}")
+            updated = dict(entry, status=self.FAILED, error="Failed to generate detailed report")
+            with self._lock:
+                self.failed += 1
+        updated["generation_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        self.entries.put(report_id, updated)
+
+    @classmethod
+    def section_status(cls, text):
+        if text is None:
+            return cls.SECTION_OMITTED
+        return cls.SECTION_DEGRADED if is_fallback(text) else cls.SECTION_READY
+
+    def track(self, futures, report_id=None, context=None):
+        """Store the results of `futures` (section name -> Future of its text) as they complete."""
+        report_id = report_id or uuid.uuid4().hex
+        entry = {"report_id": report_id, "status": self.PENDING, "created_at": time.time(),
+                 "sections": {name: self.SECTION_PENDING for name in futures}}
+        if context:
+            entry.update(context)
+        self.entries.put(report_id, entry)
+        with self._lock:
+            self.submitted += 1
+        started = time.perf_counter()
+        for name, future in futures.items():
+            future.add_done_callback(lambda f, name=name: self._section_done(report_id, entry, name, f, started))
+        return report_id
+
+    def _section_done(self, report_id, entry, name, future, started):
+        try:
+            text = future.result()
+            status = self.section_status(text)
+        except Exception as e:
+            print(f"❌ Error generating {name} for report {report_id}: {e}")
+            text, status = None, self.SECTION_FAILED
+        with self._lock:
+            entry[name] = text
+            entry["sections"][name] = status
+            if self.SECTION_PENDING in entry["sections"].values():
+                return
+            if any(entry.get(section) for section in entry["sections"]):
+                entry["status"] = self.READY
+                self.completed += 1
+            else:
+                entry["status"] = self.FAILED
+                entry["error"] = "Failed to generate detailed report"
+                self.failed += 1
+            entry["generation_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        self.entries.put(report_id, entry)
+
+    def get(self, report_id):
+        entry = self.entries.get(report_id)
+        if entry is None or "sections" not in entry:
+            return entry
+        # Tracked entries are filled in place, so hand out a snapshot
+        with self._lock:
+            return dict(entry, sections=dict(entry["sections"]))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self.entries),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "pending": self.submitted - self.completed - self.failed,
+            }
@@ -0,0 +1,48 @@
+import time
+from contextlib import contextmanager
+
+
+class StageTimings:
+    """Wall-clock time spent in each stage of one request, in milliseconds.
+
+    Stages are kept in the order they first ran; timing the same stage twice adds
+    up. `header()` renders them as a Server-Timing header value, e.g.
+    `upload;dur=1.20, decode;dur=3.41, total;dur=812.02`.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = {}
+
+    @contextmanager
+    def measure(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - started) * 1000)
+
+    def add(self, name, ms):
+        self.stages[name] = self.stages.get(name, 0.0) + ms
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def header(self):
+        stages = dict(self.stages, total=self.total_ms())
+        return ", ".join(f"{name};dur={ms:.2f}" for name, ms in stages.items())
+
+
+def parse_server_timing(value):
+    """{stage: ms} from a Server-Timing header value; entries without a duration are skipped."""
+    stages = {}
+    for entry in (value or "").split(","):
+        name, *params = [part.strip() for part in entry.split(";")]
+        for param in params:
+            key, _, duration = param.partition("=")
+            if name and key.strip() == "dur":
+                try:
+                    stages[name] = float(duration)
+                except ValueError:
+                    pass
+    return stages
@@ -0,0 +1,59 @@
+import importlib
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+from PIL import Image
+
+# The backend is run from its own directory with flat imports (`import llm_client`, `from models import ...`)
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+
+def png_bytes(size=(64, 48), seed=0):
+    pixels = np.random.default_rng(seed).integers(0, 256, size=(size[1], size[0], 3), dtype=np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+@pytest.fixture(scope="session")
+def app_module(tmp_path_factory):
+    """app.py imported once with the stub Groq client and a tiny synthetic thermal model.
+
+    Everything app.py writes (the model, the job database) lives in a temporary directory,
+    and the LLM and prediction caches are off so every request reaches the model and the stub.
+    """
+    tf = pytest.importorskip("tensorflow")
+    model_dir = tmp_path_factory.mktemp("models")
+    inputs = tf.keras.Input((224, 224, 3))
+    features = tf.keras.layers.Conv2D(4, 3, strides=8, activation="relu")(inputs)
+    outputs = tf.keras.layers.Dense(2, activation="softmax")(tf.keras.layers.GlobalAveragePooling2D()(features))
+    tf.keras.Model(inputs, outputs).save(model_dir / "thermal.keras")
+
+    with pytest.MonkeyPatch.context() as mp:
+        for name, value in {
+            "GROQ_CLIENT": "stub",
+            "MODEL_DIR": str(model_dir),
+            "JOB_DB": str(model_dir / "jobs.sqlite3"),
+            "CPU_PROFILE": str(model_dir / "cpu_profile.json"),
+            "INFERENCE_WORKERS": "0",
+            "MODEL_BACKEND": "keras",
+            "PREDICTION_CACHE_SIZE": "0",
+            "LLM_CACHE_SIZE": "0",
+            "EXPLAIN_ENABLED": "0",
+            "TTA_VIEWS": "",
+        }.items():
+            mp.setenv(name, value)
+        mp.delenv("PREDICTION_CACHE_DIR", raising=False)
+        module = importlib.import_module("app")
+    assert module.model_loader.wait(timeout=120), module.model_loader.status()
+    return module
+
+
+@pytest.fixture
+def client(app_module):
+    app_module.app.config["TESTING"] = True
+    return app_module.app.test_client()
@@ -0,0 +1,151 @@
+import io
+import json
+
+import pytest
+
+from conftest import png_bytes
+from llm_client import ResilientGroq
+from llm_stub import DEFAULT_REPLY, StubGroq
+
+
+def predict(client, **form):
+    data = {"image": (io.BytesIO(png_bytes()), "scan.png"), "age": "52", "image_type": "thermal", "lump": "no",
+            "family": "no", "density": "B"}
+    data.update(form)
+    return client.post("/predict", data=data, content_type="multipart/form-data")
+
+
+def test_predict_returns_diagnosis_and_reports(client):
+    response = predict(client)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["model"] == "thermal"
+    assert [entry["name"] for entry in body["diagnosis"]] == ["Benign", "Malignant"]
+    assert sum(entry["value"] for entry in body["diagnosis"]) == pytest.approx(100, abs=0.02)
+    assert body["detailed_report"] == DEFAULT_REPLY
+    assert body["detailed_recommendations"] == DEFAULT_REPLY
+    assert body["sections"] == {"detailed_report": "ready", "detailed_recommendations": "ready"}
+    assert "report_id" not in body
+
+
+def test_predict_without_reports_skips_the_llm(client, app_module):
+    calls = len(app_module.raw_groq_client.calls)
+    response = predict(client, reports="none")
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["detailed_report"] is None and body["detailed_recommendations"] is None
+    assert body["sections"] == {"detailed_report": "omitted", "detailed_recommendations": "omitted"}
+    assert len(app_module.raw_groq_client.calls) == calls
+
+
+@pytest.fixture
+def failing_llm(app_module, monkeypatch):
+    """Route completions to a stub whose report and recommendation calls raise."""
+    stub = StubGroq(fail_on=("breast cancer",))
+    monkeypatch.setattr(app_module, "groq_client", ResilientGroq(stub, max_retries=0))
+    return stub
+
+
+def test_failed_sections_are_reported_as_failed_without_fallback(client, app_module, monkeypatch, failing_llm):
+    monkeypatch.setattr(app_module, "LLM_FALLBACK", False)
+    response = predict(client)
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["diagnosis"]
+    assert body["detailed_report"] is None and body["detailed_recommendations"] is None
+    assert body["sections"] == {"detailed_report": "failed", "detailed_recommendations": "failed"}
+    assert "report_id" not in body
+    assert len(failing_llm.calls) == 2
+
+
+def test_failed_sections_fall_back_to_templates(client, app_module, monkeypatch, failing_llm):
+    monkeypatch.setattr(app_module, "LLM_FALLBACK", True)
+    body = predict(client).get_json()
+    assert body["sections"] == {"detailed_report": "degraded", "detailed_recommendations": "degraded"}
+    assert body["detailed_report"] and body["detailed_recommendations"]
+
+
+def test_predict_rejects_bad_requests(client):
+    assert client.post("/predict", data={}, content_type="multipart/form-data").status_code == 400
+    response = predict(client, reports="sometimes")
+    assert response.status_code == 400
+    assert "reports must be one of" in response.get_json()["error"]
+
+
+def test_predict_reports_undecodable_images(client):
+    response = predict(client, image=(io.BytesIO(b"not an image"), "scan.png"))
+    assert response.status_code == 500
+    assert "Error preprocessing image" in response.get_json()["error"]
+
+
+def test_groq_chat_replies_with_stub(client):
+    response = client.post("/api/groq-chat", json={"message": "What does a benign result mean?"})
+    assert response.status_code == 200
+    assert response.get_json() == {"reply": DEFAULT_REPLY}
+
+
+def test_groq_chat_rejects_empty_message(client):
+    response = client.post("/api/groq-chat", json={"message": "   "})
+    assert response.status_code == 400
+
+
+def test_groq_chat_stream_sends_deltas_then_done(client):
+    response = client.post("/api/groq-chat/stream", json={"message": "hello"})
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    events = [line.split(": ", 1)[1] for line in body.splitlines() if line.startswith("event: ")]
+    assert events[-1] == "done"
+    assert set(events[:-1]) == {"delta"}
+
+
+def sse_events(response):
+    """(event, data) pairs of a text/event-stream body."""
+    events = []
+    for block in response.get_data(as_text=True).strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_predict_stream_sends_diagnosis_then_sections_then_done(client):
+    data = {"image": (io.BytesIO(png_bytes()), "scan.png"), "age": "52", "image_type": "thermal"}
+    response = client.post("/predict/stream", data=data, content_type="multipart/form-data")
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    events = sse_events(response)
+    names = [event for event, _ in events]
+
+    assert names[0] == "diagnosis"
+    assert events[0][1]["model"] == "thermal"
+    assert [entry["name"] for entry in events[0][1]["diagnosis"]] == ["Benign", "Malignant"]
+    assert names[-1] == "done" and "total_ms" in events[-1][1]
+    assert set(names[1:-1]) == {"delta", "section_done"}
+
+    sections = ("detailed_report", "detailed_recommendations")
+    done = [data["section"] for event, data in events if event == "section_done"]
+    assert sorted(done) == sorted(sections)
+    for section in sections:
+        finished = events.index(("section_done", {"section": section}))
+        deltas = [index for index, (event, data) in enumerate(events) if event == "delta" and data["section"] == section]
+        assert "".join(events[index][1]["delta"] for index in deltas) == DEFAULT_REPLY
+        assert max(deltas) < finished
+
+
+def test_predict_stream_rejects_missing_image(client):
+    response = client.post("/predict/stream", data={}, content_type="multipart/form-data")
+    assert response.status_code == 400
+
+
+def test_report_prompts_bucket_probabilities_the_same_way(app_module, monkeypatch):
+    patient = {"age": "52", "image_type": "thermal", "lump": "no", "family": "no", "density": "B"}
+    diagnosis = [{"name": "Benign", "value": 76.54}, {"name": "Malignant", "value": 23.46}]
+    builders = (app_module.build_report_request, app_module.build_recommendations_request)
+
+    monkeypatch.setattr(app_module, "LLM_CACHE_PROB_BUCKET", 0.0)
+    for build in builders:
+        assert "23.46%" in build(patient, diagnosis)["messages"][-1]["content"]
+
+    monkeypatch.setattr(app_module, "LLM_CACHE_PROB_BUCKET", 5.0)
+    for build in builders:
+        prompt = build(patient, diagnosis)["messages"][-1]["content"]
+        assert "25.0%" in prompt and "23.46" not in prompt
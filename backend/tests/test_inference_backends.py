@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+
+from inference_backends import TFLiteModel
+
+
+def quantized_model(dtype, scale, zero_point):
+    """A TFLiteModel with only its input details set, enough for _quantize_input."""
+    model = TFLiteModel.__new__(TFLiteModel)
+    model._input = {"dtype": dtype, "quantization": (scale, zero_point)}
+    return model
+
+
+@pytest.mark.parametrize("dtype, zero_point", [(np.uint8, 0), (np.int8, -128)])
+def test_quantize_input_saturates_out_of_range_values(dtype, zero_point):
+    model = quantized_model(dtype, 1 / 255.0, zero_point)
+    batch = np.array([[-0.5, 0.0, 0.4, 1.0, 1.5]], dtype=np.float32)
+    quantized = model._quantize_input(batch)
+    limits = np.iinfo(dtype)
+    assert quantized.dtype == dtype
+    assert quantized[0, 0] == limits.min and quantized[0, -1] == limits.max
+    assert quantized[0, 1] == limits.min and quantized[0, 3] == limits.max
+    assert quantized[0, 2] == round(0.4 * 255) + zero_point
+
+
+def test_float_input_is_passed_through():
+    model = quantized_model(np.float32, 0.0, 0)
+    batch = np.linspace(-1, 2, 6, dtype=np.float32)
+    assert model._quantize_input(batch) is batch
@@ -0,0 +1,224 @@
+import groq
+import pytest
+
+from fake_groq_server import FakeGroqServer
+from llm_client import CircuitBreaker, LLMUnavailableError, ResilientGroq, TokenBucket
+
+REQUEST = dict(model="test-model", messages=[{"role": "user", "content": "hello"}], max_tokens=64)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def fake_groq():
+    """Factory for started FakeGroqServers, stopped after the test."""
+    servers = []
+
+    def start(**options):
+        server = FakeGroqServer(**options).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+def resilient(server, sleeps=None, **options):
+    """ResilientGroq around a real Groq client pointed at `server`; backoff sleeps are recorded, not slept."""
+    client = groq.Groq(api_key="test", base_url=server.url, max_retries=0)
+    options.setdefault("sleep", sleeps.append if sleeps is not None else (lambda seconds: None))
+    return ResilientGroq(client, **options)
+
+
+def test_success_passes_through(fake_groq):
+    server = fake_groq()
+    llm = resilient(server)
+    response = llm.chat.completions.create(**REQUEST)
+    assert response.choices[0].message.content
+    assert server.requests == 1
+    assert llm.stats()["successes"] == 1
+    assert llm.stats()["circuit"]["state"] == CircuitBreaker.CLOSED
+
+
+def test_retries_server_errors_until_success(fake_groq):
+    server = fake_groq(error_rate=0.5, seed=3)
+    sleeps = []
+    llm = resilient(server, sleeps, max_retries=20, breaker=CircuitBreaker(failure_threshold=100))
+    for _ in range(10):
+        llm.chat.completions.create(**REQUEST)
+    stats = llm.stats()
+    assert server.errors > 0
+    assert stats["successes"] == 10
+    assert stats["retries"] == server.errors == len(sleeps)
+    assert server.requests == 10 + server.errors
+    assert all(0 <= delay <= llm.backoff_max for delay in sleeps)
+
+
+def test_gives_up_after_max_retries(fake_groq):
+    server = fake_groq(error_rate=1.0, error_status=503)
+    sleeps = []
+    llm = resilient(server, sleeps, max_retries=2, breaker=CircuitBreaker(failure_threshold=100))
+    with pytest.raises(groq.InternalServerError):
+        llm.chat.completions.create(**REQUEST)
+    assert server.requests == 3
+    assert len(sleeps) == 2
+    assert llm.stats()["failures"] == 1
+    assert llm.stats()["in_flight"] == 0
+
+
+def test_client_errors_are_not_retried(fake_groq):
+    server = fake_groq(error_rate=1.0, error_status=400)
+    llm = resilient(server, max_retries=3, breaker=CircuitBreaker(failure_threshold=1))
+    with pytest.raises(groq.BadRequestError):
+        llm.chat.completions.create(**REQUEST)
+    assert server.requests == 1
+    # A 400 means the service is up, so it does not count against the breaker
+    assert llm.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_rate_limited_call_waits_for_retry_after(fake_groq):
+    server = fake_groq(rate_limit_rpm=1)
+    sleeps = []
+    llm = resilient(server, sleeps, max_retries=1, breaker=CircuitBreaker(failure_threshold=1))
+    llm.chat.completions.create(**REQUEST)
+    with pytest.raises(groq.RateLimitError):
+        llm.chat.completions.create(**REQUEST)
+    assert server.rate_limited == 2
+    # The backoff comes from the Retry-After header (~60s), not the jittered exponential delay
+    assert len(sleeps) == 1 and 55 <= sleeps[0] <= 60
+    assert llm.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_retry_after_beyond_deadline_fails_fast(fake_groq):
+    server = fake_groq(rate_limit_rpm=1)
+    sleeps = []
+    llm = resilient(server, sleeps, max_retries=3)
+    llm.chat.completions.create(**REQUEST)
+    with pytest.raises(groq.RateLimitError):
+        llm.chat.completions.create(timeout=5, **REQUEST)
+    assert sleeps == []
+
+
+def test_request_bucket_spaces_out_calls(fake_groq):
+    server = fake_groq()
+    clock = FakeClock()
+    llm = resilient(server, sleep=clock.advance)
+    llm.request_bucket = TokenBucket(2, clock=clock)
+    for _ in range(3):
+        llm.chat.completions.create(**REQUEST)
+    assert server.requests == 3
+    assert llm.stats()["throttled_seconds"] == pytest.approx(30.0)
+
+
+def test_request_bucket_rejects_when_deadline_is_too_close(fake_groq):
+    server = fake_groq()
+    llm = resilient(server, requests_per_minute=1)
+    llm.chat.completions.create(**REQUEST)
+    with pytest.raises(LLMUnavailableError):
+        llm.chat.completions.create(timeout=1, **REQUEST)
+    assert server.requests == 1
+    assert llm.stats()["rejected"] == 1
+
+
+def test_token_bucket_settles_to_reported_usage(fake_groq):
+    server = fake_groq()
+    llm = resilient(server)
+    llm.token_bucket = TokenBucket(10_000, clock=FakeClock())  # no refill while the call is in flight
+    response = llm.chat.completions.create(**REQUEST)
+    used = response.usage.total_tokens
+    assert llm.token_bucket.level == pytest.approx(10_000 - used)
+
+
+def test_breaker_opens_on_outage_and_stops_calling(fake_groq):
+    server = fake_groq(down=True)
+    clock = FakeClock()
+    llm = resilient(server, max_retries=0, breaker=CircuitBreaker(failure_threshold=2, reset_timeout=30, clock=clock))
+    for _ in range(2):
+        with pytest.raises(groq.InternalServerError):
+            llm.chat.completions.create(**REQUEST)
+    assert llm.breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(LLMUnavailableError):
+        llm.chat.completions.create(**REQUEST)
+    assert server.requests == 2
+    assert llm.stats()["rejected"] == 1
+    assert llm.stats()["circuit"]["opens"] == 1
+
+
+def test_breaker_half_open_trial_reopens_or_closes(fake_groq):
+    server = fake_groq(down=True)
+    clock = FakeClock()
+    llm = resilient(server, max_retries=0, breaker=CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock))
+    with pytest.raises(groq.InternalServerError):
+        llm.chat.completions.create(**REQUEST)
+    assert llm.breaker.state == CircuitBreaker.OPEN
+
+    # The trial fails: open again for another reset_timeout
+    clock.advance(30)
+    with pytest.raises(groq.InternalServerError):
+        llm.chat.completions.create(**REQUEST)
+    assert llm.breaker.state == CircuitBreaker.OPEN
+    assert server.requests == 2
+
+    # The service is back: the trial succeeds and closes the circuit
+    server.down = False
+    clock.advance(30)
+    llm.chat.completions.create(**REQUEST)
+    assert llm.breaker.state == CircuitBreaker.CLOSED
+    assert server.requests == 3
+
+
+def test_half_open_trial_rejected_before_sending_is_released(fake_groq):
+    server = fake_groq(down=True)
+    clock = FakeClock()
+    llm = resilient(server, max_retries=0, requests_per_minute=1,
+                    breaker=CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock))
+    with pytest.raises(groq.InternalServerError):
+        llm.chat.completions.create(**REQUEST)
+    server.down = False
+    clock.advance(30)
+
+    # The trial is granted but the request bucket is empty, so the call never goes out
+    with pytest.raises(LLMUnavailableError, match="rate limit"):
+        llm.chat.completions.create(timeout=1, **REQUEST)
+    assert llm.breaker.state == CircuitBreaker.HALF_OPEN
+    assert server.requests == 1
+
+    # The next call becomes the trial instead of finding the circuit stuck open
+    llm.request_bucket = None
+    llm.chat.completions.create(**REQUEST)
+    assert llm.breaker.state == CircuitBreaker.CLOSED
+    assert server.requests == 2
+
+
+def test_rejection_for_a_busy_connection_refunds_the_rate_limit_budget(fake_groq):
+    server = fake_groq()
+    llm = resilient(server, max_concurrency=1)
+    clock = FakeClock()  # frozen, so the buckets only move by what calls take and give back
+    llm.request_bucket = TokenBucket(60, clock=clock)
+    llm.token_bucket = TokenBucket(10_000, clock=clock)
+
+    llm._slots.acquire()  # another call holds the only connection
+    try:
+        for _ in range(3):
+            with pytest.raises(LLMUnavailableError, match="no free LLM connection"):
+                llm.chat.completions.create(timeout=0.05, **REQUEST)
+    finally:
+        llm._slots.release()
+    assert llm.stats()["rejected"] == 3
+    assert server.requests == 0
+    assert llm.request_bucket.level == 60
+    assert llm.token_bucket.level == 10_000
+
+    llm.chat.completions.create(**REQUEST)
+    assert server.requests == 1
+    assert llm.request_bucket.level == 59
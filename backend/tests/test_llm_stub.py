@@ -0,0 +1,24 @@
+from llm_stub import DEFAULT_REPLY, StubGroq
+
+MESSAGES = [{"role": "system", "content": "You are a test."}, {"role": "user", "content": "hello"}]
+
+
+def test_reply_and_recorded_request():
+    stub = StubGroq()
+    response = stub.chat.completions.create(model="m", messages=MESSAGES, max_tokens=8)
+    assert response.choices[0].message.content == DEFAULT_REPLY
+    assert list(stub.calls) == [{"model": "m", "messages": MESSAGES, "max_tokens": 8}]
+
+
+def test_calls_keep_only_the_most_recent_requests():
+    stub = StubGroq(max_calls=3)
+    for index in range(10):
+        stub.chat.completions.create(model="m", messages=[{"role": "user", "content": str(index)}])
+    assert [call["messages"][0]["content"] for call in stub.calls] == ["7", "8", "9"]
+
+
+def test_stream_yields_the_reply_in_chunks():
+    stub = StubGroq(reply="one two three")
+    chunks = list(stub.chat.completions.create(model="m", messages=MESSAGES, stream=True))
+    assert "".join(chunk.choices[0].delta.content or "" for chunk in chunks) == "one two three"
+    assert chunks[-1].choices[0].finish_reason == "stop"
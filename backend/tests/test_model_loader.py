@@ -0,0 +1,144 @@
+import io
+import threading
+
+import pytest
+
+from conftest import png_bytes
+from model_loader import BackgroundModelLoader
+
+
+class GatedLoad:
+    """Stub load function that blocks until released, then returns `resource` or raises `error`."""
+
+    def __init__(self, resource="model", error=None):
+        self.resource = resource
+        self.error = error
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self):
+        self.started.set()
+        assert self.release.wait(10)
+        if self.error is not None:
+            raise self.error
+        return self.resource
+
+
+def test_loader_moves_through_loading_and_warm_up_to_ready():
+    load = GatedLoad()
+    warming = threading.Event()
+    finish_warmup = threading.Event()
+    published = []
+
+    def warmup(resource):
+        warming.set()
+        assert finish_warmup.wait(10)
+
+    loader = BackgroundModelLoader(load, warmup_fn=warmup, on_ready=published.append, name="stub")
+    assert loader.state == BackgroundModelLoader.PENDING
+    loader.start()
+    assert load.started.wait(10)
+    assert loader.state == BackgroundModelLoader.LOADING
+    assert not loader.ready and "elapsed_seconds" in loader.status()
+
+    load.release.set()
+    assert warming.wait(10)
+    assert loader.state == BackgroundModelLoader.WARMING_UP
+    assert published == []
+
+    finish_warmup.set()
+    assert loader.wait(10)
+    status = loader.status()
+    assert status["state"] == BackgroundModelLoader.READY
+    assert status["load_seconds"] is not None and status["warmup_seconds"] is not None
+    assert "elapsed_seconds" not in status and "error" not in status
+    assert loader.resource == "model" and published == ["model"]
+
+
+def test_loader_reports_failure():
+    load = GatedLoad(error=RuntimeError("No usable model file found"))
+    loader = BackgroundModelLoader(load, name="stub").start()
+    load.release.set()
+    assert not loader.wait(10)
+    status = loader.status()
+    assert status["state"] == BackgroundModelLoader.FAILED
+    assert status["error"] == "No usable model file found"
+    assert loader.resource is None
+
+
+def test_failed_warm_up_is_not_published():
+    published = []
+
+    def warmup(resource):
+        raise ValueError("bad input shape")
+
+    loader = BackgroundModelLoader(lambda: "model", warmup_fn=warmup, on_ready=published.append).start()
+    assert not loader.wait(10)
+    assert loader.state == BackgroundModelLoader.FAILED
+    assert published == []
+
+
+def test_start_is_idempotent():
+    calls = []
+    loader = BackgroundModelLoader(lambda: calls.append(1) or "model")
+    loader.start().start()
+    assert loader.wait(10)
+    loader.start()
+    assert calls == [1]
+
+
+@pytest.fixture
+def stub_loader(app_module, monkeypatch):
+    """Swap app.py's model loader for one driven by a GatedLoad; the real model stays registered."""
+    load = GatedLoad()
+    loader = BackgroundModelLoader(load, name="stub model")
+    monkeypatch.setattr(app_module, "model_loader", loader)
+    yield load, loader
+    load.release.set()
+
+
+def test_probes_while_loading(client, stub_loader):
+    load, loader = stub_loader
+    loader.start()
+    assert load.started.wait(10)
+
+    health = client.get("/healthz")
+    assert health.status_code == 200
+    assert health.get_json()["model"]["state"] == BackgroundModelLoader.LOADING
+
+    ready = client.get("/readyz")
+    assert ready.status_code == 503
+    assert ready.get_json()["status"] == "not_ready"
+
+    predict = client.post("/predict", data={"image": (io.BytesIO(png_bytes()), "scan.png")},
+                          content_type="multipart/form-data")
+    assert predict.status_code == 503
+    assert predict.headers["Retry-After"] == "5"
+    assert "still loading" in predict.get_json()["error"]
+
+
+def test_probes_when_ready(client, stub_loader):
+    load, loader = stub_loader
+    load.release.set()
+    assert loader.start().wait(10)
+    assert client.get("/healthz").status_code == 200
+    ready = client.get("/readyz")
+    assert ready.status_code == 200
+    assert ready.get_json()["status"] == "ready"
+
+
+def test_probes_when_failed(client, stub_loader):
+    load, loader = stub_loader
+    load.error = RuntimeError("No usable model file found")
+    load.release.set()
+    assert not loader.start().wait(10)
+
+    health = client.get("/healthz")
+    assert health.status_code == 200
+    assert health.get_json()["model"]["error"] == "No usable model file found"
+    assert client.get("/readyz").status_code == 503
+
+    predict = client.post("/predict", data={"image": (io.BytesIO(png_bytes()), "scan.png")},
+                          content_type="multipart/form-data")
+    assert predict.status_code == 503
+    assert predict.get_json()["error"] == "Model failed to load"
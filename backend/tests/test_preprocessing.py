@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+from PIL import Image
+
+from models.preprocessing import preprocess_bytes, preprocess_file
+
+SAMPLES = [
+    ("sample_rgb.png", (320, 240), "RGB"),
+    ("sample_rgba.png", (224, 224), "RGBA"),
+    ("sample_gray.png", (97, 131), "L"),
+    ("sample.jpg", (640, 480), "RGB"),
+]
+
+
+def reference_preprocess(path, target_size=(224, 224)):
+    """The Keras file-based path the server used before `preprocess_bytes`."""
+    image = pytest.importorskip("tensorflow.keras.preprocessing.image")
+    img = image.load_img(path, target_size=target_size)
+    img_array = np.expand_dims(image.img_to_array(img), axis=0)
+    return img_array / 255.0
+
+
+@pytest.fixture(params=SAMPLES, ids=[name for name, _, _ in SAMPLES])
+def sample_image(request, tmp_path):
+    name, size, mode = request.param
+    channels = {"RGB": 3, "RGBA": 4, "L": 1}[mode]
+    pixels = np.random.default_rng(0).integers(0, 256, size=(size[1], size[0], channels), dtype=np.uint8)
+    path = tmp_path / name
+    img = Image.fromarray(pixels.squeeze(-1) if channels == 1 else pixels)
+    if name.endswith(".jpg"):
+        img.save(path, quality=90)
+    else:
+        img.save(path)
+    return str(path)
+
+
+def test_preprocess_bytes_matches_keras(sample_image):
+    with open(sample_image, "rb") as f:
+        fast = preprocess_bytes(f.read())
+    reference = reference_preprocess(sample_image)
+    assert fast.dtype == reference.dtype == np.float32
+    assert fast.shape == reference.shape == (1, 224, 224, 3)
+    max_abs_diff = float(np.max(np.abs(fast - reference)))
+    assert max_abs_diff == 0
+
+
+def test_preprocess_file_writes_into_out(sample_image):
+    batch = np.zeros((2, 224, 224, 3), dtype=np.float32)
+    preprocess_file(sample_image, out=batch[1])
+    assert np.array_equal(batch[1:], preprocess_file(sample_image))
+    assert not batch[0].any()
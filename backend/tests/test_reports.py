@@ -0,0 +1,45 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import pytest
+
+from fallback_reports import fallback_report
+from reports import ReportStore
+
+
+@pytest.fixture
+def store():
+    executor = ThreadPoolExecutor(max_workers=1)
+    yield ReportStore(executor)
+    executor.shutdown()
+
+
+def finished(result=None, error=None):
+    future = Future()
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(result)
+    return future
+
+
+def test_tracked_sections_keep_failed_apart_from_degraded(store):
+    report_id = store.track({
+        "detailed_report": finished(error=RuntimeError("LLM unavailable")),
+        "detailed_recommendations": finished(fallback_report({}, ("Benign", 80), ("Malignant", 20))),
+    })
+    entry = store.get(report_id)
+    assert entry["sections"] == {"detailed_report": ReportStore.SECTION_FAILED,
+                                 "detailed_recommendations": ReportStore.SECTION_DEGRADED}
+    assert entry["detailed_report"] is None
+    assert entry["status"] == ReportStore.READY
+
+
+def test_tracked_report_fails_when_every_section_fails(store):
+    pending = Future()
+    report_id = store.track({"detailed_report": finished(error=RuntimeError("down")), "detailed_recommendations": pending})
+    assert store.get(report_id)["status"] == ReportStore.PENDING
+    pending.set_exception(TimeoutError("too slow"))
+    entry = store.get(report_id)
+    assert entry["status"] == ReportStore.FAILED
+    assert set(entry["sections"].values()) == {ReportStore.SECTION_FAILED}
+    assert store.stats()["failed"] == 1
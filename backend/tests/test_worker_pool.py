@@ -0,0 +1,66 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from worker_pool import InferenceWorkerPool
+
+
+@pytest.fixture(scope="module")
+def slow_model(tmp_path_factory):
+    """A small model that takes a noticeable fraction of a second per image."""
+    tf = pytest.importorskip("tensorflow")
+    inputs = tf.keras.Input((224, 224, 3))
+    x = inputs
+    for _ in range(3):
+        x = tf.keras.layers.Conv2D(64, 7, padding="same")(x)
+    outputs = tf.keras.layers.Dense(2, activation="softmax")(tf.keras.layers.GlobalAveragePooling2D()(x))
+    path = tmp_path_factory.mktemp("pool") / "slow.keras"
+    tf.keras.Model(inputs, outputs).save(path)
+    return str(path)
+
+
+def test_worker_killed_under_load_is_replaced_and_its_caller_fails_fast(slow_model):
+    pool = InferenceWorkerPool(slow_model, num_workers=2, max_batch_size=1, task_timeout=60,
+                               intra_op_threads=1, inter_op_threads=1).start()
+    stop = threading.Event()
+    outcomes = []
+
+    def keep_busy():
+        while not stop.is_set():
+            started = time.monotonic()
+            try:
+                pool.predict_on_batch(np.zeros((1, 224, 224, 3), dtype=np.float32))
+                outcomes.append(("ok", time.monotonic() - started))
+            except RuntimeError:
+                outcomes.append(("error", time.monotonic() - started))
+
+    clients = [threading.Thread(target=keep_busy) for _ in range(4)]
+    try:
+        for client in clients:
+            client.start()
+        # Kill worker 0 while it is running a task; worker 1 keeps the result queue busy meanwhile
+        deadline = time.monotonic() + 30
+        while pool._current_tasks[0] < 0:
+            assert time.monotonic() < deadline
+            time.sleep(0.001)
+        victim = pool._processes[0]
+        victim.kill()
+
+        deadline = time.monotonic() + 10
+        while pool.stats()["restarts"] == 0:
+            assert time.monotonic() < deadline, "dead worker was never noticed"
+            time.sleep(0.05)
+        stop.set()
+        for client in clients:
+            client.join(120)
+        stats = pool.stats()
+    finally:
+        stop.set()
+        pool.stop()
+
+    assert stats["restarts"] == 1
+    assert stats["free_slots"] == stats["slots"]
+    errors = [seconds for outcome, seconds in outcomes if outcome == "error"]
+    assert len(errors) == 1 and errors[0] < 10
@@ -0,0 +1,295 @@
+import itertools
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+def _attach_shared_memory(name):
+    shm = shared_memory.SharedMemory(name=name)
+    try:
+        # The parent owns the segment; stop the child's resource tracker from unlinking it on exit
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    except Exception:
+        pass
+    return shm
+
+
+def _worker_main(worker_id, model_path, backend, slot_names, slot_shape, intra_op_threads, inter_op_threads,
+                 tasks, results, current_tasks):
+    os.environ["CUDA_VISIBLE_DEVICES"] = "-1"
+    os.environ.setdefault("TF_CPP_MIN_LOG_LEVEL", "2")
+
+    try:
+        from inference_backends import load_inference_model
+
+        model = load_inference_model(model_path, backend, intra_op_threads, inter_op_threads)
+        segments = [_attach_shared_memory(name) for name in slot_names]
+        slots = [np.ndarray(slot_shape, dtype=np.float32, buffer=shm.buf) for shm in segments]
+
+        # Trace the graph for one image and for a full batch before taking traffic
+        for batch_size in sorted({1, slot_shape[0]}):
+            model.predict_on_batch(np.zeros((batch_size,) + slot_shape[1:], dtype=np.float32))
+    except Exception as e:
+        results.put(("failed", worker_id, f"{type(e).__name__}: {e}"))
+        return
+
+    results.put(("ready", worker_id, None))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, slot_index, rows = task
+        # Lets the parent fail this task and reclaim its slot if the process dies while running it
+        current_tasks[worker_id] = task_id
+        try:
+            outputs = np.asarray(model.predict_on_batch(slots[slot_index][:rows]))
+            results.put(("done", task_id, (worker_id, outputs)))
+        except Exception as e:
+            results.put(("error", task_id, (worker_id, f"{type(e).__name__}: {e}")))
+        current_tasks[worker_id] = -1
+
+    del slots
+    for shm in segments:
+        shm.close()
+
+
+class _Waiter:
+    __slots__ = ("event", "outputs", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.outputs = None
+        self.error = None
+
+
+class InferenceWorkerPool:
+    """Pool of processes that each hold their own copy of the model (Keras or TFLite).
+
+    Input batches are copied into shared-memory slots and only a small
+    `(task_id, slot, rows)` tuple travels through the task queue; predictions come
+    back through a result queue. `predict_on_batch` is a drop-in replacement for
+    the Keras method and is safe to call from several threads at once.
+    Workers are checked every `health_check_interval` seconds: a dead one is
+    respawned and the task it was running fails straight away.
+    """
+
+    def __init__(self, model_path, num_workers=2, intra_op_threads=0, inter_op_threads=0,
+                 max_batch_size=16, input_shape=(224, 224, 3), task_timeout=60.0, start_timeout=600.0,
+                 backend="keras", health_check_interval=1.0):
+        self.model_path = model_path
+        self.backend = backend
+        self.num_workers = int(num_workers)
+        self.intra_op_threads = int(intra_op_threads)
+        self.inter_op_threads = int(inter_op_threads)
+        self.slot_shape = (int(max_batch_size),) + tuple(input_shape)
+        self.task_timeout = task_timeout
+        self.start_timeout = start_timeout
+        self.health_check_interval = health_check_interval
+
+        self._ctx = mp.get_context("spawn")
+        self._tasks = self._ctx.Queue()
+        self._results = self._ctx.Queue()
+        self._processes = {}
+        # Task id each worker is running, -1 when idle; shared memory, so it survives a crash
+        self._current_tasks = self._ctx.RawArray("q", [-1] * self.num_workers)
+        self._segments = []
+        self._slots = []
+        self._free_slots = queue.Queue()
+        self._waiters = {}
+        self._orphaned = {}
+        self._task_ids = itertools.count()
+        self._lock = threading.Lock()
+        self._collector = None
+        self._running = False
+
+        self._completed = {}
+        self._errors = 0
+        self._restarts = 0
+
+    # --- LIFECYCLE ---
+    def start(self):
+        nbytes = int(np.prod(self.slot_shape)) * np.dtype(np.float32).itemsize
+        # Two slots per worker so the next batch can be staged while one is running
+        for index in range(self.num_workers * 2):
+            shm = shared_memory.SharedMemory(create=True, size=nbytes)
+            self._segments.append(shm)
+            self._slots.append(np.ndarray(self.slot_shape, dtype=np.float32, buffer=shm.buf))
+            self._free_slots.put(index)
+
+        for worker_id in range(self.num_workers):
+            self._spawn(worker_id)
+
+        pending = set(self._processes)
+        deadline = time.monotonic() + self.start_timeout
+        while pending:
+            try:
+                kind, worker_id, detail = self._results.get(timeout=max(deadline - time.monotonic(), 0.1))
+            except queue.Empty:
+                self.stop()
+                raise RuntimeError(f"Inference workers {sorted(pending)} did not start in time")
+            if kind == "failed":
+                self.stop()
+                raise RuntimeError(f"Inference worker {worker_id} failed to start: {detail}")
+            pending.discard(worker_id)
+            self._completed.setdefault(worker_id, 0)
+
+        self._running = True
+        self._collector = threading.Thread(target=self._collect, name="worker-pool-results", daemon=True)
+        self._collector.start()
+        print(f"✅ Started {self.num_workers} inference workers "
+              f"(intra-op {self.intra_op_threads or 'default'}, inter-op {self.inter_op_threads or 'default'})")
+        return self
+
+    def _spawn(self, worker_id):
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(worker_id, self.model_path, self.backend, [shm.name for shm in self._segments], self.slot_shape,
+                  self.intra_op_threads, self.inter_op_threads, self._tasks, self._results, self._current_tasks),
+            name=f"inference-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        self._processes[worker_id] = process
+
+    def stop(self):
+        self._running = False
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes.values():
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._processes = {}
+
+        with self._lock:
+            for waiter in self._waiters.values():
+                waiter.error = RuntimeError("Inference worker pool stopped")
+                waiter.event.set()
+            self._waiters.clear()
+
+        self._slots = []
+        for shm in self._segments:
+            shm.close()
+            shm.unlink()
+        self._segments = []
+
+    # --- INFERENCE ---
+    def predict_on_batch(self, batch):
+        if not self._running:
+            raise RuntimeError("Inference worker pool is not running")
+        batch = np.asarray(batch, dtype=np.float32)
+        rows = batch.shape[0]
+        if rows > self.slot_shape[0]:
+            # Larger than a slot: split and stitch the pieces back together
+            step = self.slot_shape[0]
+            return np.concatenate([self.predict_on_batch(batch[i:i + step]) for i in range(0, rows, step)])
+
+        try:
+            slot_index = self._free_slots.get(timeout=self.task_timeout)
+        except queue.Empty:
+            raise TimeoutError(f"No free inference slot within {self.task_timeout}s")
+        self._slots[slot_index][:rows] = batch
+        task_id = next(self._task_ids)
+        waiter = _Waiter()
+        with self._lock:
+            self._waiters[task_id] = waiter
+        self._tasks.put((task_id, slot_index, rows))
+
+        if not waiter.event.wait(self.task_timeout):
+            with self._lock:
+                if self._waiters.pop(task_id, None) is not None:
+                    # A worker may still be reading the slot; hand it back only once its result arrives
+                    self._orphaned[task_id] = slot_index
+                    slot_index = None
+            if slot_index is not None:
+                self._free_slots.put(slot_index)
+            raise TimeoutError(f"Inference worker did not answer within {self.task_timeout}s")
+        self._free_slots.put(slot_index)
+
+        if waiter.error is not None:
+            raise waiter.error
+        return waiter.outputs
+
+    def _collect(self):
+        last_check = time.monotonic()
+        while self._running:
+            # Checked on a timer, not only when idle: a busy result queue must not hide a dead worker
+            if time.monotonic() - last_check >= self.health_check_interval:
+                self._check_workers()
+                last_check = time.monotonic()
+            try:
+                kind, task_id, detail = self._results.get(timeout=self.health_check_interval)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            if kind in ("ready", "failed"):
+                # A respawned worker reporting in
+                if kind == "failed":
+                    print(f"❌ Inference worker {task_id} failed to restart: {detail}")
+                continue
+
+            worker_id, payload = detail
+            with self._lock:
+                waiter = self._waiters.pop(task_id, None)
+                orphaned_slot = self._orphaned.pop(task_id, None)
+                if orphaned_slot is not None:
+                    self._free_slots.put(orphaned_slot)
+                if kind == "done":
+                    self._completed[worker_id] = self._completed.get(worker_id, 0) + 1
+                else:
+                    self._errors += 1
+            if waiter is None:
+                continue
+            if kind == "done":
+                waiter.outputs = payload
+            else:
+                waiter.error = RuntimeError(f"Inference worker {worker_id} error: {payload}")
+            waiter.event.set()
+
+    def _check_workers(self):
+        for worker_id, process in list(self._processes.items()):
+            if self._running and not process.is_alive():
+                print(f"⚠️ Warning: Inference worker {worker_id} exited with code {process.exitcode}, restarting")
+                with self._lock:
+                    self._restarts += 1
+                    self._fail_task(self._current_tasks[worker_id], worker_id, process.exitcode)
+                self._current_tasks[worker_id] = -1
+                self._spawn(worker_id)
+
+    def _fail_task(self, task_id, worker_id, exitcode):
+        """Fail the task a dead worker was running and reclaim its slot. Call with the lock held."""
+        if task_id < 0:
+            return
+        waiter = self._waiters.pop(task_id, None)
+        if waiter is not None:
+            # The waiting caller hands the slot back itself
+            waiter.error = RuntimeError(f"Inference worker {worker_id} exited with code {exitcode}")
+            waiter.event.set()
+        orphaned_slot = self._orphaned.pop(task_id, None)
+        if orphaned_slot is not None:
+            self._free_slots.put(orphaned_slot)
+        self._errors += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.num_workers,
+                "alive": sum(1 for p in self._processes.values() if p.is_alive()),
+                "intra_op_threads": self.intra_op_threads,
+                "inter_op_threads": self.inter_op_threads,
+                "slots": len(self._slots),
+                "free_slots": self._free_slots.qsize(),
+                "in_flight": len(self._waiters),
+                "completed_per_worker": {str(k): v for k, v in sorted(self._completed.items())},
+                "errors": self._errors,
+                "restarts": self._restarts,
+            }
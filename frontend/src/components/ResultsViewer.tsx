@@ -38,6 +38,8 @@ const ResultsViewer: React.FC = () => {
   const COLORS: { [key: string]: string } = {
     Benign: '#0EA5E9',     // light blue
     Malignant: '#EF4444',  // red
+    Healthy: '#0EA5E9',    // MRI model classes
+    Sick: '#EF4444',
   };
 
   return (